@@ -3,6 +3,33 @@ import numpy as np
 from typing import Optional, Tuple, Dict, Union
 
 
+def correction_bits(bits: np.ndarray) -> int:
+    """
+    Сколько ошибочных битов можно исправить в словаре из этих кодов
+
+    Минимальное расстояние Хэмминга считается между всеми поворотами кодов,
+    включая повороты кода относительно самого себя (иначе повернутый маркер
+    примется за другой или за этот же с неверной ориентацией).
+
+    Args:
+        bits: Коды маркеров (n, size, size)
+
+    Returns:
+        (минимальное расстояние - 1) // 2
+    """
+    count = len(bits)
+    codes = bits.reshape(count, -1).astype(bool)
+    distance = codes.shape[1]
+    for k in range(4):
+        rotated = np.rot90(bits, k, axes=(1, 2)).reshape(count, -1).astype(bool)
+        distances = (codes[:, None, :] != rotated[None, :, :]).sum(axis=2)
+        if k == 0:
+            # Код без поворота совпадает сам с собой
+            np.fill_diagonal(distances, codes.shape[1])
+        distance = min(distance, int(distances.min()))
+    return max(0, (distance - 1) // 2)
+
+
 class ArucoMarkerDetector:
     """
     Класс для работы с ArUco маркерами
@@ -57,12 +84,15 @@ class ArucoMarkerDetector:
             raise ValueError(f"Unknown dictionary type: {dict_type}. Available: {list(self.DICT_TYPES.keys())}")
 
         self.aruco_dict = cv2.aruco.getPredefinedDictionary(self.DICT_TYPES[dict_type])
+        # Словарь поиска: весь словарь или только используемые ID (restrict_ids)
+        self.search_dict = self.aruco_dict
+        self._id_map = None  # Номер в словаре поиска -> исходный ID
 
         # Параметры детектора
         self.detector_params = detector_params or cv2.aruco.DetectorParameters()
 
         # Создание детектора
-        self.detector = cv2.aruco.ArucoDetector(self.aruco_dict, self.detector_params)
+        self.detector = cv2.aruco.ArucoDetector(self.search_dict, self.detector_params)
 
         # Параметры камеры
         self.camera_matrix = camera_matrix
@@ -104,6 +134,89 @@ class ArucoMarkerDetector:
         self.dist_coeffs = data['dist_coeffs']
         print(f"Camera parameters loaded from {filepath}")
 
+    def set_detector_params(self, detector_params: Optional[cv2.aruco.DetectorParameters] = None):
+        """
+        Пересоздание детектора с новыми параметрами
+
+        Args:
+            detector_params: Параметры детектора (None - параметры по умолчанию)
+        """
+        self.detector_params = detector_params or cv2.aruco.DetectorParameters()
+        self.detector = cv2.aruco.ArucoDetector(self.search_dict, self.detector_params)
+
+    def restrict_ids(self, marker_ids=None) -> int:
+        """
+        Поиск только маркеров с заданными ID
+
+        Из кодов этих маркеров собирается уменьшенный словарь: кандидат
+        сравнивается с меньшим числом кодов, а минимальное расстояние между
+        кодами подмножества больше, чем во всем словаре, поэтому исправляется
+        больше ошибочных битов. ID в результатах остаются исходными.
+
+        Args:
+            marker_ids: ID маркеров (None или пусто - весь словарь)
+
+        Returns:
+            Количество маркеров в словаре поиска
+        """
+        ids = sorted({int(marker_id) for marker_id in marker_ids or ()
+                      if 0 <= int(marker_id) < len(self.aruco_dict.bytesList)})
+        if ids:
+            bytes_list = self.aruco_dict.bytesList[ids]
+            bits = np.array([cv2.aruco.Dictionary.getBitsFromByteList(bytes_list[i:i + 1], self.aruco_dict.markerSize)
+                             for i in range(len(ids))])
+            self.search_dict = cv2.aruco.Dictionary(bytes_list, self.aruco_dict.markerSize,
+                                                    max(self.aruco_dict.maxCorrectionBits, correction_bits(bits)))
+            self._id_map = np.array(ids, dtype=np.int32)
+        else:
+            self.search_dict = self.aruco_dict
+            self._id_map = None
+        self.detector = cv2.aruco.ArucoDetector(self.search_dict, self.detector_params)
+        return len(self.search_dict.bytesList)
+
+    def calibrated_parameters(self, calibration: Dict, margin: float = 0.5) -> Optional[cv2.aruco.DetectorParameters]:
+        """
+        Параметры детектора под размеры маркеров из калибровки
+
+        Поиск ограничивается периметрами откалиброванных маркеров, окна
+        адаптивного порога подбираются под размер клетки маркера, а уточнение
+        углов включается только для мелких маркеров.
+
+        Args:
+            calibration: Калибровка позиций (size - диагональ маркера в пикселях кадра width x height)
+            margin: Допустимое отклонение размера маркера от откалиброванного (0.5 - от -50% до +50%)
+
+        Returns:
+            Параметры детектора или None, если в калибровке нет позиций
+        """
+        sizes = [zone['size'] for key, zone in calibration.items() if key != "width" and key != "height"]
+        if not sizes:
+            return None
+        # Сторона маркера ~ диагональ / sqrt(2), периметр считается в долях большей стороны кадра
+        side_min = min(sizes) / np.sqrt(2) * (1 - margin)
+        side_max = max(sizes) / np.sqrt(2) * (1 + margin)
+        frame_size = max(calibration.get('width', 0), calibration.get('height', 0)) or 1
+
+        params = cv2.aruco.DetectorParameters()
+        params.minMarkerPerimeterRate = float(max(0.005, 4 * side_min / frame_size))
+        params.maxMarkerPerimeterRate = float(min(4.0, 4 * side_max / frame_size))
+
+        # Окно порога - от одной до двух клеток маркера (клеток на сторону: биты + рамка)
+        cells = self.aruco_dict.markerSize + 2 * params.markerBorderBits
+        cell_min = max(3, int(side_min / cells) | 1)
+        cell_max = max(cell_min, int(2 * side_max / cells) | 1)
+        params.adaptiveThreshWinSizeMin = cell_min
+        params.adaptiveThreshWinSizeMax = cell_max
+        params.adaptiveThreshWinSizeStep = max(2, cell_max - cell_min)
+
+        # Мелким маркерам нужна субпиксельная точность углов, крупным хватает контура
+        if side_min < 24:
+            params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_SUBPIX
+            params.cornerRefinementWinSize = max(2, int(side_min / cells / 2))
+        else:
+            params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_NONE
+        return params
+
     def add_known_marker(self,
                          marker_id: int,
                          name: str,
@@ -127,35 +240,114 @@ class ArucoMarkerDetector:
     def detect_markers(self,
                        image: np.ndarray,
                        estimate_pose: bool = False,
-                       draw: bool = False) -> Dict:
+                       draw: bool = False,
+                       gray: Optional[np.ndarray] = None) -> Dict:
         """
         Детекция маркеров на изображении
 
         Args:
             image: Входное изображение (BGR или grayscale)
             estimate_pose: Оценивать позу маркера
-            draw: Отрисовывать маркеры на изображении
+            draw: Отрисовывать маркеры на изображении (рисование идет прямо в image)
+            gray: Заранее выделенный буфер для оттенков серого (h, w) uint8
 
         Returns:
             Словарь с результатами детекции
         """
-        result = {
-            'corners': None,
-            'ids': None,
-            'rvecs': None,
-            'tvecs': None,
-            'image': image.copy() if draw else None,
-            'markers_info': []
-        }
-
         # Конвертация в оттенки серого если нужно
         if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
         else:
             gray = image
 
         # Детекция маркеров
         corners, ids, rejected = self.detector.detectMarkers(gray)
+        if ids is not None and self._id_map is not None:
+            ids = self._id_map[ids]
+        return self._make_result(image, corners, ids, estimate_pose, draw)
+
+    def detect_markers_in_regions(self,
+                                  image: np.ndarray,
+                                  regions: list,
+                                  previous: Dict,
+                                  estimate_pose: bool = False,
+                                  draw: bool = False,
+                                  gray: Optional[np.ndarray] = None) -> Dict:
+        """
+        Детекция только в заданных областях кадра
+
+        Маркеры предыдущего результата, центр которых вне областей, переносятся
+        в результат без повторной детекции. Без областей результат целиком
+        повторяет предыдущий (но отрисовывается на новом кадре).
+
+        Args:
+            image: Входное изображение (BGR или grayscale)
+            regions: Непересекающиеся области [(x0, y0, x1, y1), ...] в пикселях кадра
+            previous: Предыдущий результат detect_markers
+            estimate_pose: Оценивать позу маркера
+            draw: Отрисовывать маркеры на изображении
+            gray: Заранее выделенный буфер для оттенков серого (h, w) uint8
+
+        Returns:
+            Словарь с результатами детекции (как у detect_markers)
+        """
+        corners, ids = [], []
+        if previous['ids'] is not None:
+            for marker_corners, marker_id in zip(previous['corners'], previous['ids']):
+                cx, cy = self._get_marker_center(marker_corners)
+                if not any(x0 <= cx < x1 and y0 <= cy < y1 for x0, y0, x1, y1 in regions):
+                    corners.append(marker_corners)
+                    ids.append(marker_id)
+
+        if regions:
+            if len(image.shape) == 3:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+            else:
+                gray = image
+            frame_size = max(gray.shape[:2])
+            for x0, y0, x1, y1 in regions:
+                detector = self._region_detector(frame_size, max(x1 - x0, y1 - y0))
+                found, found_ids, _ = detector.detectMarkers(gray[y0:y1, x0:x1])
+                if found_ids is not None:
+                    if self._id_map is not None:
+                        found_ids = self._id_map[found_ids]
+                    corners.extend(marker_corners + np.float32((x0, y0)) for marker_corners in found)
+                    ids.extend(found_ids.flatten())
+
+        ids = np.array(ids, dtype=np.int32).reshape(-1, 1) if ids else None
+        return self._make_result(image, tuple(corners), ids, estimate_pose, draw)
+
+    def _region_detector(self, frame_size: int, region_size: int) -> cv2.aruco.ArucoDetector:
+        """
+        Детектор для области кадра
+
+        Пределы периметра маркера задаются в долях большей стороны изображения,
+        поэтому для вырезанной области они пересчитываются так, чтобы в пикселях
+        совпадать с пределами для всего кадра.
+        """
+        if region_size == frame_size:
+            return self.detector
+        params = self.detector.getDetectorParameters()
+        scale = frame_size / region_size
+        params.minMarkerPerimeterRate = float(params.minMarkerPerimeterRate * scale)
+        params.maxMarkerPerimeterRate = float(params.maxMarkerPerimeterRate * scale)
+        return cv2.aruco.ArucoDetector(self.search_dict, params)
+
+    def _make_result(self,
+                     image: np.ndarray,
+                     corners,
+                     ids: Optional[np.ndarray],
+                     estimate_pose: bool,
+                     draw: bool) -> Dict:
+        """Поза, отрисовка, сведения о маркерах и статистика по найденным углам"""
+        result = {
+            'corners': None,
+            'ids': None,
+            'rvecs': None,
+            'tvecs': None,
+            'image': image if draw else None,
+            'markers_info': []
+        }
 
         if ids is not None:
             result['corners'] = corners
@@ -356,6 +548,77 @@ class ArucoMarkerDetector:
         cv2.destroyAllWindows()
         print(f"\nVideo processing stopped. Statistics: {self.detection_stats}")
 
+    def analyze_video(self,
+                      video_source: str,
+                      start: int = 0,
+                      stop: Optional[int] = None,
+                      max_failures: int = 10) -> Dict:
+        """
+        Детекция на отрезке видеофайла без отображения и отрисовки
+
+        Args:
+            video_source: Путь к файлу
+            start: Первый кадр отрезка
+            stop: Кадр после последнего (None - до конца файла)
+            max_failures: Сколько нечитаемых кадров подряд считать концом файла
+
+        Returns:
+            Столбцы 'frame', 'time', 'id', 'center' (N, 2), 'corners' (N, 4, 2) - по строке
+            на каждый найденный маркер, и 'stats' - {'frames', 'failures', 'detected_frames'}
+        """
+        cap = cv2.VideoCapture(video_source)
+        if not cap.isOpened():
+            raise OSError(f"Cannot open video source {video_source}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+        frames, ids, corners = [], [], []
+        stats = {'frames': 0, 'failures': 0, 'detected_frames': 0}
+        gray = None
+        index = start
+        failures = 0
+        while stop is None or index < stop:
+            if not cap.grab():
+                # Битый кадр посреди файла пропускаем, подряд идущие ошибки - конец файла
+                failures += 1
+                stats['failures'] += 1
+                if failures >= max_failures:
+                    break
+                index += 1
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                stats['failures'] += 1
+                index += 1
+                continue
+            failures = 0
+            if gray is None:
+                gray = np.empty(frame.shape[:2], dtype=np.uint8)
+
+            result = self.detect_markers(frame, gray=gray)
+            stats['frames'] += 1
+            if result['ids'] is not None:
+                stats['detected_frames'] += 1
+                frames.append(np.full(len(result['ids']), index, dtype=np.int32))
+                ids.append(result['ids'].astype(np.int32))
+                corners.append(np.concatenate(result['corners']).reshape(-1, 4, 2))
+            index += 1
+        cap.release()
+        # Неудачные чтения в конце - это конец файла, а не ошибки
+        stats['failures'] -= failures
+
+        frame_column = np.concatenate(frames) if frames else np.empty(0, dtype=np.int32)
+        corners_column = np.concatenate(corners).astype(np.float32) if corners else np.empty((0, 4, 2), np.float32)
+        return {
+            'frame': frame_column,
+            'time': frame_column / fps if fps else np.zeros(len(frame_column)),
+            'id': np.concatenate(ids) if ids else np.empty(0, dtype=np.int32),
+            'center': corners_column.mean(axis=1),
+            'corners': corners_column,
+            'stats': stats
+        }
+
     def save_marker_image(self,
                           marker_id: int,
                           output_path: str = None,
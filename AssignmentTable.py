@@ -0,0 +1,75 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import dearpygui.dearpygui as dpg
+from Packet import LINES
+
+NO_LINE = "-"
+
+
+class AssignmentTable:
+    """
+    Таблица привязки позиций к линиям.
+
+    Одна строка на позицию (номер, ID маркера, линия) в порядке номеров.
+    Строки создаются только когда позиций становится больше, чем строк, и
+    переиспользуются при смене калибровки; в виджеты записываются только
+    изменившиеся значения. Таблица прокручивается, и DearPyGui отрисовывает
+    только видимые строки, поэтому сотни позиций не замедляют интерфейс.
+    """
+
+    def __init__(self, on_change: Callable[[str, str], None], tag: str = "assignment_table"):
+        """
+        Args:
+            on_change: Вызывается при выборе линии в строке: (номер позиции, линия или "")
+            tag: Тег таблицы
+        """
+        self.on_change = on_change
+        self.tag = tag
+        self._cache: List[Optional[Tuple[str, str]]] = []  # (ID, линия) по строкам
+
+    def build(self, height: int = 300):
+        """Создание таблицы (строки добавляет update)"""
+        with dpg.table(tag=self.tag, header_row=True, clipper=True, scrollY=True, height=height,
+                       row_background=True, borders_innerH=True, policy=dpg.mvTable_SizingFixedFit):
+            dpg.add_table_column(label="Pos", init_width_or_weight=50)
+            dpg.add_table_column(label="Position ID", init_width_or_weight=80)
+            dpg.add_table_column(label="Line")
+        self._cache = []
+
+    def _add_row(self, i: int):
+        with dpg.table_row(parent=self.tag, tag=f"{self.tag}_row_{i}"):
+            dpg.add_text(str(i))
+            dpg.add_text("", tag=f"{self.tag}_id_{i}")
+            dpg.add_radio_button(
+                [NO_LINE] + LINES,
+                tag=f"{self.tag}_line_{i}",
+                horizontal=True,
+                callback=self._on_line,
+                user_data=i
+            )
+        self._cache.append(None)
+
+    def _on_line(self, sender, app_data, user_data):
+        line = "" if app_data == NO_LINE else app_data
+        if self._cache[user_data] is not None:
+            self._cache[user_data] = (self._cache[user_data][0], line)
+        self.on_change(str(user_data), line)
+
+    def update(self, calibration: Dict):
+        """Перенос калибровки в строки таблицы"""
+        if not dpg.does_item_exist(self.tag):
+            return
+        count = sum(1 for key in calibration if key != "width" and key != "height")
+        while len(self._cache) < count:
+            self._add_row(len(self._cache))
+        while len(self._cache) > count:
+            dpg.delete_item(f"{self.tag}_row_{len(self._cache) - 1}")
+            self._cache.pop()
+
+        for i in range(count):
+            zone = calibration[str(i)]
+            row = (str(zone['id']), zone['line_attachment'])
+            if row == self._cache[i]:
+                continue
+            dpg.set_value(f"{self.tag}_id_{i}", row[0])
+            dpg.set_value(f"{self.tag}_line_{i}", row[1] or NO_LINE)
+            self._cache[i] = row
@@ -0,0 +1,171 @@
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+class _Track:
+    """Накопленные измерения одной позиции"""
+
+    def __init__(self, capacity: int, center: np.ndarray, size: float):
+        self.samples = np.empty((capacity, 3), dtype=np.float32)  # cx, cy, size
+        self.count = 0
+        self.sum = np.zeros(2, dtype=np.float64)
+        self.size = size
+        self.add(center, size)
+
+    @property
+    def reference(self) -> np.ndarray:
+        return self.sum / self.count
+
+    def add(self, center: np.ndarray, size: float):
+        if self.count < len(self.samples):
+            self.samples[self.count] = (center[0], center[1], size)
+            self.count += 1
+            self.sum += center
+
+
+class AutoCalibrator:
+    """
+    Калибровка по нескольким кадрам.
+
+    Детекции накапливаются в буферах NumPy в течение N кадров или T секунд,
+    маркеры сопоставляются между кадрами по положению. По окончании для
+    каждой позиции берутся медианы центра и размера, а разброс центра
+    (джиттер) используется для подсказки множителя области.
+    """
+
+    def __init__(self, frames: int = 30, duration: float = 2.0, min_presence: float = 0.5):
+        """
+        Инициализация калибровки
+
+        Args:
+            frames: Сколько кадров накапливать
+            duration: Максимальная длительность накопления, с
+            min_presence: Минимальная доля кадров, в которых должен быть виден маркер
+        """
+        self.frames = frames
+        self.duration = duration
+        self.min_presence = min_presence
+        self.active = False
+        self.frames_seen = 0
+        self.started = 0.0
+        self._tracks: List[_Track] = []
+
+    def start(self):
+        """Начало накопления"""
+        self.active = True
+        self.frames_seen = 0
+        self.started = time.monotonic()
+        self._tracks = []
+
+    def cancel(self):
+        self.active = False
+        self._tracks = []
+
+    @property
+    def progress(self) -> float:
+        if not self.active:
+            return 0.0
+        return max(self.frames_seen / self.frames, (time.monotonic() - self.started) / self.duration)
+
+    def add(self, corners) -> bool:
+        """
+        Добавление детекций одного кадра
+
+        Args:
+            corners: Углы маркеров из detect_markers (result['corners']) или None
+
+        Returns:
+            True если накопление завершено
+        """
+        if not self.active:
+            return False
+        self.frames_seen += 1
+
+        if corners is not None and len(corners) > 0:
+            points = np.concatenate([np.asarray(c, dtype=np.float32).reshape(-1, 4, 2) for c in corners])
+            centers = points.mean(axis=1)
+            # Размер как в одиночной калибровке: диагональ по двум соседним сторонам
+            sizes = np.hypot(
+                np.linalg.norm(points[:, 1] - points[:, 0], axis=1),
+                np.linalg.norm(points[:, 2] - points[:, 1], axis=1)
+            )
+            self._assign(centers, sizes)
+
+        if self.frames_seen >= self.frames or time.monotonic() - self.started >= self.duration:
+            self.active = False
+            return True
+        return False
+
+    def _assign(self, centers: np.ndarray, sizes: np.ndarray):
+        """Сопоставление детекций с позициями по ближайшему центру"""
+        assigned = np.zeros(len(centers), dtype=bool)
+        if self._tracks:
+            references = np.array([track.reference for track in self._tracks])
+            radii = np.array([track.size / 2 for track in self._tracks])
+            distances = np.linalg.norm(centers[:, np.newaxis, :] - references[np.newaxis, :, :], axis=2)
+
+            # Жадно: сначала самые близкие пары, одна детекция на позицию за кадр
+            used = np.zeros(len(self._tracks), dtype=bool)
+            for flat in np.argsort(distances, axis=None):
+                d, t = np.unravel_index(flat, distances.shape)
+                if distances[d, t] > radii[t]:
+                    break
+                if assigned[d] or used[t]:
+                    continue
+                self._tracks[t].add(centers[d], float(sizes[d]))
+                assigned[d] = used[t] = True
+
+        for d in np.flatnonzero(~assigned):
+            self._tracks.append(_Track(self.frames, centers[d], float(sizes[d])))
+
+    def result(self, width: int, height: int, tolerance: float = 1.0) -> Tuple[Dict, Dict]:
+        """
+        Построение калибровки по накопленным данным
+
+        Args:
+            width: Ширина кадра
+            height: Высота кадра
+            tolerance: Множитель области для всех позиций
+
+        Returns:
+            (calibration, report) - калибровка в формате программы и отчет
+            с джиттером по позициям и предлагаемым множителем области
+        """
+        min_count = max(1, int(np.ceil(self.min_presence * self.frames_seen)))
+        zones = []
+        for track in self._tracks:
+            if track.count < min_count:
+                continue
+            samples = track.samples[:track.count]
+            center = np.median(samples[:, :2], axis=0)
+            size = float(np.median(samples[:, 2]))
+            jitter = float(np.percentile(np.linalg.norm(samples[:, :2] - center, axis=1), 95))
+            zones.append((center, size, jitter, track.count))
+
+        # Нумерация сверху вниз, слева направо
+        if zones:
+            row_height = float(np.median([zone[1] for zone in zones]))
+            zones.sort(key=lambda zone: (round(zone[0][1] / row_height), zone[0][0]))
+
+        calibration = {'width': width, 'height': height}
+        report = {'frames': self.frames_seen, 'positions': [], 'rejected': len(self._tracks) - len(zones)}
+        needed = 1.0
+        for i, (center, size, jitter, count) in enumerate(zones):
+            calibration[str(i)] = {
+                "center": [float(center[0]), float(center[1])],
+                "id": str(i),
+                "size": round(size),
+                "tolerance": tolerance,
+                "line_attachment": ""
+            }
+            # Область должна покрывать маркер с запасом в 3 джиттера
+            needed = max(needed, (size / 2 + 3 * jitter) / (size / 2))
+            report['positions'].append({
+                'id': str(i),
+                'size': size,
+                'jitter': jitter,
+                'presence': count / self.frames_seen
+            })
+        report['suggested_tolerance'] = float(min(3.0, np.ceil(needed * 20) / 20))
+        return calibration, report
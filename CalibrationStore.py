@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+LINES = ("", "L1", "L2", "L3", "L4", "L5", "L6")
+
+
+def validate_calibration(calibration) -> Dict:
+    """
+    Проверка структуры калибровки
+
+    Returns:
+        Та же калибровка, если она корректна
+
+    Raises:
+        ValueError: если калибровка некорректна
+    """
+    if not isinstance(calibration, dict):
+        raise ValueError("calibration must be an object")
+    if not calibration:
+        return calibration
+
+    for key in ("width", "height"):
+        if not isinstance(calibration.get(key), int) or calibration[key] <= 0:
+            raise ValueError(f"'{key}' must be a positive integer")
+
+    positions = len(calibration) - 2
+    for i in range(positions):
+        zone = calibration.get(str(i))
+        if not isinstance(zone, dict):
+            raise ValueError(f"position '{i}' is missing")
+        center = zone.get('center')
+        if (not isinstance(center, (list, tuple)) or len(center) != 2
+                or not all(isinstance(v, (int, float)) for v in center)):
+            raise ValueError(f"position '{i}': 'center' must be [x, y]")
+        for field in ("size", "tolerance"):
+            if not isinstance(zone.get(field), (int, float)) or zone[field] <= 0:
+                raise ValueError(f"position '{i}': '{field}' must be a positive number")
+        if not isinstance(zone.get('id'), str):
+            raise ValueError(f"position '{i}': 'id' must be a string")
+        if zone.get('line_attachment') not in LINES:
+            raise ValueError(f"position '{i}': 'line_attachment' must be one of {LINES}")
+    return calibration
+
+
+class CalibrationStore:
+    """
+    Именованные профили калибровки.
+
+    Сохранение атомарное (временный файл и переименование), загрузка и
+    проверка выполняются в рабочем потоке, а готовый результат забирается
+    главным потоком через take_loaded. Наблюдатель за файлом перезагружает
+    активный профиль, если он изменился на диске.
+    """
+
+    def __init__(self, directory: str = "calibrations", watch_interval: float = 0.5):
+        """
+        Инициализация хранилища
+
+        Args:
+            directory: Папка с профилями
+            watch_interval: Интервал проверки изменения файла, с
+        """
+        self.directory = directory
+        self.watch_interval = watch_interval
+        self.active = None  # Имя активного профиля
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CalibrationStore")
+        self._lock = threading.Lock()
+        self._loaded = None  # (name, calibration или None, ошибка или None)
+        self._mtimes = {}  # {name: mtime} последних сохраненных/загруженных версий
+        self._watcher = None
+        self._watch_stop = threading.Event()
+
+    def path(self, name: str) -> str:
+        """Путь к файлу профиля"""
+        if not re.fullmatch(r"[\w\- ]+", name or ""):
+            raise ValueError(f"Invalid profile name: {name!r}")
+        return os.path.join(self.directory, f"{name}.json")
+
+    def list_profiles(self) -> List[str]:
+        """Список сохраненных профилей"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.directory) if f.endswith(".json"))
+
+    def save(self, name: str, calibration: Dict):
+        """
+        Атомарное сохранение профиля
+
+        Raises:
+            ValueError: если имя или калибровка некорректны
+            OSError: при ошибке записи
+        """
+        path = self.path(name)
+        validate_calibration(calibration)
+        os.makedirs(self.directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(calibration, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Собственное сохранение не должно вызывать перезагрузку
+        self._mtimes[name] = os.stat(path).st_mtime_ns
+        self.active = name
+
+    def import_legacy(self, legacy_path: str, name: str) -> bool:
+        """
+        Перенос калибровки старой кнопки Save (один файл) в профиль
+
+        Файл переносится, только если профиля еще нет, сам файл не удаляется.
+
+        Returns:
+            True если профиль был создан
+
+        Raises:
+            ValueError: если файл не является корректной калибровкой
+            OSError: при ошибке чтения или записи
+        """
+        if not os.path.isfile(legacy_path) or os.path.exists(self.path(name)):
+            return False
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            calibration = validate_calibration(json.load(f))
+        self.save(name, calibration)
+        self.active = None
+        return True
+
+    def load_async(self, name: str):
+        """Загрузка и проверка профиля в рабочем потоке"""
+        self._executor.submit(self._load, name)
+
+    def take_loaded(self) -> Optional[Tuple[str, Optional[Dict], Optional[str]]]:
+        """
+        Получение результата загрузки (вызывается из главного потока)
+
+        Returns:
+            (name, calibration, None) при успехе, (name, None, error) при ошибке
+            или None если загрузка не завершалась
+        """
+        with self._lock:
+            loaded, self._loaded = self._loaded, None
+        if loaded is not None and loaded[1] is not None:
+            self.active = loaded[0]
+        return loaded
+
+    def _load(self, name: str):
+        try:
+            path = self.path(name)
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, "r", encoding="utf-8") as f:
+                calibration = validate_calibration(json.load(f))
+            self._mtimes[name] = mtime
+            result = (name, calibration, None)
+        except (OSError, ValueError) as e:
+            result = (name, None, str(e))
+        with self._lock:
+            self._loaded = result
+
+    def start_watching(self):
+        """Запуск наблюдения за файлом активного профиля"""
+        if self._watcher is not None:
+            return
+        self._watch_stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="CalibrationWatcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Остановка наблюдения"""
+        if self._watcher is None:
+            return
+        self._watch_stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None
+
+    def close(self):
+        self.stop_watching()
+        self._executor.shutdown(wait=False)
+
+    def _watch(self):
+        while not self._watch_stop.wait(self.watch_interval):
+            name = self.active
+            if name is None:
+                continue
+            try:
+                mtime = os.stat(self.path(name)).st_mtime_ns
+            except (OSError, ValueError):
+                continue
+            if mtime != self._mtimes.get(name):
+                self._mtimes[name] = mtime
+                self.load_async(name)
@@ -0,0 +1,115 @@
+import threading
+import time
+from typing import Callable, Optional
+from Profiler import profiler
+
+
+class CaptureThread:
+    """
+    Захват кадров с камеры в отдельном потоке.
+
+    Используется тройная буферизация: поток захвата пишет в свой буфер,
+    готовый кадр подменяется под блокировкой, а потребитель забирает последний
+    кадр без копирования. Кадры, которые потребитель не успел забрать,
+    просто перезаписываются.
+    """
+
+    def __init__(self, cap, on_frame: Optional[Callable] = None):
+        """
+        Инициализация захвата
+
+        Args:
+            cap: Открытый cv2.VideoCapture (или любой объект с методом read(image))
+            on_frame: Функция, вызываемая из потока захвата при получении кадра
+        """
+        self.cap = cap
+        self.on_frame = on_frame
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+        # Буферы: запись (поток захвата), готовый кадр, чтение (потребитель)
+        self._write = None
+        self._ready = None
+        self._read = None
+        self._ready_seq = 0
+        self._ready_time = None
+        self._taken_seq = 0
+
+        # Статистика
+        self.frames = 0
+        self.failures = 0
+        self.taken = 0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+        self.fps = 0.0  # Фактическая частота захвата за последнюю секунду, Гц
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """Запуск потока захвата"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="CaptureThread", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Остановка потока захвата (камеру освобождает вызывающий код)"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def has_new_frame(self) -> bool:
+        return self._ready_seq != self._taken_seq
+
+    def take(self):
+        """
+        Получение последнего кадра
+
+        Returns:
+            (seq, frame, capture_time) или None если нового кадра нет.
+            Кадр остается неизменным до следующего вызова take
+        """
+        with self._lock:
+            if self._ready_seq == self._taken_seq:
+                return None
+            self._read, self._ready = self._ready, self._read
+            self._taken_seq = self._ready_seq
+            self.taken += 1
+            return self._taken_seq, self._read, self._ready_time
+
+    def _run(self):
+        while self._running:
+            with profiler.span("capture"):
+                ret, frame = self.cap.read(self._write)
+            if not ret:
+                self.failures += 1
+                self._update_fps(0)
+                time.sleep(0.01)
+                continue
+            capture_time = time.time()
+
+            # При смене разрешения камера возвращает новый массив - он и становится буфером
+            with self._lock:
+                self._write, self._ready = self._ready, frame
+                self._ready_seq += 1
+                self._ready_time = capture_time
+            self.frames += 1
+            self._update_fps(1)
+
+            if self.on_frame is not None:
+                self.on_frame()
+
+    def _update_fps(self, frames: int):
+        # Частота считается самим потоком захвата и не зависит от того, кто и как часто ее читает
+        self._window_frames += frames
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
@@ -0,0 +1,315 @@
+import argparse
+import math
+import re
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+import config
+
+# C:<ip>:0:l1:l2:l3:l4:l5:l6:0#
+PACKET_RE = re.compile(r"^C:(\d{1,3}):0:((?:\d+(?:,\d+)*:){6})0#$")
+
+# Служебный хвост тестового режима: #<seq>;<время захвата кадра, нс>
+TAG_RE = re.compile(r"^(\d+);(\d+)$")
+
+
+def tag_packet(message: str, seq: int, capture_time: Optional[float] = None) -> str:
+    """
+    Добавление номера пакета и времени захвата кадра (тестовый режим)
+
+    Args:
+        message: Пакет формата C:<ip>:0:l1..l6:0#
+        seq: Порядковый номер пакета
+        capture_time: Время захвата кадра (time.time), None - текущее время
+    """
+    capture_time = time.time() if capture_time is None else capture_time
+    return f"{message}{seq};{int(capture_time * 1e9)}"
+
+
+def parse_packet(data: bytes) -> Optional[Dict]:
+    """
+    Разбор пакета ControlCenter
+
+    Returns:
+        {'ip': int, 'lines': [[id, ...] x6], 'seq': int|None, 'capture_time': float|None}
+        или None если пакет некорректный
+    """
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+    body, sep, tail = text.partition("#")
+    match = PACKET_RE.match(body + sep)
+    if match is None:
+        return None
+
+    seq = capture_time = None
+    if tail:
+        tag = TAG_RE.match(tail)
+        if tag is None:
+            return None
+        seq = int(tag.group(1))
+        capture_time = int(tag.group(2)) / 1e9
+
+    lines = [[int(v) for v in line.split(",")] for line in match.group(2).rstrip(":").split(":")]
+    ip = int(match.group(1))
+    if ip > 255:
+        return None
+    return {'ip': ip, 'lines': lines, 'seq': seq, 'capture_time': capture_time}
+
+
+class ControlCenterStub:
+    """
+    Локальная замена ControlCenter для проверки доставки пакетов.
+
+    Принимает пакеты, проверяет формат и считает интервалы между пакетами,
+    джиттер, потери (по номерам пакетов в тестовом режиме) и задержку от
+    захвата кадра до получения пакета.
+    """
+
+    def __init__(self, ip: str = config.UDP_IP, port: int = config.UDP_PORT, history: int = 10000,
+                 reorder_window: int = 1024):
+        """
+        Инициализация приемника
+
+        Args:
+            ip: Адрес для прослушивания
+            port: Порт для прослушивания
+            history: Сколько последних измерений хранить для перцентилей
+            reorder_window: На сколько номеров назад помнить полученные пакеты (повторы и опоздания)
+        """
+        self.ip = ip
+        self.port = int(port)
+        self._socket = None
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self.last_packet = None
+        self._latencies = deque(maxlen=history)
+        self._intervals = deque(maxlen=history)
+        self.reorder_window = reorder_window
+        self.reset_stats()
+
+    def start(self):
+        """Запуск приема в фоновом потоке"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self._socket.bind((self.ip, self.port))
+        self._socket.settimeout(0.2)
+        self.port = self._socket.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ControlCenterStub", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка приема"""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def reset_stats(self):
+        """Сброс статистики"""
+        with self._lock:
+            self.stats = {
+                'received': 0,
+                'invalid': 0,
+                'tagged': 0,
+                'lost': 0,
+                'reordered': 0,
+                'duplicates': 0,
+                'stale': 0,  # Пришли позже окна reorder_window (в потери и опоздания не идут)
+                'jitter': 0.0  # Оценка джиттера по RFC 3550, с
+            }
+            self._latencies.clear()
+            self._intervals.clear()
+            self._last_arrival = None
+            self._last_transit = None
+            self._first_seq = None
+            self._max_seq = None
+            self._seen = set()  # Полученные номера в окне (_max_seq - reorder_window, _max_seq]
+
+    def handle(self, data: bytes, arrival: Optional[float] = None):
+        """Обработка одного пакета"""
+        arrival = time.time() if arrival is None else arrival
+        packet = parse_packet(data)
+        with self._lock:
+            if packet is None:
+                self.stats['invalid'] += 1
+                return
+            self.stats['received'] += 1
+            self.last_packet = packet
+
+            if self._last_arrival is not None:
+                self._intervals.append(arrival - self._last_arrival)
+            self._last_arrival = arrival
+
+            if packet['seq'] is None:
+                return
+            self.stats['tagged'] += 1
+            self._track_sequence(packet['seq'])
+
+            transit = arrival - packet['capture_time']
+            self._latencies.append(transit)
+            if self._last_transit is not None:
+                self.stats['jitter'] += (abs(transit - self._last_transit) - self.stats['jitter']) / 16
+            self._last_transit = transit
+
+    def _track_sequence(self, seq: int):
+        if self._max_seq is not None and seq <= self._max_seq - self.reorder_window:
+            # Номер мог уже выпасть из _seen: повтор или опоздание за окном не должно
+            # уменьшать потери и считаться переупорядочиванием
+            self.stats['stale'] += 1
+            return
+        if seq in self._seen:
+            self.stats['duplicates'] += 1
+            return
+        if self._max_seq is None:
+            self._first_seq = self._max_seq = seq
+        elif seq > self._max_seq:
+            self.stats['lost'] += seq - self._max_seq - 1
+            self._max_seq = seq
+            if len(self._seen) >= 2 * self.reorder_window:
+                # Старые номера больше не нужны: опоздание дальше окна считается простым опозданием
+                floor = self._max_seq - self.reorder_window
+                self._seen = {s for s in self._seen if s > floor}
+        else:
+            # Пакет пришел позже следующего - ранее он был посчитан потерянным
+            # (кроме пакетов раньше первого полученного, они в потери не попадали)
+            self.stats['reordered'] += 1
+            if seq > self._first_seq:
+                self.stats['lost'] = max(0, self.stats['lost'] - 1)
+            else:
+                self._first_seq = seq
+        self._seen.add(seq)
+
+    def get_stats(self) -> Dict:
+        """Получение статистики приема"""
+        with self._lock:
+            stats = self.stats.copy()
+            stats.update(_summary('interval', self._intervals))
+            stats.update(_summary('latency', self._latencies))
+        expected = stats['tagged'] + stats['lost']
+        stats['loss_rate'] = stats['lost'] / expected if expected else 0.0
+        return stats
+
+    def _run(self):
+        while self._running:
+            try:
+                data, _ = self._socket.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.handle(data)
+
+
+def _summary(name: str, values) -> Dict:
+    """Среднее, стандартное отклонение, максимум и 99-й перцентиль"""
+    if not values:
+        return {f'{name}_avg': 0.0, f'{name}_std': 0.0, f'{name}_max': 0.0, f'{name}_p99': 0.0}
+    ordered = sorted(values)
+    avg = sum(ordered) / len(ordered)
+    std = math.sqrt(sum((v - avg) ** 2 for v in ordered) / len(ordered))
+    return {
+        f'{name}_avg': avg,
+        f'{name}_std': std,
+        f'{name}_max': ordered[-1],
+        f'{name}_p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    }
+
+
+def run_load(rate: float, duration: float, destinations: int = 1, ip: str = "127.0.0.1", port: int = 0) -> Dict:
+    """
+    Нагрузочный тест отправки: UdpSender шлет пакеты с номерами в локальный приемник
+
+    Args:
+        rate: Пакетов в секунду
+        duration: Длительность теста, с
+        destinations: Сколько раз продублировать получателя (проверка fan-out)
+        ip: Адрес приемника
+        port: Порт приемника (0 - любой свободный)
+
+    Returns:
+        Статистика приемника и отправителя
+    """
+    from UdpSender import UdpSender, UdpDestination
+
+    stub = ControlCenterStub(ip, port)
+    stub.start()
+    sender = UdpSender(queue_size=1024)
+    targets = [UdpDestination(ip, stub.port, name=f"stub-{i}") for i in range(destinations)]
+    message = "C:228:0:1:2,3:0:0:4:5:0#"
+
+    period = 1.0 / rate
+    start = time.perf_counter()
+    seq = 0
+    while True:
+        now = time.perf_counter()
+        if now - start >= duration:
+            break
+        # Номер пакета общий для всех копий - дубликаты считаются отдельно
+        sender.send(tag_packet(message, seq).encode("utf-8"), targets)
+        seq += 1
+        delay = start + seq * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    time.sleep(0.5)
+    sender.stop()
+    stub.stop()
+    return {
+        'rate': rate,
+        'duration': duration,
+        'packets': seq,
+        'receiver': stub.get_stats(),
+        'sender': sender.get_stats()
+    }
+
+
+def _print_stats(stats: Dict):
+    for key, value in stats.items():
+        if isinstance(value, float):
+            print(f"  {key}: {value:.6f}")
+        else:
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local ControlCenter stand-in and UDP load test")
+    parser.add_argument("--ip", default=config.UDP_IP)
+    parser.add_argument("--port", type=int, default=config.UDP_PORT)
+    parser.add_argument("--load", type=float, default=0, help="run load test at N packets/s instead of listening")
+    parser.add_argument("--duration", type=float, default=5.0, help="load test duration, s")
+    parser.add_argument("--destinations", type=int, default=1, help="fan-out copies in load test")
+    args = parser.parse_args()
+
+    if args.load:
+        result = run_load(args.load, args.duration, args.destinations, args.ip, 0)
+        print(f"Load test: {result['packets']} packets at {result['rate']:.0f}/s for {result['duration']:.1f}s")
+        print("Receiver:")
+        _print_stats(result['receiver'])
+        print("Sender:")
+        _print_stats(result['sender'])
+    else:
+        stub = ControlCenterStub(args.ip, args.port)
+        stub.start()
+        print(f"Listening on {stub.ip}:{stub.port}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1.0)
+                stats = stub.get_stats()
+                print(f"\rreceived={stats['received']} invalid={stats['invalid']} lost={stats['lost']} "
+                      f"jitter={stats['jitter'] * 1000:.2f}ms latency={stats['latency_avg'] * 1000:.2f}ms "
+                      f"last={stub.last_packet}", end="")
+        except KeyboardInterrupt:
+            pass
+        stub.stop()
+        print()
+        _print_stats(stub.get_stats())
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+def make_snapshot(result: Dict, seq: int, capture_time: Optional[float] = None) -> Dict:
+    """
+    Компактный снимок результата детекции для потоковой передачи
+
+    Args:
+        result: Результат ArucoMarkerDetector.detect_markers
+        seq: Порядковый номер кадра
+        capture_time: Время захвата кадра (time.time)
+    """
+    markers = []
+    for info in result.get('markers_info', []):
+        marker = {
+            'id': info['id'],
+            'center': [round(info['center'][0], 1), round(info['center'][1], 1)],
+            'corners': [[round(x, 1), round(y, 1)] for x, y in info['corners'][0]]
+        }
+        if 'rotation' in info:
+            marker['rotation'] = [round(v, 4) for v in info['rotation'][0]]
+            marker['translation'] = [round(v, 4) for v in info['translation'][0]]
+        markers.append(marker)
+    return {'seq': seq, 'time': capture_time, 'markers': markers}
+
+
+class _Client:
+    """Подключенный клиент с ограниченным буфером кадров"""
+
+    def __init__(self, buffer_size: int):
+        self.buffer = deque(maxlen=buffer_size)
+        self.event = asyncio.Event()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+
+    def push(self, data: bytes):
+        if len(self.buffer) == self.buffer.maxlen:
+            # Медленный клиент получает только свежие кадры
+            self.dropped += 1
+        self.buffer.append(data)
+        self.event.set()
+
+    def close(self):
+        self.closed = True
+        self.event.set()
+
+
+class DetectionServer:
+    """
+    Потоковая передача результатов детекции по TCP (JSON построчно).
+
+    Сервер asyncio работает в отдельном потоке. Снимок сериализуется один раз
+    на кадр независимо от числа клиентов, у каждого клиента свой ограниченный
+    буфер, из которого при переполнении выбрасываются старые кадры. Сам модуль
+    (и asyncio вместе с ним) импортируется только при первом включении потока.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8890, buffer_size: int = 4):
+        """
+        Инициализация сервера
+
+        Args:
+            host: Адрес для прослушивания (по умолчанию только localhost)
+            port: Порт
+            buffer_size: Сколько кадров держать в буфере каждого клиента
+        """
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.loop = None
+        self._server = None
+        self._thread = None
+        # Клиенты добавляются и удаляются в потоке сервера, а читаются из потока обработки кадров
+        self._clients = set()
+        self._clients_lock = threading.Lock()
+        self.client_count = 0
+
+        # Статистика
+        self.stats = {
+            'published': 0,
+            'connections': 0
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """Запуск сервера в фоновом потоке"""
+        if self.running:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        error = []
+        self._thread = threading.Thread(target=self._run, args=(ready, error), name="DetectionServer", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if error:
+            self._thread.join()
+            self._thread = None
+            raise error[0]
+
+    def stop(self):
+        """Остановка сервера и отключение клиентов"""
+        if not self.running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def has_clients(self) -> bool:
+        return self.client_count > 0
+
+    def publish(self, snapshot: Dict) -> bool:
+        """
+        Отправка снимка всем клиентам (вызывается из потока обработки кадров)
+
+        Returns:
+            True если снимок был отправлен хотя бы одному клиенту
+        """
+        if not self.running or not self.client_count:
+            return False
+        data = (json.dumps(snapshot, separators=(',', ':')) + "\n").encode("utf-8")
+        self.loop.call_soon_threadsafe(self._broadcast, data)
+        self.stats['published'] += 1
+        return True
+
+    def get_stats(self) -> Dict:
+        """Получение статистики сервера"""
+        stats = self.stats.copy()
+        with self._clients_lock:
+            clients = list(self._clients)
+        stats['clients'] = len(clients)
+        stats['sent'] = sum(client.sent for client in clients)
+        stats['dropped'] = sum(client.dropped for client in clients)
+        return stats
+
+    def _broadcast(self, data: bytes):
+        for client in self._clients:
+            client.push(data)
+
+    def _run(self, ready: threading.Event, error: list):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            error.append(e)
+            ready.set()
+            self.loop.close()
+            return
+
+        ready.set()
+        self.loop.run_forever()
+
+        # Завершение: закрываем сервер и клиентов
+        self._server.close()
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.close()
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.run_until_complete(self._server.wait_closed())
+        self.loop.close()
+        with self._clients_lock:
+            self._clients.clear()
+            self.client_count = 0
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _Client(self.buffer_size)
+        with self._clients_lock:
+            self._clients.add(client)
+            self.client_count = len(self._clients)
+        self.stats['connections'] += 1
+        writer.transport.set_write_buffer_limits(high=64 * 1024)
+
+        # Клиент ничего не присылает, конец потока означает отключение
+        eof = asyncio.ensure_future(reader.read())
+        eof.add_done_callback(lambda _: client.close())
+        try:
+            while not client.closed:
+                await client.event.wait()
+                client.event.clear()
+                while client.buffer and not client.closed:
+                    writer.write(client.buffer.popleft())
+                    client.sent += 1
+                    # Пока клиент не успевает читать, новые кадры вытесняют старые в буфере
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            with self._clients_lock:
+                self._clients.discard(client)
+                self.client_count = len(self._clients)
+            eof.cancel()
+            writer.close()
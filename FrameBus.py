@@ -0,0 +1,320 @@
+import argparse
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+import numpy as np
+
+MAGIC = 0x53434642  # "SCFB"
+VERSION = 1
+
+HEADER = np.dtype([
+    ('magic', '<u4'), ('version', '<u2'), ('closed', '<u2'),
+    ('slots', '<u4'), ('max_markers', '<u4'),
+    ('height', '<u4'), ('width', '<u4'), ('channels', '<u4'), ('pad', '<u4'),
+    ('slot_size', '<u8'),
+    ('published', '<u8')  # Сколько кадров опубликовано, последний - в слоте (published - 1) % slots
+])
+SLOT = np.dtype([
+    ('lock', '<u8'),  # Нечетный - слот записывается
+    ('seq', '<i8'),  # Номер кадра камеры
+    ('time', '<f8'),  # Время захвата кадра
+    ('detected', '<u4'),  # 1 если детекция выполнялась на этом кадре
+    ('markers', '<u4')  # Количество маркеров
+])
+MARKER = np.dtype([('id', '<i4'), ('center', '<f4', 2), ('corners', '<f4', (4, 2))])
+_ALIGN = 64
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _slot_size(max_markers: int, shape) -> int:
+    return (_aligned(SLOT.itemsize) + _aligned(MARKER.itemsize * max_markers)
+            + _aligned(int(np.prod(shape))))
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Подключение к существующей памяти без передачи ее resource_tracker читателя"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name != "nt":
+        # Иначе память удалится при завершении первого же читателя
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class _Layout:
+    """Разметка общей памяти: заголовок, затем слоты (заголовок слота, маркеры, кадр)"""
+
+    def __init__(self, buf, slots: int, max_markers: int, shape):
+        self.header = np.ndarray((), HEADER, buf, 0)
+        self.markers_offset = _aligned(SLOT.itemsize)
+        self.frame_offset = self.markers_offset + _aligned(MARKER.itemsize * max_markers)
+        self.slot_size = _slot_size(max_markers, shape)
+        first = _aligned(HEADER.itemsize)
+        self.slots = [np.ndarray((), SLOT, buf, first + i * self.slot_size) for i in range(slots)]
+        self.markers = [np.ndarray((max_markers,), MARKER, buf, first + i * self.slot_size + self.markers_offset)
+                        for i in range(slots)]
+        self.frames = [np.ndarray(shape, np.uint8, buf, first + i * self.slot_size + self.frame_offset)
+                       for i in range(slots)]
+
+
+class FrameBusWriter:
+    """
+    Публикация кадров и результатов детекции в общую память.
+
+    Кольцо из slots слотов, в каждом - кадр, номер и время захвата и маркеры
+    (id, центр, углы). Слот защищен счетчиком-seqlock: перед записью он
+    становится нечетным, после - четным, а счетчик опубликованных кадров в
+    заголовке увеличивается только после записи. Читатели не блокируют
+    писателя: они проверяют счетчик слота до и после чтения. Память
+    создается под размер первого кадра и пересоздается при его смене
+    (старая помечается закрытой, читатели переподключаются).
+    """
+
+    def __init__(self, name: str = "smartcamera", slots: int = 4, max_markers: int = 256):
+        """
+        Args:
+            name: Имя общей памяти
+            slots: Количество слотов кольца
+            max_markers: Максимум маркеров в слоте (лишние не публикуются)
+        """
+        self.name = name
+        self.slots = slots
+        self.max_markers = max_markers
+        self._shm = None
+        self._layout = None
+        self._shape = None
+        self._slot = None  # Слот, начатый begin и не завершенный commit
+        self.published = 0
+
+    def _create(self, shape):
+        self.close()
+        size = _aligned(HEADER.itemsize) + self.slots * _slot_size(self.max_markers, shape)
+        self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self._layout = _Layout(self._shm.buf, self.slots, self.max_markers, shape)
+        header = self._layout.header
+        header['magic'], header['version'], header['closed'] = MAGIC, VERSION, 0
+        header['slots'], header['max_markers'] = self.slots, self.max_markers
+        header['height'], header['width'] = shape[0], shape[1]
+        header['channels'] = shape[2] if len(shape) == 3 else 1
+        header['slot_size'] = self._layout.slot_size
+        header['published'] = 0
+        self._shape = shape
+        self.published = 0
+
+    def begin(self, seq: int, frame: np.ndarray, capture_time: Optional[float] = None):
+        """
+        Копирование кадра в следующий слот (до рисования поверх кадра)
+
+        Raises:
+            OSError: если общую память не удалось создать
+        """
+        if frame.shape != self._shape:
+            self._create(frame.shape)
+        layout = self._layout
+        self._slot = self.published % self.slots
+        slot = layout.slots[self._slot]
+        slot['lock'] += 1
+        slot['seq'] = seq
+        slot['time'] = capture_time if capture_time is not None else np.nan
+        slot['detected'] = 0
+        slot['markers'] = 0
+        np.copyto(layout.frames[self._slot], frame)
+
+    def commit(self, result: Optional[Dict] = None):
+        """
+        Запись маркеров и публикация слота
+
+        Args:
+            result: Результат detect_markers (None - детекция не выполнялась)
+        """
+        if self._slot is None:
+            return
+        layout = self._layout
+        slot = layout.slots[self._slot]
+        if result is not None:
+            slot['detected'] = 1
+            if result['ids'] is not None:
+                count = min(len(result['ids']), self.max_markers)
+                markers = layout.markers[self._slot][:count]
+                markers['id'] = result['ids'][:count]
+                corners = np.concatenate(result['corners'][:count]).reshape(-1, 4, 2)
+                markers['corners'] = corners
+                markers['center'] = corners.mean(axis=1)
+                slot['markers'] = count
+        slot['lock'] += 1
+        self.published += 1
+        layout.header['published'] = self.published
+        self._slot = None
+
+    def publish(self, seq: int, frame: np.ndarray, capture_time: Optional[float] = None,
+                result: Optional[Dict] = None):
+        """Публикация кадра и результата одним вызовом (кадр без отрисовки)"""
+        self.begin(seq, frame, capture_time)
+        self.commit(result)
+
+    def close(self):
+        """Пометка памяти закрытой и ее удаление"""
+        if self._shm is None:
+            return
+        self._layout.header['closed'] = 1
+        self._layout = None
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+        self._shape = None
+        self._slot = None
+
+
+class FrameBusReader:
+    """
+    Чтение кадров и детекций из общей памяти FrameBusWriter
+
+    read() без копирования возвращает представления numpy прямо в общей
+    памяти: их можно использовать, пока писатель не обойдет кольцо, после
+    обработки нужно проверить is_valid(). read(copy=True) копирует слот и
+    сам повторяет чтение, если слот был перезаписан во время копирования.
+    """
+
+    def __init__(self, name: str = "smartcamera"):
+        """
+        Raises:
+            FileNotFoundError: если писатель еще не создал память
+            ValueError: если память создана другой версией
+        """
+        self.name = name
+        self._shm = _attach(name)
+        header = np.ndarray((), HEADER, self._shm.buf, 0).copy()
+        if header['magic'] != MAGIC or header['version'] != VERSION:
+            self._shm.close()
+            raise ValueError(f"'{name}' is not a frame bus of version {VERSION}")
+        channels = int(header['channels'])
+        shape = (int(header['height']), int(header['width'])) + ((channels,) if channels > 1 else ())
+        self._layout = _Layout(self._shm.buf, int(header['slots']), int(header['max_markers']), shape)
+        self.shape = shape
+        self.last_seq = None
+
+    @property
+    def closed(self) -> bool:
+        """Писатель закрыл или пересоздал память - нужно подключиться заново"""
+        return self._layout is None or bool(self._layout.header['closed'])
+
+    @property
+    def published(self) -> int:
+        return int(self._layout.header['published'])
+
+    def read(self, copy: bool = False, retries: int = 3) -> Optional[Dict]:
+        """
+        Последний опубликованный кадр
+
+        Args:
+            copy: Копировать кадр и маркеры (иначе - представления в общей памяти)
+            retries: Сколько раз повторять чтение перезаписанного слота
+
+        Returns:
+            {'seq', 'time', 'detected', 'frame', 'markers', 'slot', 'lock'} или None, если кадров еще нет
+            или последний кадр уже прочитан
+        """
+        layout = self._layout
+        for _ in range(retries + 1):
+            published = int(layout.header['published'])
+            if published == 0:
+                return None
+            index = (published - 1) % len(layout.slots)
+            slot = layout.slots[index]
+            lock = int(slot['lock'])
+            if lock % 2:
+                continue
+            seq = int(slot['seq'])
+            if seq == self.last_seq:
+                return None
+            count = int(slot['markers'])
+            item = {
+                'seq': seq,
+                'time': float(slot['time']),
+                'detected': bool(slot['detected']),
+                'frame': layout.frames[index].copy() if copy else layout.frames[index],
+                'markers': layout.markers[index][:count].copy() if copy else layout.markers[index][:count],
+                'slot': index,
+                'lock': lock
+            }
+            if not self.is_valid(item):
+                continue
+            self.last_seq = seq
+            return item
+        return None
+
+    def is_valid(self, item: Dict) -> bool:
+        """Слот не перезаписан с момента чтения"""
+        return int(self._layout.slots[item['slot']]['lock']) == item['lock']
+
+    def close(self):
+        """Отключение (представления из read() после этого использовать нельзя)"""
+        if self._shm is None:
+            return
+        self._layout = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # Представления еще живы - память освободится вместе с ними
+        self._shm = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frame bus consumer: rate of frames and markers from shared memory")
+    parser.add_argument("--name", default="smartcamera")
+    parser.add_argument("--show", action="store_true", help="show frames with markers (OpenCV window)")
+    args = parser.parse_args()
+
+    reader = None
+    frames = markers = torn = 0
+    started = time.monotonic()
+    while True:
+        if reader is None or reader.closed:
+            if reader is not None:
+                reader.close()
+                print("Bus closed, waiting for the writer")
+            try:
+                reader = FrameBusReader(args.name)
+                print(f"Attached to '{args.name}': {reader.shape}")
+            except (FileNotFoundError, ValueError):
+                reader = None
+                time.sleep(0.5)
+                continue
+
+        item = reader.read()
+        if item is None:
+            time.sleep(0.002)
+            continue
+        if args.show:
+            import cv2
+            image = item['frame'].copy()
+            for marker in item['markers']:
+                cv2.polylines(image, [marker['corners'].astype(np.int32)], True, (0, 255, 0), 2)
+                cv2.putText(image, str(marker['id']), tuple(int(v) for v in marker['center']),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+            cv2.imshow("Frame bus", image)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+        # Представления используются до проверки - перезаписанный за это время кадр не учитывается
+        if not reader.is_valid(item):
+            torn += 1
+            continue
+        frames += 1
+        markers += len(item['markers'])
+
+        elapsed = time.monotonic() - started
+        if elapsed >= 1.0:
+            print(f"seq {item['seq']}: {frames / elapsed:.1f} fps, {markers / max(frames, 1):.1f} markers/frame, "
+                  f"overwritten while reading {torn}")
+            frames = markers = torn = 0
+            started = time.monotonic()
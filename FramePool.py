@@ -0,0 +1,89 @@
+import threading
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    """
+    Пул заранее выделенных буферов для обработки кадра.
+
+    Все преобразования кадра пишут в одни и те же массивы, поэтому на каждом
+    кадре не выделяется новая память. Буферы пересоздаются только при смене
+    разрешения камеры.
+    """
+
+    SCALE = np.float32(1.0 / 255.0)
+
+    def __init__(self, width: int = 640, height: int = 480, texture: bool = True, capture: bool = True):
+        """
+        Инициализация пула
+
+        Args:
+            width: Ширина кадра
+            height: Высота кадра
+            texture: Выделять буферы для RGB текстуры
+            capture: Выделять буфер кадра камеры (не нужен, если кадры приходят из CaptureThread)
+        """
+        self._lock = threading.Lock()
+        self.with_texture = texture
+        self.with_capture = capture
+        self.width = 0
+        self.height = 0
+        self.capture = None  # Кадр с камеры (BGR, uint8)
+        self.gray = None  # Кадр в оттенках серого для детекции (uint8)
+        self.rgb = None  # Кадр в RGB (uint8)
+        self.texture = None  # Текстура для DearPyGui (RGB, float32, 0.0-1.0)
+        self.resize(width, height)
+
+    def resize(self, width: int, height: int) -> bool:
+        """
+        Пересоздание буферов под новое разрешение
+
+        Returns:
+            True если буферы были пересозданы
+        """
+        if width == self.width and height == self.height:
+            return False
+
+        # Новые буферы создаются целиком и подменяются под блокировкой,
+        # чтобы потребитель никогда не увидел пул в промежуточном состоянии
+        capture = np.zeros((height, width, 3), dtype=np.uint8) if self.with_capture else None
+        gray = np.zeros((height, width), dtype=np.uint8)
+        rgb = np.zeros((height, width, 3), dtype=np.uint8) if self.with_texture else None
+        texture = np.zeros((height, width, 3), dtype=np.float32) if self.with_texture else None
+        with self._lock:
+            self.width, self.height = width, height
+            self.capture, self.gray, self.rgb, self.texture = capture, gray, rgb, texture
+        return True
+
+    def ensure(self, frame: np.ndarray) -> bool:
+        """Подгонка пула под фактический размер кадра"""
+        return self.resize(frame.shape[1], frame.shape[0])
+
+    def read(self, cap: cv2.VideoCapture):
+        """
+        Чтение кадра с камеры в буфер пула (пул с capture=True)
+
+        Returns:
+            (ret, frame) как у cv2.VideoCapture.read
+        """
+        ret, frame = cap.read(self.capture)
+        if ret and frame is not self.capture:
+            # Камера вернула кадр другого размера - перестраиваем пул
+            self.ensure(frame)
+            np.copyto(self.capture, frame)
+            frame = self.capture
+        return ret, frame
+
+    def to_gray(self, frame: np.ndarray) -> np.ndarray:
+        """BGR -> оттенки серого в буфер пула"""
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+
+    def to_texture(self, frame: np.ndarray) -> np.ndarray:
+        """BGR (uint8) -> RGB (float32, 0.0-1.0) в буфер текстуры"""
+        # Перестановка каналов отдельным проходом: умножение по обратному срезу
+        # каналов (frame[..., ::-1]) идет с шагом и втрое медленнее
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        # Приведение к float32 и нормализация за один непрерывный проход
+        np.multiply(self.rgb, self.SCALE, out=self.texture)
+        return self.texture
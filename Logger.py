@@ -0,0 +1,233 @@
+import datetime
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Callable, List, Optional
+
+LEVEL_COLORS = {
+    "INFO": (255, 255, 255),
+    "SUCCESS": (0, 255, 0),
+    "WARNING": (255, 255, 0),
+    "ERROR": (255, 0, 0)
+}
+
+
+class LogBuffer:
+    """
+    Кольцевой буфер сообщений лога фиксированного размера.
+
+    Подряд идущие одинаковые сообщения объединяются в одну запись со
+    счетчиком. Для шумных сообщений можно передать ключ - тогда по этому
+    ключу пропускается не больше burst сообщений за period секунд, а число
+    подавленных добавляется к следующему пропущенному сообщению.
+    """
+
+    def __init__(self, capacity: int = 5000, burst: int = 3, period: float = 10.0, max_length: int = 300):
+        """
+        Инициализация буфера
+
+        Args:
+            capacity: Максимальное количество записей
+            burst: Сколько сообщений с одним ключом пропускать за период
+            period: Период ограничения частоты, с
+            max_length: Максимальная длина сообщения
+        """
+        self.records = deque(maxlen=capacity)  # [time, level, message, count]
+        self.burst = burst
+        self.period = period
+        self.max_length = max_length
+        self.version = 0  # Увеличивается при каждом изменении буфера
+        self.sinks: List[Callable] = []  # sink(timestamp, level, message)
+        self._limits = {}  # {key: [начало окна, сообщений в окне, подавлено]}
+        self._lock = threading.Lock()
+
+    def add(self, message, level: str = "INFO", key: Optional[str] = None) -> bool:
+        """
+        Добавление сообщения
+
+        Args:
+            message: Текст сообщения
+            level: Уровень (INFO, SUCCESS, WARNING, ERROR)
+            key: Ключ ограничения частоты (None - без ограничения)
+
+        Returns:
+            False если сообщение было подавлено ограничением частоты
+        """
+        now = time.time()
+        message = str(message)
+        if len(message) > self.max_length:
+            message = message[:self.max_length] + "..."
+
+        with self._lock:
+            if key is not None:
+                message = self._rate_limit(key, message, now)
+                if message is None:
+                    return False
+
+            last = self.records[-1] if self.records else None
+            if last is not None and last[1] == level and last[2] == message:
+                # Повтор предыдущего сообщения - только счетчик
+                last[0] = now
+                last[3] += 1
+                self.version += 1
+                return True
+
+            if last is not None and last[3] > 1:
+                self._emit(last[0], last[1], f"Previous message repeated {last[3]} times")
+            self.records.append([now, level, message, 1])
+            self.version += 1
+            self._emit(now, level, message)
+            return True
+
+    def _rate_limit(self, key: str, message: str, now: float) -> Optional[str]:
+        limit = self._limits.get(key)
+        if limit is None or now - limit[0] >= self.period:
+            suppressed = limit[2] if limit is not None else 0
+            self._limits[key] = [now, 1, 0]
+            return f"{message} (+{suppressed} suppressed)" if suppressed else message
+        if limit[1] < self.burst:
+            limit[1] += 1
+            return message
+        limit[2] += 1
+        return None
+
+    def _emit(self, timestamp: float, level: str, message: str):
+        for sink in self.sinks:
+            sink(timestamp, level, message)
+
+    def tail(self, count: int, offset: int = 0) -> list:
+        """
+        Последние записи
+
+        Args:
+            count: Количество записей
+            offset: Сколько самых новых записей пропустить (прокрутка назад)
+        """
+        with self._lock:
+            end = max(0, len(self.records) - offset)
+            start = max(0, end - count)
+            return [list(self.records[i]) for i in range(start, end)]
+
+    def clear(self):
+        """Очистка буфера"""
+        with self._lock:
+            self.records.clear()
+            self._limits.clear()
+            self.version += 1
+
+    def __len__(self):
+        return len(self.records)
+
+    @staticmethod
+    def format(record: list) -> str:
+        timestamp, level, message, count = record
+        text = f"[{datetime.datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')}] [{level}] {message}"
+        return f"{text} (x{count})" if count > 1 else text
+
+
+class LogView:
+    """
+    Отображение лога в DearPyGui.
+
+    Создает фиксированное число текстовых виджетов и показывает в них только
+    видимое окно буфера. Обновление выполняется не чаще, чем его вызывают,
+    и только для строк, текст которых изменился.
+    """
+
+    def __init__(self, buffer: LogBuffer, parent: str = "log_window", lines: int = 34):
+        """
+        Args:
+            buffer: Буфер сообщений
+            parent: Тег контейнера для строк
+            lines: Количество видимых строк
+        """
+        self.buffer = buffer
+        self.parent = parent
+        self.lines = lines
+        self.offset = 0  # 0 - показываются самые новые сообщения
+        self._shown = None
+        self._cache = [None] * lines
+
+    def build(self):
+        """Создание виджетов строк"""
+        import dearpygui.dearpygui as dpg
+        for i in range(self.lines):
+            dpg.add_text("", tag=f"log_line_{i}", parent=self.parent)
+        self._shown = None
+        self._cache = [None] * self.lines
+
+    def scroll(self, delta: int):
+        """Прокрутка на delta строк (положительное значение - к старым сообщениям)"""
+        max_offset = max(0, len(self.buffer) - self.lines)
+        self.offset = min(max_offset, max(0, self.offset + delta))
+
+    def flush(self, force: bool = False):
+        """Перенос изменений буфера в виджеты"""
+        import dearpygui.dearpygui as dpg
+        if not dpg.does_item_exist(self.parent):
+            return
+        if not force and not dpg.is_item_visible(self.parent):
+            return
+        state = (self.buffer.version, self.offset)
+        if state == self._shown:
+            return
+        self._shown = state
+
+        records = self.buffer.tail(self.lines, self.offset)
+        for i in range(self.lines):
+            if i < len(records):
+                line = (LogBuffer.format(records[i]), LEVEL_COLORS.get(records[i][1], (255, 255, 255)))
+            else:
+                line = ("", (255, 255, 255))
+            if line != self._cache[i]:
+                dpg.configure_item(f"log_line_{i}", default_value=line[0], color=line[1])
+                self._cache[i] = line
+
+
+class RotatingFileSink:
+    """
+    Запись лога в файл с ротацией в фоновом потоке
+    """
+
+    LEVELS = {"INFO": logging.INFO, "SUCCESS": logging.INFO, "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+
+    def __init__(self, path: str = "smartcamera.log", max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5):
+        """
+        Args:
+            path: Путь к файлу лога
+            max_bytes: Размер файла, после которого выполняется ротация
+            backup_count: Сколько старых файлов хранить
+        """
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        self._listener = QueueListener(self._queue, handler)
+        self._handler = handler
+        self.running = False
+
+    def start(self):
+        if not self.running:
+            self._listener.start()
+            self.running = True
+
+    def stop(self):
+        if self.running:
+            self._listener.stop()
+            self._handler.close()
+            self.running = False
+
+    def write(self, timestamp: float, level: str, message: str):
+        """Постановка записи в очередь (вызывается из любого потока)"""
+        if not self.running:
+            return
+        self._queue.put(logging.makeLogRecord({
+            'created': timestamp,
+            'msecs': (timestamp % 1) * 1000,
+            'levelname': level,
+            'levelno': self.LEVELS.get(level, logging.INFO),
+            'msg': message
+        }))
@@ -0,0 +1,141 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+from Profiler import profiler
+
+
+class LoopTask:
+    """Задача главного цикла со своей частотой"""
+
+    def __init__(self, name: str, func: Callable, rate: float, on_event: bool = False, show_in_status: bool = True):
+        """
+        Args:
+            name: Имя задачи
+            func: Функция без аргументов
+            rate: Целевая частота, Гц
+            on_event: Запускать только после события (например, прихода кадра),
+                      но не чаще rate
+            show_in_status: Выводить частоту задачи в строке состояния цикла
+                            (служебные задачи ее только загромождают)
+        """
+        self.name = name
+        self.func = func
+        self.on_event = on_event
+        self.show_in_status = show_in_status
+        self.period = 1.0 / rate
+        self.deadline = 0.0
+        self.pending = False
+
+        # Статистика
+        self.runs = 0
+        self.missed = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self._window_start = time.monotonic()
+        self._window_runs = 0
+        self.rate = 0.0  # Фактическая частота, Гц
+
+    @property
+    def target_rate(self) -> float:
+        return 1.0 / self.period
+
+    @target_rate.setter
+    def target_rate(self, rate: float):
+        self.period = 1.0 / rate
+
+
+class LoopScheduler:
+    """
+    Планировщик главного цикла.
+
+    Каждая задача (обработка кадра, отрисовка интерфейса, отправка пакетов)
+    запускается на своей частоте по монотонным дедлайнам. Между дедлайнами
+    поток спит на событии, которое будит его раньше при приходе нового кадра.
+    Опоздание задачи больше чем на период считается пропущенным дедлайном.
+    """
+
+    def __init__(self):
+        self.tasks = []
+        self._wake = threading.Event()
+        self.idle_time = 0.0  # Суммарное время ожидания, с
+
+    def add_task(self, name: str, func: Callable, rate: float, on_event: bool = False,
+                 show_in_status: bool = True) -> LoopTask:
+        """Добавление задачи"""
+        task = LoopTask(name, func, rate, on_event, show_in_status)
+        self.tasks.append(task)
+        return task
+
+    def get_task(self, name: str) -> Optional[LoopTask]:
+        for task in self.tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def notify(self):
+        """Событие для задач on_event (можно вызывать из любого потока)"""
+        self._wake.set()
+
+    def run_once(self):
+        """Запуск всех задач, у которых наступил дедлайн, и ожидание следующего"""
+        if self._wake.is_set():
+            self._wake.clear()
+            for task in self.tasks:
+                if task.on_event:
+                    task.pending = True
+
+        for task in self.tasks:
+            now = time.monotonic()
+            if now < task.deadline or (task.on_event and not task.pending):
+                continue
+
+            if not task.on_event and task.deadline and now - task.deadline > task.period:
+                task.missed += int((now - task.deadline) / task.period)
+            task.pending = False
+            with profiler.span(task.name):
+                task.func()
+
+            finished = time.monotonic()
+            task.last_duration = finished - now
+            task.max_duration = max(task.max_duration, task.last_duration)
+            task.runs += 1
+            self._update_rate(task, finished)
+
+            # Следующий дедлайн по сетке, без накопления опозданий
+            task.deadline = task.deadline + task.period if task.deadline else now + task.period
+            if task.deadline < finished:
+                task.deadline = finished + task.period
+
+        self._wait()
+
+    def _wait(self):
+        now = time.monotonic()
+        deadlines = [task.deadline for task in self.tasks if not task.on_event or task.pending]
+        timeout = max(0.0, min(deadlines) - now) if deadlines else 0.1
+        if timeout > 0:
+            self._wake.wait(timeout)
+            self.idle_time += time.monotonic() - now
+
+    @staticmethod
+    def _update_rate(task: LoopTask, now: float):
+        task._window_runs += 1
+        elapsed = now - task._window_start
+        if elapsed >= 1.0:
+            task.rate = task._window_runs / elapsed
+            task._window_start = now
+            task._window_runs = 0
+
+    def get_stats(self) -> Dict:
+        """Статистика задач: частота, пропущенные дедлайны, длительность"""
+        return {
+            task.name: {
+                'rate': task.rate,
+                'target_rate': task.target_rate,
+                'show_in_status': task.show_in_status,
+                'runs': task.runs,
+                'missed': task.missed,
+                'last_duration': task.last_duration,
+                'max_duration': task.max_duration
+            }
+            for task in self.tasks
+        }
@@ -0,0 +1,243 @@
+import bisect
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+import Packet
+
+DETECT_BUCKETS = (0.002, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.2, 0.5)
+MARKER_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами (как histogram в Prometheus)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str) -> List[str]:
+        counts = list(self.counts)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum {self.sum}")
+        lines.append(f"{name}_count {cumulative}")
+        return lines
+
+
+class FrameMetrics:
+    """Счетчики обработки кадров, обновляемые главным циклом"""
+
+    def __init__(self):
+        self.detect_latency = Histogram(DETECT_BUCKETS)
+        self.markers = Histogram(MARKER_BUCKETS)
+
+    def observe(self, detect_seconds: float, markers: int):
+        self.detect_latency.observe(detect_seconds)
+        self.markers.observe(markers)
+
+
+def process_rss() -> Optional[int]:
+    """Текущий объем резидентной памяти процесса, байт"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return None
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    import resource
+    # macOS: ru_maxrss в байтах (пиковое значение)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class MetricsCollector:
+    """
+    Формирование метрик в текстовом формате Prometheus.
+
+    Вызывается из потока HTTP сервера и только читает готовые счетчики
+    детектора, отправителя UDP, потока захвата и главного цикла - своего
+    состояния между запросами нет, поэтому значения не зависят от частоты
+    и числа опрашивающих.
+    """
+
+    def __init__(self, frames: FrameMetrics):
+        self.frames = frames
+
+    def collect(self, detector, udp_sender, destinations: list, log_buffer, capture=None, scheduler=None,
+                motion_gate=None, calibration: Optional[Dict] = None, markers: Optional[List[Dict]] = None) -> str:
+        """
+        Args:
+            detector: ArucoMarkerDetector
+            udp_sender: UdpSender
+            destinations: Адреса назначения UDP
+            log_buffer: LogBuffer
+            capture: CaptureThread (None - камера не запущена)
+            scheduler: LoopScheduler
+            motion_gate: MotionGate
+            calibration: Текущая калибровка
+            markers: Маркеры последнего кадра
+        """
+        lines = []
+
+        def family(name: str, kind: str, help_text: str, samples: List[str]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        # Захват: частота - скользящая за секунду из потока захвата, для rate() - счетчик кадров
+        fps = capture.fps if capture is not None else 0.0
+        family("smartcamera_capture_fps", "gauge", "Camera frames per second over the last second",
+               [f"smartcamera_capture_fps {fps:.3f}"])
+        family("smartcamera_frames_captured_total", "counter", "Frames read from the camera",
+               [f"smartcamera_frames_captured_total {capture.frames if capture is not None else 0}"])
+        family("smartcamera_capture_failures_total", "counter", "Failed camera reads",
+               [f"smartcamera_capture_failures_total {capture.failures if capture is not None else 0}"])
+
+        # Детекция
+        stats = detector.detection_stats
+        family("smartcamera_detect_frames_total", "counter", "Frames passed to the detector",
+               [f"smartcamera_detect_frames_total {stats['total_frames']}"])
+        family("smartcamera_detect_frames_with_markers_total", "counter", "Frames with at least one marker",
+               [f"smartcamera_detect_frames_with_markers_total {stats['detected_frames']}"])
+        family("smartcamera_markers_detected_total", "counter", "Markers detected over all frames",
+               [f"smartcamera_markers_detected_total {stats['total_markers']}"])
+        if motion_gate is not None:
+            family("smartcamera_detect_mode_total", "counter",
+                   "Frames by detection mode: full, partial (changed regions only), reused", [
+                f'smartcamera_detect_mode_total{{mode="{mode}"}} {count}' for mode, count in motion_gate.stats.items()
+            ])
+        family("smartcamera_detect_latency_seconds", "histogram", "Marker detection time per frame",
+               self.frames.detect_latency.samples("smartcamera_detect_latency_seconds"))
+        family("smartcamera_markers_per_frame", "histogram", "Markers detected per frame",
+               self.frames.markers.samples("smartcamera_markers_per_frame"))
+
+        # Позиции
+        if calibration:
+            occupancy = Packet.get_zones_occupancy(calibration, markers or [])
+            family("smartcamera_zone_occupied", "gauge", "1 if a marker is inside the calibrated position", [
+                f'smartcamera_zone_occupied{{zone="{i}",line="{calibration[str(i)]["line_attachment"]}"}} {int(occupied)}'
+                for i, occupied in enumerate(occupancy)
+            ])
+
+        # UDP
+        udp = udp_sender.get_stats()
+        family("smartcamera_udp_packets_sent_total", "counter", "UDP datagrams sent", [
+            f'smartcamera_udp_packets_sent_total{{destination="{d.name}"}} {d.stats["sent"]}' for d in destinations
+        ])
+        family("smartcamera_udp_packets_failed_total", "counter", "UDP datagrams that failed to send", [
+            f'smartcamera_udp_packets_failed_total{{destination="{d.name}"}} {d.stats["failed"]}' for d in destinations
+        ])
+        family("smartcamera_udp_packets_dropped_total", "counter", "Packets dropped from the full send queue",
+               [f"smartcamera_udp_packets_dropped_total {udp['dropped']}"])
+        family("smartcamera_udp_queue_depth", "gauge", "Packets waiting to be sent",
+               [f"smartcamera_udp_queue_depth {udp['pending']}"])
+
+        # Главный цикл
+        if scheduler is not None:
+            tasks = scheduler.get_stats()
+            family("smartcamera_loop_rate_hz", "gauge", "Actual rate of main loop tasks",
+                   [f'smartcamera_loop_rate_hz{{task="{name}"}} {task["rate"]:.3f}' for name, task in tasks.items()])
+            family("smartcamera_loop_missed_deadlines_total", "counter", "Missed main loop deadlines",
+                   [f'smartcamera_loop_missed_deadlines_total{{task="{name}"}} {task["missed"]}'
+                    for name, task in tasks.items()])
+
+        # Процесс
+        family("smartcamera_log_buffer_records", "gauge", "Records in the in-memory log buffer",
+               [f"smartcamera_log_buffer_records {len(log_buffer)}"])
+        rss = process_rss()
+        if rss is not None:
+            family("process_resident_memory_bytes", "gauge", "Resident memory size in bytes",
+                   [f"process_resident_memory_bytes {rss}"])
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    HTTP сервер метрик на localhost (GET /metrics) в отдельном потоке
+    """
+
+    def __init__(self, collect: Callable[[], str], host: str = "127.0.0.1", port: int = 9108):
+        """
+        Args:
+            collect: Функция, возвращающая метрики в текстовом формате Prometheus
+            host: Адрес для прослушивания
+            port: Порт
+        """
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    def start(self):
+        """
+        Запуск сервера
+
+        Raises:
+            OSError: если порт занят
+        """
+        if self.running:
+            return
+        collect = self.collect
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = collect().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
@@ -0,0 +1,174 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+Rect = Tuple[int, int, int, int]
+
+
+def zones_from_calibration(calibration: Dict, margin: float = 1.0) -> List[Rect]:
+    """
+    Области позиций калибровки в пикселях кадра
+
+    Args:
+        calibration: Калибровка позиций
+        margin: Запас вокруг круга позиции в размерах маркера
+    """
+    zones = []
+    for key, zone in calibration.items():
+        if key == "width" or key == "height":
+            continue
+        radius = zone['size'] / 2 * zone['tolerance'] + zone['size'] * margin
+        cx, cy = zone['center']
+        zones.append((int(cx - radius), int(cy - radius), int(cx + radius) + 1, int(cy + radius) + 1))
+    return zones
+
+
+def merge_rects(rects: List[Rect]) -> List[Rect]:
+    """Объединение пересекающихся прямоугольников, пока пересечений не останется"""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+class MotionGate:
+    """
+    Пропуск детекции на неподвижных кадрах.
+
+    Кадр сильно уменьшается, переводится в оттенки серого и сравнивается с
+    уменьшенным кадром последней детекции: целиком (смена освещения, сдвиг
+    камеры - полная детекция), по пикселям (появившийся или убранный маркер) и
+    по каждой позиции калибровки (слабые изменения там, где они важны). Если
+    ничего не изменилось, используется предыдущий результат; если изменились
+    отдельные места - детекция идет только в них. Раз в refresh_interval
+    секунд детекция выполняется по всему кадру в любом случае.
+    """
+
+    def __init__(self,
+                 scale: int = 8,
+                 pixel_threshold: float = 20,
+                 zone_threshold: float = 3.0,
+                 global_threshold: float = 12.0,
+                 max_area: float = 0.5,
+                 margin: int = 48,
+                 refresh_interval: float = 1.0):
+        """
+        Args:
+            scale: Во сколько раз уменьшается кадр для сравнения
+            pixel_threshold: Изменение яркости пикселя уменьшенного кадра, считающееся движением
+            zone_threshold: Среднее изменение яркости в области позиции, считающееся движением
+            global_threshold: Среднее изменение яркости всего кадра, после которого нужна полная детекция
+            max_area: Доля площади кадра, после которой детекция по областям не выгоднее полной
+            margin: Запас вокруг изменившегося места в пикселях кадра (не меньше размера маркера)
+            refresh_interval: Максимальный интервал между полными детекциями, с
+        """
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.zone_threshold = zone_threshold
+        self.global_threshold = global_threshold
+        self.max_area = max_area
+        self.margin = margin
+        self.refresh_interval = refresh_interval
+
+        self.zones: List[Rect] = []
+        self.zones_version = None
+        self.reference = None  # Уменьшенный кадр последней детекции
+        self.result = None  # Последний результат детекции
+        self.last_full = 0.0
+        self.stats = {'full': 0, 'partial': 0, 'reused': 0}
+
+    def set_zones(self, calibration: Dict, version=None):
+        self.zones = zones_from_calibration(calibration)
+        self.zones_version = version
+
+    def reset(self):
+        """Следующий кадр пройдет полную детекцию"""
+        self.reference = None
+        self.result = None
+
+    def changed_regions(self, small: np.ndarray, width: int, height: int) -> Optional[List[Rect]]:
+        """
+        Изменившиеся области относительно кадра последней детекции
+
+        Returns:
+            None - нужна полная детекция, [] - кадр не изменился, иначе [(x0, y0, x1, y1), ...] в пикселях кадра
+        """
+        diff = cv2.absdiff(small, self.reference)
+        if diff.mean() > self.global_threshold:
+            return None
+
+        mask = (diff > self.pixel_threshold).astype(np.uint8)
+        for x0, y0, x1, y1 in self.zones:
+            x0, y0 = max(0, x0 // self.scale), max(0, y0 // self.scale)
+            x1, y1 = x1 // self.scale + 1, y1 // self.scale + 1
+            zone = diff[y0:y1, x0:x1]
+            if zone.size and zone.mean() > self.zone_threshold:
+                mask[y0:y1, x0:x1] = 1
+        if not mask.any():
+            return []
+
+        count, _, components, _ = cv2.connectedComponentsWithStats(mask)
+        rects = []
+        for x, y, w, h, _ in components[1:count]:
+            rects.append((max(0, x * self.scale - self.margin), max(0, y * self.scale - self.margin),
+                          min(width, (x + w) * self.scale + self.margin), min(height, (y + h) * self.scale + self.margin)))
+        rects = merge_rects(rects)
+        if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects) > self.max_area * width * height:
+            return None
+        return rects
+
+    def detect(self, detector, image: np.ndarray, now: float, estimate_pose: bool = False, draw: bool = False,
+               gray: Optional[np.ndarray] = None, force: bool = False) -> Dict:
+        """
+        Детекция с пропуском неизменившихся частей кадра
+
+        Args:
+            detector: ArucoMarkerDetector
+            image: BGR кадр
+            now: Текущее время (time.monotonic), для интервала полной детекции
+            estimate_pose: Оценивать позу маркера
+            draw: Отрисовывать маркеры на кадре
+            gray: Буфер для оттенков серого
+            force: Полная детекция независимо от изменений
+
+        Returns:
+            Результат как у detect_markers
+        """
+        height, width = image.shape[:2]
+        small = cv2.resize(image, (width // self.scale, height // self.scale), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        regions = None
+        if (not force and self.result is not None and self.reference is not None
+                and self.reference.shape == small.shape and now - self.last_full < self.refresh_interval):
+            regions = self.changed_regions(small, width, height)
+
+        if regions is None:
+            result = detector.detect_markers(image, estimate_pose=estimate_pose, draw=draw, gray=gray)
+            self.last_full = now
+            self.stats['full'] += 1
+        else:
+            result = detector.detect_markers_in_regions(image, regions, self.result, estimate_pose=estimate_pose,
+                                                        draw=draw, gray=gray)
+            self.stats['partial' if regions else 'reused'] += 1
+        # Эталон обновляется только там, где прошла детекция: медленные изменения
+        # в остальных местах накапливаются, пока не превысят порог
+        if regions is None:
+            self.reference = small
+        for x0, y0, x1, y1 in regions or ():
+            x0, y0 = -(-x0 // self.scale), -(-y0 // self.scale)
+            self.reference[y0:y1 // self.scale, x0:x1 // self.scale] = small[y0:y1 // self.scale, x0:x1 // self.scale]
+        self.result = result
+        return result
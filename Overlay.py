@@ -0,0 +1,109 @@
+import numpy as np
+import TextureDrawer
+
+
+class ZoneOverlay:
+    """
+    Кэшированный слой разметки зон калибровки.
+
+    Окружности и подписи зон рисуются один раз при изменении калибровки,
+    а на каждом кадре выполняется только перекраска зон, у которых поменялась
+    занятость, и одно наложение слоя на кадр.
+    """
+
+    FREE_COLOR = (255, 0, 0)
+    OCCUPIED_COLOR = (0, 255, 0)
+    LABEL_COLOR = (255, 0, 255)
+
+    def __init__(self):
+        self.version = None
+        self.shape = None
+        self.scale = 1.0
+        self.layer = None  # RGB слой (h, w, 3) float32, 0.0-1.0
+        self.mask = None  # Маска пикселей слоя (h, w, 1) bool
+        self.zones = []  # [(ys, xs), ...] пиксели окружности каждой зоны
+        self.occupancy = []  # Последняя отрисованная занятость зон
+
+    def is_valid(self, version, shape, scale: float = 1.0) -> bool:
+        """Слой построен для этой версии калибровки, размера кадра и масштаба"""
+        return (self.layer is not None and self.version == version
+                and self.shape == tuple(shape[:2]) and self.scale == scale)
+
+    def rebuild(self, calibration: dict, version, shape, scale: float = 1.0):
+        """
+        Отрисовка геометрии зон и подписей в кэш
+
+        Args:
+            calibration: Словарь калибровки
+            version: Версия калибровки, для которой строится слой
+            shape: Размер кадра (h, w, ...)
+            scale: Масштаб слоя относительно кадра, по которому делалась калибровка
+        """
+        height, width = shape[:2]
+        self.layer = np.zeros((height, width, 3), dtype=np.float32)
+        self.zones = []
+
+        ring_mask = np.zeros((height, width), dtype=bool)
+        positions = [
+            {
+                'center': [calibration[str(i)]['center'][0] * scale, calibration[str(i)]['center'][1] * scale],
+                'size': calibration[str(i)]['size'] * scale,
+                'tolerance': calibration[str(i)]['tolerance'],
+                'id': calibration[str(i)]['id']
+            }
+            for i in range(len(calibration) - 2)
+        ]
+
+        # Окружности рисуются в маленькие холсты, чтобы получить пиксели каждой зоны
+        for zone in positions:
+            radius = zone['size'] / 2 * zone['tolerance']
+            r = int(radius)
+            canvas = np.zeros((2 * r + 1, 2 * r + 1, 3), dtype=np.float32)
+            TextureDrawer.TextureDrawer(canvas, copy=False).draw_circle(r, r, radius, [255, 255, 255], thickness=2)
+
+            ys, xs = np.nonzero(canvas[:, :, 0])
+            ys += int(zone['center'][1]) - r
+            xs += int(zone['center'][0]) - r
+            inside = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+            ys, xs = ys[inside], xs[inside]
+            ring_mask[ys, xs] = True
+            self.zones.append((ys, xs))
+
+        # Подписи рисуются поверх окружностей и не перекрашиваются
+        drawer = TextureDrawer.TextureDrawer(self.layer, copy=False)
+        for zone in positions:
+            radius = zone['size'] / 2 * zone['tolerance']
+            drawer.draw_text(
+                zone['center'][0] - radius,
+                zone['center'][1] - radius,
+                zone['id'],
+                self.LABEL_COLOR,
+                scale=int(zone['size'] * zone['tolerance'] / 8 / 5)
+            )
+        label_mask = self.layer.any(axis=2)
+
+        for i, (ys, xs) in enumerate(self.zones):
+            keep = ~label_mask[ys, xs]
+            self.zones[i] = (ys[keep], xs[keep])
+
+        self.mask = (ring_mask | label_mask)[:, :, np.newaxis]
+        self.occupancy = [None] * len(self.zones)
+        self.version = version
+        self.shape = (height, width)
+        self.scale = scale
+
+    def update(self, occupancy: list):
+        """Перекраска только тех зон, у которых изменилась занятость"""
+        free = np.array(self.FREE_COLOR, dtype=np.float32) / 255.0
+        occupied = np.array(self.OCCUPIED_COLOR, dtype=np.float32) / 255.0
+        for i, is_occupied in enumerate(occupancy[:len(self.zones)]):
+            if self.occupancy[i] == is_occupied:
+                continue
+            ys, xs = self.zones[i]
+            self.layer[ys, xs] = occupied if is_occupied else free
+            self.occupancy[i] = is_occupied
+
+    def apply(self, frame: np.ndarray) -> np.ndarray:
+        """Наложение слоя на кадр (RGB float32, 0.0-1.0) на месте"""
+        np.copyto(frame, self.layer, where=self.mask)
+        return frame
@@ -0,0 +1,78 @@
+import ipaddress
+from typing import Dict, List
+
+LINES = [f"L{i}" for i in range(1, 7)]
+
+
+def point_in_circle(cx, cy, r, px, py):
+    squared_distance = (px - cx) ** 2 + (py - cy) ** 2
+    return squared_distance <= r * r
+
+
+def find_key(calibration: Dict, _id):
+    """Ключ позиции калибровки по ее id"""
+    for key in calibration:
+        if key == "width" or key == "height":
+            continue
+        if calibration[key]['id'] == str(_id):
+            return key
+    return None
+
+
+def get_zones_occupancy(calibration: Dict, markers: List[Dict]) -> List[bool]:
+    """Занятость каждой откалиброванной позиции маркером"""
+    occupancy = []
+    for i in range(len(calibration) - 2):
+        zone = calibration[str(i)]
+        radius = zone['size'] / 2 * zone['tolerance']
+        occupancy.append(any(
+            point_in_circle(zone['center'][0], zone['center'][1], radius, marker['center'][0], marker['center'][1])
+            for marker in markers
+        ))
+    return occupancy
+
+
+def get_marker_in_circle(calibration: Dict, markers: List[Dict], number_circle):
+    """ID маркера в области позиции (0 если позиция пуста)"""
+    zone = calibration[str(find_key(calibration, number_circle))]
+    radius = zone['size'] / 2 * zone['tolerance']
+    for marker in markers:
+        if point_in_circle(zone['center'][0], zone['center'][1], radius, marker['center'][0], marker['center'][1]):
+            return marker['id']
+    return 0
+
+
+def generate_packet(calibration: Dict, markers: List[Dict], line: str) -> str:
+    """Значения позиций, привязанных к линии"""
+    array = list()
+    for obj in calibration:
+        if obj == "width" or obj == "height":
+            continue
+        if calibration[obj]['line_attachment'] == line:
+            array.append(str(get_marker_in_circle(calibration, markers, obj))) #Определение метки в окружности
+
+    return ','.join(array) if len(array) > 0 else "0"
+
+
+def is_valid_ip(ip) -> bool:
+    """IPv4 адрес камеры, из которого можно собрать пакет (a.b.c.d)"""
+    if not isinstance(ip, str):
+        return False
+    try:
+        ipaddress.IPv4Address(ip)
+    except ValueError:
+        return False
+    return True
+
+
+def build_packet(calibration: Dict, markers: List[Dict], ip: str) -> str:
+    """
+    Формирование пакета для ControlCenter
+
+    Args:
+        calibration: Калибровка позиций
+        markers: Найденные маркеры (markers_info из detect_markers)
+        ip: IP камеры (проверенный is_valid_ip), в пакет идет последний октет
+    """
+    lines = [generate_packet(calibration, markers, line) for line in LINES]
+    return f"C:{ip.split('.')[3]}:0:{':'.join(lines)}:0#"
@@ -0,0 +1,73 @@
+import time
+from typing import Dict, Optional
+
+
+class PacketScheduler:
+    """
+    Планировщик отправки пакетов в ControlCenter.
+
+    Пакет отправляется сразу при изменении (но не чаще min_gap) и повторяется
+    как heartbeat не реже max_interval. Одинаковые пакеты между heartbeat
+    не отправляются. Время считается по монотонным часам.
+    """
+
+    def __init__(self, min_gap: float = 0.05, max_interval: float = 1.0):
+        """
+        Инициализация планировщика
+
+        Args:
+            min_gap: Минимальный интервал между пакетами, с
+            max_interval: Максимальный интервал между пакетами (heartbeat), с
+        """
+        self.min_gap = min_gap
+        self.max_interval = max_interval
+        self.last_packet = None
+        self.last_sent = None
+
+        # Статистика
+        self.stats = {
+            'changes': 0,
+            'heartbeats': 0,
+            'deduplicated': 0,
+            'debounced': 0
+        }
+
+    def poll(self, packet: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        Проверка, нужно ли отправить пакет сейчас
+
+        Args:
+            packet: Текущий пакет
+            now: Текущее время (time.monotonic)
+
+        Returns:
+            Причина отправки ("change" или "heartbeat") или None
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = None if self.last_sent is None else now - self.last_sent
+
+        if packet != self.last_packet:
+            if elapsed is not None and elapsed < self.min_gap:
+                # Изменение уйдет на следующем вызове после истечения min_gap
+                self.stats['debounced'] += 1
+                return None
+            reason = "change"
+        elif elapsed >= self.max_interval:
+            reason = "heartbeat"
+        else:
+            self.stats['deduplicated'] += 1
+            return None
+
+        self.last_packet = packet
+        self.last_sent = now
+        self.stats['changes' if reason == "change" else 'heartbeats'] += 1
+        return reason
+
+    def reset(self):
+        """Сброс состояния (следующий пакет уйдет сразу)"""
+        self.last_packet = None
+        self.last_sent = None
+
+    def get_stats(self) -> Dict:
+        """Получение статистики планировщика"""
+        return self.stats.copy()
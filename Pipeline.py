@@ -0,0 +1,259 @@
+import time
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import Aruco
+import Packet
+from FramePool import FrameBufferPool
+from MotionGate import MotionGate
+from Profiler import profiler
+from UdpSender import UdpSender
+import config
+
+
+class FramePipeline:
+    """
+    Обработка кадра без интерфейса.
+
+    Общая часть программы (func.py) и работы без окна (headless.py):
+    настройка детектора под калибровку, детекция с пропуском неподвижных
+    кадров, замер для метрик, поток детекций, публикация в общую память и
+    отправка пакетов. Интерфейс поверх этого только показывает кадр и
+    управляет настройками. Настройки - атрибуты, их меняют галочки
+    интерфейса или файл настроек.
+
+    Поток детекций, общая память и метрики создаются (и их модули
+    импортируются) только при первом включении - пока они выключены,
+    запуск программы за них не платит.
+    """
+
+    def __init__(self,
+                 dict_type: str = "aruco_original",
+                 log: Optional[Callable[..., None]] = None,
+                 detection_port: int = config.DETECTION_SERVER_PORT,
+                 frame_bus_name: str = config.FRAME_BUS_NAME):
+        """
+        Args:
+            dict_type: Словарь маркеров
+            log: Запись в лог: log(message, level)
+            detection_port: Порт потока детекций
+            frame_bus_name: Имя общей памяти для кадров
+        """
+        self.log = log or (lambda message, level="INFO": None)
+        self.detector = Aruco.ArucoMarkerDetector(dict_type=dict_type)
+        self.motion_gate = MotionGate(**config.MOTION_GATE)
+        self.frame_pool = FrameBufferPool(texture=False, capture=False)
+        self.udp_sender = UdpSender()
+        self.detection_port = detection_port
+        self.frame_bus_name = frame_bus_name
+
+        # Создаются при первом включении
+        self.detection_server = None
+        self.frame_bus = None
+        self.frame_metrics = None
+        self.metrics_collector = None
+
+        # Настройки
+        self.motion_gate_enabled = config.motion_gate_enabled
+        self.calibrated_detector = config.calibrated_detector
+        self.reduced_dictionary = config.reduced_dictionary
+        self.marker_ids = list(config.MARKER_IDS)
+        self.frame_bus_enabled = config.frame_bus_enabled
+
+        self.calibration = {}
+        self.calibration_version = 0
+        self._params_key = None  # Калибровка и настройки, под которые настроен детектор (None - по умолчанию)
+        self.capture_time = None  # Время захвата кадра последней детекции
+        self.packet_seq = 0
+
+    def set_dict_type(self, dict_type: str):
+        """Смена словаря маркеров (детектор пересоздается)"""
+        if self.detector.dict_type == dict_type:
+            return
+        self.detector = Aruco.ArucoMarkerDetector(dict_type=dict_type)
+        self._params_key = None
+        self.motion_gate.reset()
+
+    def set_calibration(self, calibration: Dict):
+        """Замена калибровки"""
+        self.calibration = calibration
+        self.calibration_changed()
+
+    def calibration_changed(self):
+        """Отметить изменение калибровки (в том числе на месте: допуски, линии, номера позиций)"""
+        self.calibration_version += 1
+
+    def set_frame_bus(self, enabled: bool, name: Optional[str] = None):
+        """Включение/выключение общей памяти, смена ее имени (память создается на первом кадре)"""
+        if name is not None:
+            self.frame_bus_name = name
+        if self.frame_bus is not None and (not enabled or self.frame_bus.name != self.frame_bus_name):
+            self.frame_bus.close()
+            self.frame_bus.name = self.frame_bus_name
+        self.frame_bus_enabled = enabled
+
+    def start_detection_server(self):
+        """
+        Запуск потока детекций (сервер создается при первом запуске)
+
+        Raises:
+            OSError: если порт занят
+        """
+        if self.detection_server is None:
+            from DetectionServer import DetectionServer
+            self.detection_server = DetectionServer(port=self.detection_port)
+        self.detection_server.start()
+
+    def stop_detection_server(self):
+        if self.detection_server is not None:
+            self.detection_server.stop()
+
+    @property
+    def detection_server_running(self) -> bool:
+        return self.detection_server is not None and self.detection_server.running
+
+    def start_metrics(self):
+        """Начало замера кадров для /metrics (до этого замер не ведется)"""
+        if self.metrics_collector is None:
+            from Metrics import FrameMetrics, MetricsCollector
+            self.frame_metrics = FrameMetrics()
+            self.metrics_collector = MetricsCollector(self.frame_metrics)
+
+    def reset(self):
+        """Следующий кадр пройдет полную детекцию"""
+        self.motion_gate.reset()
+
+    def stop(self):
+        """Камера остановлена: сброс пропуска детекции и удаление общей памяти"""
+        self.motion_gate.reset()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+
+    def close(self):
+        self.udp_sender.stop()
+        self.stop_detection_server()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+
+    def update_detector_params(self, calibrating: bool = False):
+        """Настройка детектора под текущую калибровку (при ее смене или смене настроек)"""
+        # Во время калибровки размеры маркеров еще неизвестны - весь словарь и параметры по умолчанию
+        key = None if calibrating else (self.calibration_version, self.calibrated_detector,
+                                        self.reduced_dictionary, tuple(self.marker_ids))
+        if key == self._params_key:
+            return
+        self._params_key = key
+        params = None
+        if key is not None and self.calibrated_detector:
+            params = self.detector.calibrated_parameters(self.calibration, config.detector_size_margin)
+        self.detector.set_detector_params(params)
+        if params is not None:
+            self.log(f"Detector tuned to calibration: perimeter {params.minMarkerPerimeterRate:.3f}-"
+                     f"{params.maxMarkerPerimeterRate:.3f}, threshold window {params.adaptiveThreshWinSizeMin}-"
+                     f"{params.adaptiveThreshWinSizeMax}")
+
+        ids = set()
+        if key is not None and self.reduced_dictionary:
+            ids = set(self.marker_ids) | set(self.detector.known_markers)
+        count = self.detector.restrict_ids(ids)
+        if ids:
+            self.log(f"Detector searches {count} marker IDs: {', '.join(map(str, sorted(ids)))}")
+
+    def process(self,
+                seq: int,
+                frame: np.ndarray,
+                capture_time: Optional[float] = None,
+                detect: bool = True,
+                estimate_pose: bool = False,
+                draw: bool = False,
+                calibrating: bool = False) -> Optional[Dict]:
+        """
+        Обработка кадра
+
+        Args:
+            seq: Номер кадра
+            frame: BGR кадр (с draw маркеры рисуются прямо в него)
+            capture_time: Время захвата кадра (time.time)
+            detect: Выполнять детекцию (без нее кадр только публикуется в общую память)
+            estimate_pose: Оценивать позу маркера
+            draw: Отрисовывать маркеры на кадре
+            calibrating: Идет калибровка - параметры по умолчанию и полная детекция каждого кадра
+
+        Returns:
+            Результат detect_markers с 'capture_time' или None, если детекция не выполнялась
+        """
+        self.frame_pool.ensure(frame)
+        if self.frame_bus_enabled:
+            if self.frame_bus is None:
+                from FrameBus import FrameBusWriter
+                self.frame_bus = FrameBusWriter(self.frame_bus_name, config.frame_bus_slots)
+            # Кадр копируется в общую память до отрисовки маркеров, слот публикуется после детекции
+            try:
+                self.frame_bus.begin(seq, frame, capture_time)
+            except OSError as e:
+                self.frame_bus_enabled = False
+                self.log(f"Frame bus error: {e}", "ERROR")
+
+        result = None
+        if detect:
+            self.update_detector_params(calibrating)
+            detect_started = time.perf_counter()
+            with profiler.span("detect"):
+                if self.motion_gate_enabled and not calibrating:
+                    if self.motion_gate.zones_version != self.calibration_version:
+                        self.motion_gate.set_zones(self.calibration, self.calibration_version)
+                    result = self.motion_gate.detect(self.detector, frame, time.monotonic(),
+                                                     estimate_pose=estimate_pose, draw=draw, gray=self.frame_pool.gray)
+                else:
+                    result = self.detector.detect_markers(frame, estimate_pose=estimate_pose, draw=draw,
+                                                          gray=self.frame_pool.gray)
+            if self.frame_metrics is not None:
+                self.frame_metrics.observe(time.perf_counter() - detect_started, len(result['markers_info']))
+            result['capture_time'] = self.capture_time = capture_time
+            if self.detection_server is not None and self.detection_server.has_clients():
+                from DetectionServer import make_snapshot
+                self.detection_server.publish(make_snapshot(result, seq, capture_time))
+
+        if self.frame_bus_enabled:
+            self.frame_bus.commit(result)
+        return result
+
+    def build_packet(self, markers: List[Dict], webcam_ip: str) -> str:
+        """Пакет для ControlCenter по текущей калибровке"""
+        return Packet.build_packet(self.calibration, markers, webcam_ip)
+
+    @staticmethod
+    def due_destinations(packet: str, destinations: list) -> list:
+        """Адреса, которым пакет пора отправить (у каждого свой интервал heartbeat)"""
+        return [
+            destination for destination in destinations
+            if destination.enabled and destination.scheduler.poll(packet) is not None
+        ]
+
+    def send_packet(self, packet: str, destinations: list, test_mode: bool = False) -> str:
+        """
+        Отправка пакета (кодируется один раз и уходит в фоновый поток отправки)
+
+        Args:
+            packet: Пакет
+            destinations: Адреса назначения
+            test_mode: Добавить номер пакета и время захвата кадра (для ControlCenterStub)
+
+        Returns:
+            Отправленный пакет
+        """
+        if test_mode:
+            from ControlCenterStub import tag_packet
+            packet = tag_packet(packet, self.packet_seq, self.capture_time)
+            self.packet_seq += 1
+        self.udp_sender.send(packet.encode("utf-8"), destinations)
+        return packet
+
+    def collect_metrics(self, destinations: list, log_buffer, capture=None, scheduler=None,
+                        markers: Optional[List[Dict]] = None) -> str:
+        """Метрики для /metrics (вызывается из потока HTTP сервера)"""
+        self.start_metrics()
+        return self.metrics_collector.collect(
+            self.detector, self.udp_sender, destinations, log_buffer,
+            capture=capture, scheduler=scheduler, motion_gate=self.motion_gate,
+            calibration=self.calibration, markers=markers or []
+        )
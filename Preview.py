@@ -0,0 +1,114 @@
+import time
+import cv2
+import dearpygui.dearpygui as dpg
+import numpy as np
+from FramePool import FrameBufferPool
+
+
+class PreviewManager:
+    """
+    Управление превью камеры в интерфейсе.
+
+    Превью имеет собственное разрешение и частоту обновления, не зависящие от
+    детекции. Кадр уменьшается один раз до перевода во float, а текстура
+    загружается только если хотя бы один виджет с ней виден и пришел новый кадр.
+    """
+
+    def __init__(self,
+                 texture_tag: str = "image_texture",
+                 widgets: tuple = ("camera_out", "calibration_out", "udp_out"),
+                 max_width: int = 640,
+                 max_height: int = 480,
+                 fps: float = 15.0):
+        """
+        Инициализация превью
+
+        Args:
+            texture_tag: Тег текстуры DearPyGui
+            widgets: Теги виджетов изображения, показывающих текстуру
+            max_width: Максимальная ширина превью
+            max_height: Максимальная высота превью
+            fps: Частота обновления превью
+        """
+        self.texture_tag = texture_tag
+        self.widgets = widgets
+        self.max_width = max_width
+        self.max_height = max_height
+        self.fps = fps
+
+        self.scale = 1.0  # Масштаб превью относительно кадра камеры
+        self.pool = FrameBufferPool(max_width, max_height)
+        self.last_seq = -1
+        self.last_upload = 0.0
+
+        # Статистика
+        self.uploads = 0
+        self.skipped = 0
+
+    @property
+    def width(self) -> int:
+        return self.pool.width
+
+    @property
+    def height(self) -> int:
+        return self.pool.height
+
+    def configure(self, frame_width: int, frame_height: int) -> bool:
+        """
+        Подгонка превью под разрешение камеры с сохранением пропорций
+
+        Returns:
+            True если размер превью изменился
+        """
+        scale = min(1.0, self.max_width / frame_width, self.max_height / frame_height)
+        width = max(1, round(frame_width * scale))
+        height = max(1, round(frame_height * scale))
+        self.scale = width / frame_width
+        if not self.pool.resize(width, height):
+            return False
+
+        if dpg.does_item_exist(self.texture_tag):
+            dpg.configure_item(self.texture_tag, width=width, height=height)
+            dpg.set_value(self.texture_tag, self.pool.texture)
+        for widget in self.widgets:
+            if dpg.does_item_exist(widget):
+                dpg.configure_item(widget, width=width, height=height)
+        self.last_seq = -1
+        return True
+
+    def is_visible(self) -> bool:
+        """Хотя бы один виджет с превью отрисовывается"""
+        return any(dpg.does_item_exist(widget) and dpg.is_item_visible(widget) for widget in self.widgets)
+
+    def is_due(self, seq: int) -> bool:
+        """
+        Нужно ли обновлять превью для кадра
+
+        Args:
+            seq: Порядковый номер кадра
+        """
+        if seq == self.last_seq or time.monotonic() - self.last_upload < 1.0 / self.fps:
+            return False
+        if not self.is_visible():
+            self.skipped += 1
+            return False
+        return True
+
+    def render(self, frame: np.ndarray) -> np.ndarray:
+        """Уменьшение кадра (BGR, uint8) и перевод в текстуру превью"""
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), dst=self.pool.capture, interpolation=cv2.INTER_AREA)
+        return self.pool.to_texture(frame)
+
+    def upload(self, seq: int):
+        """Загрузка текстуры превью в DearPyGui"""
+        dpg.set_value(self.texture_tag, self.pool.texture)
+        self.last_seq = seq
+        self.last_upload = time.monotonic()
+        self.uploads += 1
+
+    def clear(self):
+        """Очистка превью"""
+        self.pool.texture.fill(0)
+        dpg.set_value(self.texture_tag, self.pool.texture)
+        self.last_seq = -1
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# Этапы обработки кадра в порядке отображения на вкладке "Performance"
+STAGES = ("capture", "frame", "detect", "match", "overlay", "render", "upload", "ui", "output", "send")
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, time.perf_counter())
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Profiler:
+    """
+    Замер этапов обработки кадра.
+
+    Этап оборачивается в with profiler.span("detect"). Пока профилировщик
+    выключен, span возвращает общий пустой контекст и ничего не замеряет.
+    Включенный профилировщик хранит последние длительности каждого этапа для
+    живой статистики, а во время записи - все интервалы для экспорта в формат
+    Chrome trace (chrome://tracing, Perfetto) и, по желанию, профиль cProfile
+    главного потока за то же время.
+    """
+
+    def __init__(self, window: int = 240):
+        """
+        Args:
+            window: Сколько последних замеров каждого этапа хранить для статистики
+        """
+        self.enabled = False
+        self.window = window
+        self._durations: Dict[str, deque] = {}  # {этап: deque[(конец, длительность)]}
+        self._events = None  # [(этап, поток, начало, длительность)] во время записи
+        self._recording_started = 0.0
+        self._recording_until = 0.0
+        self._was_enabled = False
+        self._cprofile = None
+
+    def span(self, name: str):
+        """Контекст замера этапа"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def add(self, name: str, start: float, end: float):
+        """Добавление замера (вызывается из любого потока)"""
+        durations = self._durations.get(name)
+        if durations is None:
+            durations = self._durations.setdefault(name, deque(maxlen=self.window))
+        durations.append((end, end - start))
+        events = self._events
+        if events is not None:
+            events.append((name, threading.get_ident(), start, end - start))
+
+    def get_stats(self, period: float = 1.0) -> Dict:
+        """
+        Статистика этапов за последние period секунд
+
+        Returns:
+            {этап: {'avg', 'max', 'rate'}} - длительности в секундах, частота в Гц
+        """
+        now = time.perf_counter()
+        stats = {}
+        for name, durations in list(self._durations.items()):
+            recent = [duration for end, duration in list(durations) if now - end <= period]
+            if recent:
+                stats[name] = {'avg': sum(recent) / len(recent), 'max': max(recent), 'rate': len(recent) / period}
+        return stats
+
+    def reset(self):
+        self._durations.clear()
+
+    @property
+    def recording(self) -> bool:
+        return self._events is not None
+
+    def start_recording(self, seconds: float, cprofile: bool = False):
+        """
+        Запись интервалов в течение seconds секунд
+
+        Args:
+            seconds: Длительность записи
+            cprofile: Дополнительно профилировать вызывающий (главный) поток через cProfile
+        """
+        if self.recording:
+            return
+        self._was_enabled = self.enabled
+        self.enabled = True
+        self._recording_started = time.perf_counter()
+        self._recording_until = self._recording_started + seconds
+        self._events = []
+        if cprofile:
+            import cProfile  # Нужен только для записи с профилем
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def poll(self, directory: str) -> Optional[str]:
+        """
+        Завершение записи по истечении времени (вызывать из потока, начавшего запись)
+
+        Returns:
+            Путь к файлу трассировки, если запись завершена
+        """
+        if not self.recording or time.perf_counter() < self._recording_until:
+            return None
+        events, self._events = self._events, None
+        self.enabled = self._was_enabled
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("trace-%Y%m%d-%H%M%S"))
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(f"{path}.prof")
+            self._cprofile = None
+        self.write_trace(f"{path}.json", events, self._recording_started)
+        return f"{path}.json"
+
+    @staticmethod
+    def write_trace(path: str, events: list, started: float):
+        """Сохранение интервалов в формате Chrome trace event"""
+        pid = os.getpid()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        trace = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': names.get(tid, str(tid))}}
+            for tid in {event[1] for event in events}
+        ]
+        trace.extend(
+            {'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+             'ts': round((start - started) * 1e6, 1), 'dur': round(duration * 1e6, 1)}
+            for name, tid, start, duration in events
+        )
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+
+profiler = Profiler()
@@ -0,0 +1,386 @@
+import argparse
+import math
+import time
+from collections import deque
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+import Aruco
+from Webcam import Webcam
+
+
+def grid_scene(count: int, moving: float = 0.3, size: float = 0.0, seed: int = 0) -> List[Dict]:
+    """
+    Маркеры в сетке, часть из них движется по замкнутым траекториям
+
+    Args:
+        count: Количество маркеров
+        moving: Доля движущихся маркеров
+        size: Размер маркера в долях высоты кадра (0 - по размеру ячейки)
+        seed: Зерно случайных траекторий
+
+    Returns:
+        Описание маркеров для SceneSimulator
+    """
+    rng = np.random.default_rng(seed)
+    columns = math.ceil(math.sqrt(count * 16 / 9))
+    rows = math.ceil(count / columns)
+    cell_x, cell_y = 1.0 / columns, 1.0 / rows
+    size = size or min(cell_x * 9 / 16, cell_y) * 0.5
+
+    markers = []
+    for i in range(count):
+        row, column = divmod(i, columns)
+        x, y = (column + 0.5) * cell_x, (row + 0.5) * cell_y
+        marker = {'id': i, 'size': size, 'path': [[x, y]]}
+        if rng.random() < moving:
+            # Петля внутри своей ячейки: маркеры не перекрываются
+            radius = min(cell_x, cell_y) * 0.2
+            phase = rng.random() * 2 * math.pi
+            marker['path'] = [[x + radius * math.cos(phase + k * math.pi / 4), y + radius * math.sin(phase + k * math.pi / 4)]
+                              for k in range(8)]
+            marker['period'] = float(rng.uniform(2.0, 6.0))
+            marker['rotation_speed'] = float(rng.uniform(-45, 45))
+        markers.append(marker)
+    return markers
+
+
+class SceneSimulator:
+    """
+    Синтетическая сцена с ArUco маркерами.
+
+    Маркеры из generate_marker накладываются на фон в заданных положениях и
+    двигаются по траекториям из опорных точек. Сцена наблюдается с наклоном
+    (перспектива), кадр размывается, освещение меняется со временем, добавляется
+    шум. Для каждого кадра известны истинные углы и центры маркеров.
+
+    Координаты и размеры маркеров задаются в долях кадра (x - доля ширины,
+    y и size - доли высоты), поэтому одна сцена подходит для любого разрешения.
+    """
+
+    def __init__(self,
+                 width: int = 1280,
+                 height: int = 720,
+                 markers: Optional[List[Dict]] = None,
+                 dict_type: str = "aruco_original",
+                 perspective: float = 0.15,
+                 blur: float = 0.8,
+                 noise: float = 4.0,
+                 lighting: float = 0.2,
+                 lighting_period: float = 7.0,
+                 seed: int = 0):
+        """
+        Инициализация сцены
+
+        Args:
+            width: Ширина кадра
+            height: Высота кадра
+            markers: [{'id', 'size', 'path': [[x, y], ...], 'period', 'rotation', 'rotation_speed'}],
+                     по умолчанию grid_scene(12)
+            dict_type: Словарь маркеров
+            perspective: Наклон плоскости сцены (0 - вид сверху)
+            blur: Сигма размытия, пикселей (0 - без размытия)
+            noise: СКО шума сенсора
+            lighting: Амплитуда изменения яркости (0.2 - +-20%)
+            lighting_period: Период изменения яркости, с
+            seed: Зерно фона и шума
+        """
+        self.width = width
+        self.height = height
+        self.markers = markers if markers is not None else grid_scene(12)
+        self.perspective = perspective
+        self.blur = blur
+        self.noise = noise
+        self.lighting = lighting
+        self.lighting_period = lighting_period
+
+        rng = np.random.default_rng(seed)
+        self._detector = Aruco.ArucoMarkerDetector(dict_type=dict_type)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._background = self._make_background(rng)
+        # Несколько заранее сгенерированных кадров шума со смещением 128
+        self._noise = [np.clip(rng.normal(128, noise, (height, width)), 0, 255).astype(np.uint8)
+                       for _ in range(4)] if noise > 0 else []
+
+        # Наклон плоскости: верх сцены дальше от камеры и выглядит уже
+        inset = width * perspective / 2
+        self._plane = cv2.getPerspectiveTransform(
+            np.float32([[0, 0], [width, 0], [width, height], [0, height]]),
+            np.float32([[inset, height * perspective / 2], [width - inset, height * perspective / 2],
+                        [width, height], [0, height]])
+        )
+
+        # Изображения маркеров с белым полем вокруг рисуются один раз
+        self._patches = {}
+        for marker in self.markers:
+            pixels = max(16, int(marker['size'] * height))
+            if (marker['id'], pixels) not in self._patches:
+                image = self._detector.generate_marker(marker['id'], pixels)
+                margin = max(2, pixels // 6)
+                self._patches[(marker['id'], pixels)] = (
+                    cv2.copyMakeBorder(image, margin, margin, margin, margin, cv2.BORDER_CONSTANT, value=255),
+                    margin / pixels
+                )
+
+    def _make_background(self, rng) -> np.ndarray:
+        """Неравномерный фон: плавный градиент и крупные пятна"""
+        spots = cv2.resize(rng.uniform(150, 210, (9, 16)).astype(np.float32), (self.width, self.height),
+                           interpolation=cv2.INTER_CUBIC)
+        gradient = np.linspace(-20, 20, self.width, dtype=np.float32)[np.newaxis, :]
+        return np.clip(spots + gradient, 0, 255).astype(np.uint8)
+
+    def marker_pose(self, marker: Dict, t: float):
+        """Центр (в пикселях плоскости сцены) и угол маркера в момент t"""
+        path = marker['path']
+        if len(path) == 1:
+            x, y = path[0]
+        else:
+            # Замкнутая ломаная, проходится за period секунд
+            position = (t / marker.get('period', 4.0)) % 1.0 * len(path)
+            k = int(position)
+            alpha = position - k
+            (x0, y0), (x1, y1) = path[k], path[(k + 1) % len(path)]
+            x, y = x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha
+        angle = marker.get('rotation', 0.0) + marker.get('rotation_speed', 0.0) * t
+        return x * self.width, y * self.height, math.radians(angle)
+
+    def render(self, t: float, out: np.ndarray, seq: int = 0) -> List[Dict]:
+        """
+        Отрисовка кадра
+
+        Args:
+            t: Время сцены, с
+            out: Буфер кадра (h, w, 3) uint8 BGR
+            seq: Номер кадра (выбор кадра шума)
+
+        Returns:
+            Истинное положение маркеров: [{'id', 'corners', 'center'}]
+        """
+        gray = self._gray
+        np.copyto(gray, self._background)
+
+        truth = []
+        unit = np.float32([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+        for marker in self.markers:
+            cx, cy, angle = self.marker_pose(marker, t)
+            pixels = max(16, int(marker['size'] * self.height))
+            patch, margin = self._patches[(marker['id'], pixels)]
+
+            rotation = np.float32([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+            half = marker['size'] * self.height / 2
+            square = unit @ rotation.T
+            plane = np.concatenate([square * half * (1 + 2 * margin), square * half]) + np.float32([cx, cy])
+            image_points = cv2.perspectiveTransform(plane[np.newaxis], self._plane)[0]
+            quad, corners = image_points[:4], image_points[4:]
+
+            # Маркер рисуется только в своей области кадра
+            x0, y0 = np.floor(quad.min(axis=0)).astype(int)
+            x1, y1 = np.ceil(quad.max(axis=0)).astype(int) + 1
+            x0, y0, x1, y1 = max(x0, 0), max(y0, 0), min(x1, self.width), min(y1, self.height)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            size = patch.shape[0]
+            transform = cv2.getPerspectiveTransform(
+                np.float32([[0, 0], [size, 0], [size, size], [0, size]]), quad - np.float32([x0, y0])
+            )
+            cv2.warpPerspective(patch, transform, (x1 - x0, y1 - y0), dst=gray[y0:y1, x0:x1],
+                                flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_TRANSPARENT)
+
+            if (corners >= 0).all() and (corners < (self.width, self.height)).all():
+                truth.append({
+                    'id': marker['id'],
+                    'corners': corners.tolist(),
+                    'center': (float(corners[:, 0].mean()), float(corners[:, 1].mean()))
+                })
+
+        if self.blur > 0:
+            cv2.GaussianBlur(gray, (0, 0), self.blur, dst=gray)
+
+        # Освещение и шум за один проход: gray * gain + (noise - 128)
+        gain = 1.0 + self.lighting * math.sin(2 * math.pi * t / self.lighting_period)
+        if self._noise:
+            cv2.addWeighted(gray, gain, self._noise[seq % len(self._noise)], 1.0, -128.0, dst=gray)
+        elif gain != 1.0:
+            cv2.convertScaleAbs(gray, dst=gray, alpha=gain)
+
+        cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR, dst=out)
+        return truth
+
+
+class SimulatedCapture:
+    """
+    Замена cv2.VideoCapture, отдающая кадры SceneSimulator.
+
+    Истинное положение маркеров хранится для последних кадров и доступно по
+    номеру кадра (тот же номер выдает CaptureThread.take).
+    """
+
+    def __init__(self, simulator: SceneSimulator, fps: float = 30.0, realtime: bool = True, history: int = 64):
+        """
+        Args:
+            simulator: Сцена
+            fps: Частота кадров (время сцены идет по номеру кадра)
+            realtime: Отдавать кадры с частотой fps, иначе - так быстро, как получится
+            history: Для скольких последних кадров хранить истинные положения
+        """
+        self.simulator = simulator
+        self.fps = fps
+        self.realtime = realtime
+        self.frame_index = 0
+        self.opened = True
+        self._truth = deque(maxlen=history)
+        self._next_frame = time.monotonic()
+
+    def isOpened(self) -> bool:
+        return self.opened
+
+    def release(self):
+        self.opened = False
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.simulator.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.simulator.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def set(self, prop: int, value) -> bool:
+        # Разрешение сцены задается при создании
+        return False
+
+    def read(self, image: Optional[np.ndarray] = None):
+        """Следующий кадр, как cv2.VideoCapture.read"""
+        if not self.opened:
+            return False, image
+        shape = (self.simulator.height, self.simulator.width, 3)
+        if image is None or image.shape != shape:
+            image = np.empty(shape, dtype=np.uint8)
+
+        if self.realtime:
+            delay = self._next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_frame = max(self._next_frame + 1.0 / self.fps, time.monotonic())
+
+        self.frame_index += 1
+        truth = self.simulator.render(self.frame_index / self.fps, image, self.frame_index)
+        self._truth.append((self.frame_index, truth))
+        return True, image
+
+    def ground_truth(self, frame_index: int) -> Optional[List[Dict]]:
+        """Истинное положение маркеров на кадре с этим номером"""
+        for index, truth in reversed(self._truth):
+            if index == frame_index:
+                return truth
+        return None
+
+
+class SimulatedWebcam(Webcam):
+    """Камера-симулятор, подключается вместо Webcam"""
+
+    def __init__(self, settings: Dict):
+        """
+        Args:
+            settings: Параметры SceneSimulator, а также 'fps', 'count', 'moving' (grid_scene)
+        """
+        super().__init__()
+        settings = dict(settings)
+        self.camera_id = -1
+        self.fps = settings.pop('fps', 30.0)
+        count = settings.pop('count', 12)
+        moving = settings.pop('moving', 0.3)
+        settings.setdefault('markers', grid_scene(count, moving))
+        self.settings = settings
+        self.width = settings.get('width', 1280)
+        self.height = settings.get('height', 720)
+
+    @property
+    def label(self) -> str:
+        return "Simulator"
+
+    def open(self):
+        settings = dict(self.settings, width=self.width, height=self.height)
+        return SimulatedCapture(SceneSimulator(**settings), fps=self.fps)
+
+
+def evaluate(truth: List[Dict], markers_info: List[Dict], max_error: float = 3.0) -> Dict:
+    """
+    Сравнение найденных маркеров с истинными
+
+    Args:
+        truth: Истинное положение маркеров (SceneSimulator.render)
+        markers_info: Результат detect_markers
+        max_error: Максимальная ошибка центра, при которой маркер считается найденным, пикселей
+
+    Returns:
+        {'found', 'missed', 'false', 'center_error'} - найдено, пропущено,
+        ложные или неточные, средняя ошибка центра найденных
+    """
+    expected = {}
+    for marker in truth:
+        expected.setdefault(marker['id'], []).append(marker['center'])
+    found, errors = 0, []
+    for info in markers_info:
+        candidates = expected.get(info['id'])
+        if not candidates:
+            continue
+        distances = [math.dist(info['center'], center) for center in candidates]
+        best = int(np.argmin(distances))
+        if distances[best] <= max_error:
+            found += 1
+            errors.append(distances[best])
+            candidates.pop(best)
+    return {
+        'found': found,
+        'missed': len(truth) - found,
+        'false': len(markers_info) - found,
+        'center_error': float(np.mean(errors)) if errors else 0.0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and detection accuracy on a simulated scene")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--markers", type=int, default=100)
+    parser.add_argument("--moving", type=float, default=0.3, help="share of moving markers")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--perspective", type=float, default=0.15)
+    parser.add_argument("--blur", type=float, default=0.8)
+    parser.add_argument("--noise", type=float, default=4.0)
+    parser.add_argument("--lighting", type=float, default=0.2)
+    args = parser.parse_args()
+
+    simulator = SceneSimulator(args.width, args.height, grid_scene(args.markers, args.moving),
+                               perspective=args.perspective, blur=args.blur, noise=args.noise, lighting=args.lighting)
+    capture = SimulatedCapture(simulator, realtime=False)
+    detector = Aruco.ArucoMarkerDetector(dict_type="aruco_original")
+    gray = np.empty((args.height, args.width), dtype=np.uint8)
+    frame = None
+
+    render_time = detect_time = 0.0
+    totals = {'found': 0, 'missed': 0, 'false': 0}
+    errors = []
+    for _ in range(args.frames):
+        t = time.perf_counter()
+        _, frame = capture.read(frame)
+        render_time += time.perf_counter() - t
+
+        t = time.perf_counter()
+        result = detector.detect_markers(frame, gray=gray)
+        detect_time += time.perf_counter() - t
+
+        score = evaluate(capture.ground_truth(capture.frame_index), result['markers_info'])
+        for key in totals:
+            totals[key] += score[key]
+        if score['found']:
+            errors.append(score['center_error'])
+
+    expected = totals['found'] + totals['missed']
+    print(f"{args.width}x{args.height}, {args.markers} markers, {args.frames} frames")
+    print(f"render: {args.frames / render_time:.1f} fps, detect: {args.frames / detect_time:.1f} fps, "
+          f"pipeline: {args.frames / (render_time + detect_time):.1f} fps")
+    print(f"recall: {totals['found'] / max(1, expected):.3f}, false detections: {totals['false']}, "
+          f"center error: {np.mean(errors) if errors else 0.0:.2f} px")
@@ -0,0 +1,34 @@
+import time
+from typing import Dict
+
+
+class StartupTimer:
+    """
+    Отметки времени запуска программы.
+
+    Время отсчитывается от импорта модуля (первая строка main.py), каждая
+    отметка записывается один раз.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = time.time()  # Для сравнения с внешним замером
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str) -> bool:
+        """
+        Отметка этапа запуска
+
+        Returns:
+            True если отметка записана впервые
+        """
+        if name in self.marks:
+            return False
+        self.marks[name] = time.perf_counter() - self.started
+        return True
+
+    def report(self) -> str:
+        return "Startup: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in self.marks.items())
+
+
+startup_timer = StartupTimer()
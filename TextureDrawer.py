@@ -1,15 +1,16 @@
 class TextureDrawer:
-    def __init__(self, texture=None):
+    def __init__(self, texture=None, copy=True):
         """
         Инициализация рисовальщика текстуры
 
         Args:
             texture: Данные существующей текстуры (numpy array)
+            copy: Копировать текстуру (False - рисовать прямо в переданный массив)
         """
 
         # Если переданы данные текстуры
-        if texture.any():
-            self.texture_data = texture.copy()
+        if texture is not None:
+            self.texture_data = texture.copy() if copy else texture
             self.width = texture.shape[1]
             self.height = texture.shape[0]
         else:
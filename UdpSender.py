@@ -0,0 +1,197 @@
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+from PacketScheduler import PacketScheduler
+from Profiler import profiler
+
+
+class UdpDestination:
+    """
+    Адрес назначения UDP пакетов со своим интервалом и статистикой
+    """
+
+    def __init__(self,
+                 ip: str,
+                 port: int,
+                 name: str = "",
+                 interval: float = 1.0,
+                 enabled: bool = True,
+                 min_gap: float = 0.05):
+        """
+        Инициализация адреса назначения
+
+        Args:
+            ip: IP адрес получателя
+            port: Порт получателя
+            name: Имя получателя
+            interval: Максимальный интервал между пакетами (heartbeat), с
+            enabled: Отправка включена
+            min_gap: Минимальный интервал между пакетами, с
+        """
+        self.ip = ip
+        self.port = int(port)
+        self.name = name or f"{ip}:{port}"
+        self.enabled = enabled
+        self.scheduler = PacketScheduler(min_gap, interval)
+
+        # Статистика
+        self.stats = {
+            'sent': 0,
+            'failed': 0,
+            'last_latency': 0.0,
+            'max_latency': 0.0,
+            'total_latency': 0.0,
+            'last_sent': None,  # time.monotonic последней успешной отправки
+            'last_error': None
+        }
+
+    @property
+    def address(self):
+        return self.ip, self.port
+
+    @property
+    def interval(self) -> float:
+        return self.scheduler.max_interval
+
+    @interval.setter
+    def interval(self, value: float):
+        self.scheduler.max_interval = value
+
+    def is_healthy(self) -> bool:
+        """Последняя попытка отправки была успешной"""
+        return self.stats['sent'] > 0 and self.stats['last_error'] is None
+
+    def get_stats(self) -> Dict:
+        """Получение статистики отправки на этот адрес"""
+        stats = self.stats.copy()
+        stats['avg_latency'] = stats['total_latency'] / stats['sent'] if stats['sent'] else 0.0
+        return stats
+
+
+class UdpSender:
+    """
+    Фоновая отправка UDP пакетов.
+
+    Пакеты кладутся в ограниченную очередь и отправляются отдельным потоком
+    через один долгоживущий неблокирующий сокет, поэтому отправка никогда не
+    блокирует интерфейс и захват кадров, а медленный или недоступный получатель
+    не задерживает остальных. При переполнении очереди отбрасываются самые
+    старые пакеты.
+    """
+
+    def __init__(self, queue_size: int = 64):
+        """
+        Инициализация отправителя
+
+        Args:
+            queue_size: Максимальное количество пакетов в очереди
+        """
+        self._queue = deque(maxlen=queue_size)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._socket = None
+
+        # Статистика
+        self.stats = {
+            'queued': 0,
+            'sent': 0,
+            'failed': 0,
+            'dropped': 0,
+            'last_latency': 0.0,  # Время от постановки в очередь до отправки, с
+            'max_latency': 0.0,
+            'total_latency': 0.0
+        }
+        self.last_error = None
+
+    def start(self):
+        """Запуск фонового потока отправки"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="UdpSender", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """Остановка потока и закрытие сокета"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def send(self, data: bytes, destinations: List[UdpDestination]) -> bool:
+        """
+        Постановка пакета в очередь на отправку
+
+        Args:
+            data: Готовый закодированный пакет (кодируется один раз для всех адресов)
+            destinations: Адреса назначения
+
+        Returns:
+            True если пакет поставлен в очередь
+        """
+        if not destinations:
+            return False
+        if not self._running:
+            self.start()
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self.stats['dropped'] += 1
+            self._queue.append((data, tuple(destinations), time.perf_counter()))
+            self.stats['queued'] += 1
+            self._condition.notify()
+        return True
+
+    def get_stats(self) -> Dict:
+        """Получение статистики отправки"""
+        stats = self.stats.copy()
+        stats['avg_latency'] = stats['total_latency'] / stats['sent'] if stats['sent'] else 0.0
+        stats['pending'] = len(self._queue)
+        return stats
+
+    def _get_socket(self) -> socket.socket:
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.setblocking(False)
+        return self._socket
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                data, destinations, queued_at = self._queue.popleft()
+
+            with profiler.span("send"):
+                for destination in destinations:
+                    self._send_to(data, destination, queued_at)
+
+    def _send_to(self, data: bytes, destination: UdpDestination, queued_at: float):
+        try:
+            # Неблокирующий сокет: переполненный буфер (BlockingIOError) считается ошибкой
+            # этого получателя и не задерживает отправку остальным
+            self._get_socket().sendto(data, destination.address)
+        except OSError as e:
+            self.stats['failed'] += 1
+            self.last_error = str(e)
+            destination.stats['failed'] += 1
+            destination.stats['last_error'] = str(e)
+            return
+
+        latency = time.perf_counter() - queued_at
+        for stats in (self.stats, destination.stats):
+            stats['sent'] += 1
+            stats['last_latency'] = latency
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+        destination.stats['last_sent'] = time.monotonic()
+        destination.stats['last_error'] = None
@@ -0,0 +1,72 @@
+from typing import Any, Dict
+import dearpygui.dearpygui as dpg
+
+_MISSING = object()
+
+
+class UiState:
+    """
+    Кэш состояния интерфейса.
+
+    Значения полей ввода сохраняются колбэками виджетов, и главный цикл
+    читает их из кэша, не обращаясь к DearPyGui. Запись в виджеты
+    сравнивается с последним записанным значением и выполняется только
+    при изменении.
+    """
+
+    def __init__(self, **values):
+        """
+        Args:
+            values: Начальные значения полей {tag: value}
+        """
+        self.values: Dict[str, Any] = dict(values)
+        self._written: Dict[str, Dict[str, Any]] = {}  # {tag: {параметр: значение}}
+
+        # Статистика
+        self.writes = 0
+        self.skipped = 0
+
+    def get(self, tag: str, default=None):
+        """Значение поля из кэша"""
+        return self.values.get(tag, default)
+
+    def set(self, tag: str, value):
+        """Сохранение значения поля (вызывается из колбэка виджета)"""
+        self.values[tag] = value
+
+    def configure(self, tag: str, **kwargs) -> bool:
+        """
+        Изменение параметров виджета, если они отличаются от записанных
+
+        Returns:
+            True если виджет был изменен
+        """
+        written = self._written.setdefault(tag, {})
+        changed = {key: value for key, value in kwargs.items() if written.get(key, _MISSING) != value}
+        if not changed:
+            self.skipped += 1
+            return False
+        if not dpg.does_item_exist(tag):
+            return False
+        dpg.configure_item(tag, **changed)
+        written.update(changed)
+        self.writes += 1
+        return True
+
+    def set_value(self, tag: str, value) -> bool:
+        """Запись значения поля, если оно изменилось"""
+        self.values[tag] = value
+        written = self._written.setdefault(tag, {})
+        if written.get('value', _MISSING) == value:
+            self.skipped += 1
+            return False
+        if not dpg.does_item_exist(tag):
+            return False
+        dpg.set_value(tag, value)
+        written['value'] = value
+        self.writes += 1
+        return True
+
+    def forget(self, tag: str):
+        """Сброс записанных значений (виджет пересоздан)"""
+        self._written.pop(tag, None)
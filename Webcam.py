@@ -1,9 +1,13 @@
+import cv2
+
+
 class Webcam:
      def __init__(self):
          # Идентификатор и состояние
          self.camera_id = 0  # ID камеры (0 для встроенной)
          self.is_opened = False  # Флаг открытия камеры
          self.cap = None  # Объект захвата видео
+         self.capture_thread = None  # Поток захвата кадров (Capture.CaptureThread)
 
          # Параметры изображения
          self.width = 640  # Ширина кадра
@@ -13,9 +17,21 @@ class Webcam:
          # Текущий кадр
          self.current_frame = None  # Текущий захваченный кадр
          self.frame_count = 0  # Счетчик кадров
+         self.frame_time = None  # Время захвата текущего кадра (time.time)
 
          # Калибровка и коррекция
          self.camera_matrix = None  # Матрица камеры
          self.dist_coeffs = None  # Коэффициенты дисторсии
          self.calibrated = False  # Флаг калибровки
 
+     @property
+     def label(self) -> str:
+         """Название камеры в списке выбора"""
+         return f"Camera {self.camera_id}"
+
+     def open(self):
+         """Открытие камеры, возвращает объект захвата с методом read(image)"""
+         cap = cv2.VideoCapture(self.camera_id, cv2.CAP_DSHOW)  # CAP_DSHOW для Windows
+         cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+         return cap
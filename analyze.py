@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+import Aruco
+
+COLUMNS = ("frame", "time", "id", "center", "corners")
+
+
+def split_ranges(total: int, parts: int, min_frames: int = 100) -> List[Tuple[int, Optional[int]]]:
+    """
+    Разбиение видео на отрезки кадров
+
+    Args:
+        total: Количество кадров (CAP_PROP_FRAME_COUNT, может быть неточным)
+        parts: Желаемое количество отрезков
+        min_frames: Минимальная длина отрезка (каждый отрезок начинается с перемотки)
+
+    Returns:
+        [(начало, конец), ...] - последний отрезок без конца, чтобы не потерять кадры при неточном total
+    """
+    parts = max(1, min(parts, total // min_frames))
+    bounds = [total * i // parts for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1] if i < parts - 1 else None) for i in range(parts)]
+
+
+def _analyze_range(task: Tuple[str, str, int, Optional[int]]) -> Dict:
+    """Обработка одного отрезка в процессе пула"""
+    path, dict_type, start, stop = task
+    # Параллельность дают процессы, потоки OpenCV внутри каждого только мешают друг другу
+    cv2.setNumThreads(1)
+    detector = Aruco.ArucoMarkerDetector(dict_type=dict_type)
+    return detector.analyze_video(path, start, stop)
+
+
+def analyze(path: str, dict_type: str, workers: int = 0, chunks: int = 4) -> Tuple[Dict, Dict]:
+    """
+    Параллельная детекция маркеров во всем видеофайле
+
+    Args:
+        path: Путь к видеофайлу
+        dict_type: Словарь маркеров
+        workers: Количество процессов (0 - по числу ядер)
+        chunks: Отрезков на процесс (меньше простоя в конце, но больше перемоток)
+
+    Returns:
+        (столбцы, сводка)
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"Cannot open video {path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    ranges = split_ranges(total, workers * chunks)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        parts = list(pool.map(_analyze_range, [(path, dict_type, start, stop) for start, stop in ranges]))
+    elapsed = time.perf_counter() - started
+
+    # Отрезки идут по порядку, поэтому склеенные столбцы отсортированы по кадру
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+    frames = sum(part['stats']['frames'] for part in parts)
+    summary = {
+        'video': path,
+        'width': width,
+        'height': height,
+        'fps': fps,
+        'frames': frames,
+        'failures': sum(part['stats']['failures'] for part in parts),
+        'detected_frames': sum(part['stats']['detected_frames'] for part in parts),
+        'detections': len(columns['id']),
+        'workers': workers,
+        'ranges': len(ranges),
+        'elapsed': elapsed,
+        'speed': frames / elapsed if elapsed else 0.0,  # Кадров в секунду
+        'markers': summarize_markers(columns, fps)
+    }
+    return columns, summary
+
+
+def summarize_markers(columns: Dict, fps: float) -> Dict:
+    """
+    Сводка по каждому маркеру
+
+    Returns:
+        {id: {'frames', 'first', 'last', 'first_time', 'last_time'}}
+    """
+    markers = {}
+    ids, counts = np.unique(columns['id'], return_counts=True)
+    for marker_id, count in zip(ids, counts):
+        frames = columns['frame'][columns['id'] == marker_id]
+        markers[str(marker_id)] = {
+            'frames': int(count),
+            'first': int(frames[0]),
+            'last': int(frames[-1]),
+            'first_time': float(frames[0] / fps) if fps else None,
+            'last_time': float(frames[-1] / fps) if fps else None
+        }
+    return markers
+
+
+def save(path: str, columns: Dict, summary: Dict):
+    """
+    Сохранение столбцов в .npz (np.load(path)['id'] и т.д.), сводка - в столбце 'summary' (JSON)
+    """
+    np.savez_compressed(path, **columns, summary=np.array(json.dumps(summary, ensure_ascii=False)))
+
+
+def load(path: str) -> Tuple[Dict, Dict]:
+    """Чтение файла, сохраненного save"""
+    with np.load(path) as data:
+        columns = {name: data[name] for name in COLUMNS}
+        summary = json.loads(str(data['summary']))
+    return columns, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline marker detection in a video file using a process pool")
+    parser.add_argument("video")
+    parser.add_argument("--output", help="columns file (.npz), default - <video>.markers.npz")
+    parser.add_argument("--dict", default="aruco_original", choices=sorted(Aruco.ArucoMarkerDetector.DICT_TYPES))
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 - CPU count")
+    parser.add_argument("--chunks", type=int, default=4, help="frame ranges per worker")
+    args = parser.parse_args()
+
+    try:
+        columns, summary = analyze(args.video, args.dict, args.workers, args.chunks)
+    except OSError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    output = args.output or f"{os.path.splitext(args.video)[0]}.markers.npz"
+    save(output, columns, summary)
+
+    print(f"{summary['frames']} frames ({summary['failures']} unreadable) in {summary['elapsed']:.1f} s, "
+          f"{summary['speed']:.1f} fps with {summary['workers']} workers")
+    print(f"{summary['detections']} detections in {summary['detected_frames']} frames, "
+          f"{len(summary['markers'])} markers:")
+    for marker_id, marker in summary['markers'].items():
+        print(f"  {marker_id:>5}: {marker['frames']} frames, {marker['first']}-{marker['last']}")
+    print(f"Saved to {output}")
@@ -0,0 +1,304 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+import Aruco
+import Packet
+from ControlCenterStub import tag_packet
+from DetectionServer import make_snapshot
+from FramePool import FrameBufferPool
+from MotionGate import MotionGate
+from Overlay import ZoneOverlay
+import config
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+MARKER_COUNTS = [1, 12, 48]
+DICT_TYPE = "aruco_original"
+
+
+def make_scene(detector: Aruco.ArucoMarkerDetector, width: int, height: int, count: int,
+               seed: int = 0) -> Tuple[np.ndarray, List[Tuple[float, float, int]]]:
+    """
+    Синтетический кадр с маркерами в сетке
+
+    Args:
+        detector: Детектор, словарь которого используется для маркеров
+        width: Ширина кадра
+        height: Высота кадра
+        count: Количество маркеров
+        seed: Зерно шума (кадр воспроизводим)
+
+    Returns:
+        (BGR кадр, [(cx, cy, size), ...] положения маркеров)
+    """
+    columns = int(np.ceil(np.sqrt(count * width / height)))
+    rows = int(np.ceil(count / columns))
+    cell = min(width // columns, height // rows)
+    size = int(cell * 0.6)
+    frame = np.full((height, width), 200, dtype=np.uint8)
+
+    markers = []
+    for i in range(count):
+        row, column = divmod(i, columns)
+        x = (width - columns * cell) // 2 + column * cell + (cell - size) // 2
+        y = (height - rows * cell) // 2 + row * cell + (cell - size) // 2
+        frame[y:y + size, x:x + size] = detector.generate_marker(i, size)
+        markers.append((x + size / 2, y + size / 2, size))
+
+    # Немного шума, чтобы порог и поиск контуров работали как на реальном кадре
+    noise = np.random.default_rng(seed).normal(0, 4, frame.shape)
+    frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR), markers
+
+
+def make_board_scene(detector: Aruco.ArucoMarkerDetector, width: int, height: int) -> np.ndarray:
+    """Кадр с ChArUco доской на всю высоту"""
+    frame = np.full((height, width), 200, dtype=np.uint8)
+    board_image, _ = detector.generate_board(image_size=(height * 5 // 7, height))
+    x = (width - board_image.shape[1]) // 2
+    frame[:, x:x + board_image.shape[1]] = board_image
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def make_calibration(width: int, height: int, markers: List[Tuple[float, float, int]]) -> Dict:
+    """Калибровка с позицией на месте каждого маркера, позиции распределены по линиям L1-L6"""
+    calibration = {'width': width, 'height': height}
+    for i, (cx, cy, size) in enumerate(markers):
+        calibration[str(i)] = {
+            "center": [cx, cy],
+            "id": str(i),
+            "size": size,
+            "tolerance": 1.0,
+            "line_attachment": Packet.LINES[i % len(Packet.LINES)]
+        }
+    return calibration
+
+
+def measure(func: Callable, min_time: float = 0.5, min_runs: int = 5, max_runs: int = 1000,
+            warmup: int = 3) -> Dict:
+    """
+    Замер времени выполнения функции
+
+    Returns:
+        Статистика в миллисекундах
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    started = time.perf_counter()
+    while len(times) < min_runs or (len(times) < max_runs and time.perf_counter() - started < min_time):
+        t = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - t) * 1000)
+    times.sort()
+    return {
+        'median_ms': statistics.median(times),
+        'min_ms': times[0],
+        'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))],
+        'runs': len(times)
+    }
+
+
+def build_cases(resolutions=RESOLUTIONS, counts=MARKER_COUNTS) -> List[Tuple[str, Callable, Dict]]:
+    """
+    Подготовка кадров и замеряемых функций
+
+    Returns:
+        [(имя, функция, сведения), ...]
+    """
+    detector = Aruco.ArucoMarkerDetector(dict_type=DICT_TYPE)
+    cases = []
+
+    for width, height in resolutions:
+        pool = FrameBufferPool(width, height)
+        for count in counts:
+            frame, markers = make_scene(detector, width, height, count)
+            found = len(detector.detect_markers(frame)['markers_info'])
+            cases.append((f"detect/{width}x{height}/{count}",
+                          lambda frame=frame, pool=pool: detector.detect_markers(frame, gray=pool.gray),
+                          {'markers': count, 'detected': found}))
+
+            # Детектор с параметрами под откалиброванные размеры маркеров (в калибровке size - диагональ)
+            calibrated = Aruco.ArucoMarkerDetector(dict_type=DICT_TYPE)
+            calibration = make_calibration(width, height, [(cx, cy, size * np.sqrt(2)) for cx, cy, size in markers])
+            calibrated.set_detector_params(calibrated.calibrated_parameters(calibration))
+            found = len(calibrated.detect_markers(frame)['markers_info'])
+            cases.append((f"detect_calibrated/{width}x{height}/{count}",
+                          lambda frame=frame, pool=pool, calibrated=calibrated:
+                          calibrated.detect_markers(frame, gray=pool.gray),
+                          {'markers': count, 'detected': found}))
+
+            # Словарь только из ID на кадре
+            reduced = Aruco.ArucoMarkerDetector(dict_type=DICT_TYPE)
+            reduced.restrict_ids(range(count))
+            found = len(reduced.detect_markers(frame)['markers_info'])
+            cases.append((f"detect_reduced/{width}x{height}/{count}",
+                          lambda frame=frame, pool=pool, reduced=reduced: reduced.detect_markers(frame, gray=pool.gray),
+                          {'markers': count, 'detected': found}))
+
+        board = make_board_scene(detector, width, height)
+        found = len(detector.detect_markers(board)['markers_info'])
+        cases.append((f"detect_board/{width}x{height}",
+                      lambda board=board, pool=pool: detector.detect_markers(board, gray=pool.gray),
+                      {'detected': found}))
+
+        # Пропуск детекции вместе с калиброванным детектором: маркер появился на неподвижном кадре
+        # и должен найтись детекцией только по изменившейся области
+        placed, markers = make_scene(detector, width, height, 48)
+        gated = Aruco.ArucoMarkerDetector(dict_type=DICT_TYPE)
+        calibration = make_calibration(width, height, [(cx, cy, size * np.sqrt(2)) for cx, cy, size in markers])
+        gated.set_detector_params(gated.calibrated_parameters(calibration))
+        gate = MotionGate(**config.MOTION_GATE)
+        gate.set_zones(calibration)
+        before = placed.copy()
+        cx, cy, size = markers[-1]
+        before[int(cy - size / 2):int(cy + size / 2), int(cx - size / 2):int(cx + size / 2)] = 200
+        gate.detect(gated, before, 0.0)
+        state = (gate.reference.copy(), gate.result)
+
+        def gate_placed(frame=placed, pool=pool, gate=gate, gated=gated, state=state):
+            gate.reference, gate.result, gate.last_full = state[0].copy(), state[1], 0.0
+            return gate.detect(gated, frame, 0.0, gray=pool.gray)
+
+        found = len(gate_placed()['markers_info'])
+        if found != len(markers):
+            print(f"detect_gate_calibrated/{width}x{height}: {found} of {len(markers)} markers found "
+                  f"by the region pass", file=sys.stderr)
+        cases.append((f"detect_gate_calibrated/{width}x{height}/{len(markers)}", gate_placed,
+                      {'markers': len(markers), 'detected': found, 'partial': gate.stats['partial']}))
+
+        # Как в интерфейсе: рисование поверх кадра из пула
+        frame, markers = make_scene(detector, width, height, 12)
+
+        def detect_draw(frame=frame, pool=pool):
+            np.copyto(pool.capture, frame)
+            detector.detect_markers(pool.capture, estimate_pose=True, draw=True, gray=pool.gray)
+        cases.append((f"detect_draw/{width}x{height}/12", detect_draw, {}))
+
+        cases.append((f"texture/{width}x{height}", lambda frame=frame, pool=pool: pool.to_texture(frame), {}))
+
+        calibration = make_calibration(width, height, markers)
+        texture = pool.to_texture(frame).copy()
+        overlay = ZoneOverlay()
+        cases.append((f"overlay_rebuild/{width}x{height}/12",
+                      lambda calibration=calibration, overlay=overlay, texture=texture:
+                      overlay.rebuild(calibration, 0, texture.shape), {}))
+
+        overlay = ZoneOverlay()
+        overlay.rebuild(calibration, 0, texture.shape)
+        occupancy = [[i % 2 == 0 for i in range(12)], [i % 2 == 1 for i in range(12)]]
+        state = {'frame': 0}
+
+        def overlay_frame(overlay=overlay, texture=texture):
+            # Занятость меняется на каждом кадре - худший случай перекраски
+            state['frame'] += 1
+            overlay.update(occupancy[state['frame'] % 2])
+            overlay.apply(texture)
+        cases.append((f"overlay_frame/{width}x{height}/12", overlay_frame, {}))
+
+    for count in counts:
+        width, height = RESOLUTIONS[0]
+        frame, markers = make_scene(detector, width, height, count)
+        result = detector.detect_markers(frame)
+        calibration = make_calibration(width, height, markers)
+        markers_info = result['markers_info']
+        cases.append((f"packet/{count}",
+                      lambda calibration=calibration, markers_info=markers_info:
+                      Packet.build_packet(calibration, markers_info, config.WEBCAM_IP),
+                      {'packet': Packet.build_packet(calibration, markers_info, config.WEBCAM_IP)}))
+        cases.append((f"encode_packet/{count}",
+                      lambda calibration=calibration, markers_info=markers_info:
+                      tag_packet(Packet.build_packet(calibration, markers_info, config.WEBCAM_IP), 1, 0.0).encode("utf-8"),
+                      {}))
+        cases.append((f"encode_snapshot/{count}",
+                      lambda result=result: (json.dumps(make_snapshot(result, 1, 0.0)) + "\n").encode("utf-8"),
+                      {}))
+    return cases
+
+
+def run(cases, min_time: float = 0.5, name_filter: Optional[str] = None) -> Dict:
+    """Замер всех случаев, результат в формате для сохранения в JSON"""
+    results = {}
+    for name, func, info in cases:
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = {**measure(func, min_time), **info}
+        print(f"{name:<32} {results[name]['median_ms']:9.3f} ms  (p95 {results[name]['p95_ms']:.3f}, "
+              f"{results[name]['runs']} runs)", file=sys.stderr)
+    return {
+        'meta': {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'threads': cv2.getNumThreads()
+        },
+        'results': results
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """
+    Сравнение с базовыми результатами
+
+    Args:
+        tolerance: Допустимое замедление (0.2 - на 20%)
+
+    Returns:
+        Имена замеров с регрессией
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<32} new", file=sys.stderr)
+            continue
+        # Минимум устойчивее к шуму системы, чем медиана
+        ratio = result['min_ms'] / base['min_ms'] if base['min_ms'] else 1.0
+        status = "REGRESSION" if ratio > 1 + tolerance else ("faster" if ratio < 1 - tolerance else "ok")
+        if base.get('detected') is not None and result.get('detected') != base['detected']:
+            status = "DETECTION CHANGED"
+        if status in ("REGRESSION", "DETECTION CHANGED"):
+            regressions.append(name)
+        print(f"{name:<32} {base['min_ms']:9.3f} -> {result['min_ms']:9.3f} ms  x{ratio:.2f}  {status}",
+              file=sys.stderr)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frame pipeline benchmark on synthetic frames (no camera needed)")
+    parser.add_argument("--output", help="write results (JSON) to file, default - stdout")
+    parser.add_argument("--baseline", help="compare with results saved earlier, exit code 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against baseline (0.2 = 20%%)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="measuring time per case, s")
+    parser.add_argument("--filter", help="run only cases containing this substring")
+    parser.add_argument("--quick", action="store_true", help="only 640x480, fewer repeats")
+    args = parser.parse_args()
+
+    if args.quick:
+        cases = build_cases(resolutions=RESOLUTIONS[:1])
+        args.min_time = min(args.min_time, 0.1)
+    else:
+        cases = build_cases()
+    current = run(cases, args.min_time, args.filter)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(current, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
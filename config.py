@@ -1,9 +1,64 @@
 cameras: list = []
 selected_cam = None
+# Камера-симулятор (Simulator.py) в списке камер: синтетическая сцена с маркерами
+simulated_camera = False
+SIMULATOR = {"width": 1280, "height": 720, "fps": 30, "count": 12, "moving": 0.3,
+             "perspective": 0.15, "blur": 0.8, "noise": 4.0, "lighting": 0.2}
 camera_selected = False
 scan_started = False
 calibration = dict()
+CALIBRATION_DIR = "calibrations"  # Папка с профилями калибровки
+CALIBRATION_PROFILE = "default"
+# Файл калибровки старых версий, при первом запуске переносится в профиль CALIBRATION_PROFILE
+LEGACY_CALIBRATION_FILE = "calibration.json"
+# Калибровка по нескольким кадрам: сколько кадров или секунд накапливать
+calibration_frames = 30
+calibration_seconds = 2.0
 tolerance = 1.0
 udp_enabled = False
 UDP_IP = "127.0.0.1"
-UDP_PORT = 8888
\ No newline at end of file
+UDP_PORT = 8888
+WEBCAM_IP = "10.148.11.228"  # Последний октет идет в пакет
+# Частоты задач главного цикла, Гц
+ui_fps = 30
+detect_fps = 30
+output_rate = 50
+# Пропуск детекции на неподвижных кадрах (MotionGate): повторное использование результата,
+# детекция только в изменившихся местах, полная детекция не реже refresh_interval секунд
+motion_gate_enabled = True
+MOTION_GATE = {"scale": 8, "pixel_threshold": 20, "zone_threshold": 3.0, "global_threshold": 12.0,
+               "margin": 48, "refresh_interval": 1.0}
+# Параметры детектора под откалиброванные размеры маркеров, допустимое отклонение размера (0.5 = +-50%)
+calibrated_detector = True
+detector_size_margin = 0.5
+# Поиск только используемых ID: MARKER_IDS и add_known_marker (остальные маркеры не находятся,
+# пустой список - весь словарь)
+reduced_dictionary = False
+MARKER_IDS = []
+udp_min_gap = 0.05
+udp_heartbeat = 1.0
+udp_test_mode = False  # Добавлять номер пакета и время захвата кадра (для ControlCenterStub)
+# Получатели пакетов: основной ControlCenter, резервный, запись логов и т.д.
+UDP_DESTINATIONS = [
+    {"name": "ControlCenter", "ip": UDP_IP, "port": UDP_PORT, "interval": udp_heartbeat, "enabled": True},
+]
+# Потоковая передача детекций (JSON построчно по TCP на localhost)
+detection_server_enabled = False
+DETECTION_SERVER_PORT = 8890
+# Метрики в формате Prometheus (HTTP на localhost, GET /metrics)
+metrics_enabled = False
+METRICS_PORT = 9108
+# Кадры и детекции в общей памяти для других процессов на этой машине (FrameBus.py)
+frame_bus_enabled = False
+FRAME_BUS_NAME = "smartcamera"
+frame_bus_slots = 4
+# Лог: размер кольцевого буфера, частота обновления вкладки, файл с ротацией
+log_capacity = 5000
+log_flush_rate = 5
+log_to_file = True
+LOG_FILE = "smartcamera.log"
+# Файл настроек для работы без интерфейса (headless.py)
+HEADLESS_SETTINGS = "smartcamera.json"
+# Трассировки вкладки "Performance" (Chrome trace и cProfile)
+TRACE_DIR = "traces"
+trace_seconds = 5
\ No newline at end of file
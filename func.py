@@ -1,12 +1,20 @@
-import math
-import socket
 import cv2
-import datetime
+import threading
 import dearpygui.dearpygui as dpg
-import numpy as np
-import json
-import Aruco
-import TextureDrawer
+import Packet
+from Overlay import ZoneOverlay
+from Pipeline import FramePipeline
+from Preview import PreviewManager
+from UdpSender import UdpDestination
+from Capture import CaptureThread
+from LoopScheduler import LoopScheduler
+from Logger import LogBuffer, LogView, RotatingFileSink
+from CalibrationStore import CalibrationStore
+from AutoCalibrator import AutoCalibrator
+from Profiler import profiler, STAGES
+from Startup import startup_timer
+from UiState import UiState
+from AssignmentTable import AssignmentTable, NO_LINE
 from Webcam import Webcam
 import config
 
@@ -17,6 +25,21 @@ scan_started = config.scan_started
 calibration = config.calibration
 tolerance = config.tolerance
 scan_output = dict()
+zone_overlay = ZoneOverlay()
+calibration_store = CalibrationStore(config.CALIBRATION_DIR)
+log_buffer = LogBuffer(config.log_capacity)
+log_view = LogView(log_buffer)
+log_file = RotatingFileSink(config.LOG_FILE)
+log_buffer.sinks.append(log_file.write)
+loop_scheduler = LoopScheduler()
+auto_calibrator = AutoCalibrator(config.calibration_frames, config.calibration_seconds)
+preview = PreviewManager()
+assignment_table = AssignmentTable(on_change=lambda key, line: set_position_line(key, line))
+ui_state = UiState(webcam_ip_input=config.WEBCAM_IP)
+pipeline = FramePipeline(log=lambda message, level="INFO": log_message(message, level))
+metrics_server = None  # Создается при первом включении метрик
+camera_probe = None  # Поток поиска камер
+udp_destinations = [UdpDestination(**destination, min_gap=config.udp_min_gap) for destination in config.UDP_DESTINATIONS]
 
 
 def get_webcams_opencv():
@@ -31,7 +54,7 @@ def get_webcams_opencv():
             camera = Webcam()
             # Получаем информацию о камере
             camera.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            camera.f = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            camera.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             camera.fps = cap.get(cv2.CAP_PROP_FPS)
             camera.camera_id = index
             camera.is_opened = True
@@ -41,21 +64,36 @@ def get_webcams_opencv():
             cap.release()
             camera.is_opened = False
 
+    if config.simulated_camera:
+        from Simulator import SimulatedWebcam
+        cameras.append(SimulatedWebcam(config.SIMULATOR))
+
+
+def start_camera_probe():
+    """Поиск камер в фоне, окно показывается не дожидаясь его"""
+    global camera_probe
+    camera_probe = threading.Thread(target=get_webcams_opencv, name="CameraProbe", daemon=True)
+    camera_probe.start()
+
+
+def poll_camera_probe():
+    """Заполнение списка камер после поиска (задача главного цикла)"""
+    if camera_probe is None or camera_probe.is_alive() or not startup_timer.mark("cameras"):
+        return
+    dpg.configure_item("select_camera", items=[camera.label for camera in cameras])
+    dpg.configure_item("Camera status", default_value="Select camera" if cameras else "Camera is not found")
+    log_message(f"Found cameras: {len(cameras)}")
+
 
 def on_camera_selected(sender, app_data):
     # sender - tag, app_data - str line
     global selected_cam
-    index = int(app_data.split()[1])
-    selected_cam = cameras[index]
+    selected_cam = next(camera for camera in cameras if camera.label == app_data)
     global camera_selected
     camera_selected = True
-    dpg.configure_item("Camera status", default_value=f"Camera {index} | {selected_cam.width}x{selected_cam.height}px")
-    dpg.configure_item(
-        "image_texture",
-        width=selected_cam.width,
-        height=selected_cam.height
-    )
-    dpg.configure_item("camera_out", width=selected_cam.width, height=selected_cam.height)
+    pipeline.frame_pool.resize(selected_cam.width, selected_cam.height)
+    preview.configure(selected_cam.width, selected_cam.height)
+    dpg.configure_item("Camera status", default_value=f"{selected_cam.label} | {selected_cam.width}x{selected_cam.height}px")
 
 
 def on_start_camera(sender, app_data):
@@ -64,9 +102,12 @@ def on_start_camera(sender, app_data):
 
     if camera is not None:
         if camera.cap is None:
-            camera.cap = cv2.VideoCapture(camera.camera_id, cv2.CAP_DSHOW)
-            camera.cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera.width)
-            camera.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera.height)
+            camera.cap = camera.open()
+
+        if camera.capture_thread is None:
+            # Кадры читаются в отдельном потоке, приход кадра будит главный цикл
+            camera.capture_thread = CaptureThread(camera.cap, on_frame=loop_scheduler.notify)
+            camera.capture_thread.start()
 
         camera.is_opened = True
         log_message("Camera started")
@@ -79,12 +120,17 @@ def on_stop_camera(sender, app_data):
     camera = selected_cam
 
     if camera is not None:
+        if camera.capture_thread is not None:
+            camera.capture_thread.stop()
+            camera.capture_thread = None
         if camera.cap is not None:
             camera.cap.release()
             camera.cap = None
 
         camera.is_opened = False
-        dpg.set_value("image_texture", np.zeros((selected_cam.width, selected_cam.height, 3), dtype=np.float32))
+        auto_calibrator.cancel()
+        pipeline.stop()
+        preview.clear()
         log_message("Camera stopped")
     else:
         log_message("Camera is not selected", "ERROR")
@@ -95,6 +141,9 @@ def on_start_scan(sender, app_data):
     camera = selected_cam
     if camera is not None:
         scan_started = not scan_started
+        if not scan_started:
+            auto_calibrator.cancel()
+            pipeline.reset()
     else:
         log_message("Camera is not selected", "ERROR")
 
@@ -108,78 +157,74 @@ def update_camera_frame():
     global calibration
 
     if camera_selected:
-        if not camera.is_opened or camera.cap is None:
+        if not camera.is_opened or camera.capture_thread is None:
             return
 
-        # Читаем кадр
-        ret, frame = camera.cap.read()
-        if not ret:
+        # Забираем последний кадр из потока захвата (без копирования)
+        taken = camera.capture_thread.take()
+        if taken is None:
             return
+        camera.frame_count, frame, camera.frame_time = taken
 
-        if scan_started:
-            det = Aruco.ArucoMarkerDetector(dict_type="aruco_original")
-            result = det.detect_markers(frame, estimate_pose=True, draw=True)
-            scan_output = result
-            frame_rgb = cv2.cvtColor(result['image'], cv2.COLOR_BGR2RGB)
-        else:
-            # Конвертируем BGR (OpenCV) в RGB (DearPyGui)
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Нормализуем значения пикселей (0-255 -> 0.0-1.0)
-        frame_normalized = frame_rgb.astype(np.float32) / 255.0
-
-        if calibration:
-            drawer = TextureDrawer.TextureDrawer(frame_normalized)
-            for i in range(len(calibration) - 2):
-                color = [255, 0, 0]
-                for j in range(len(scan_output['markers_info'])):
-                    if point_in_circle(
-                            calibration[str(i)]['center'][0],
-                            calibration[str(i)]['center'][1],
-                            calibration[str(i)]['size'] / 2 * calibration[str(i)]['tolerance'],
-                            scan_output['markers_info'][j]['center'][0],
-                            scan_output['markers_info'][j]['center'][1]):
-                        color = [0, 255, 0]
-                        break
-                frame_normalized = drawer.draw_circle(
-                    calibration[str(i)]['center'][0],
-                    calibration[str(i)]['center'][1],
-                    calibration[str(i)]['size'] / 2 * calibration[str(i)]['tolerance'],
-                    color,
-                    thickness=2
-                )
-                frame_normalized = drawer.draw_text(
-                    calibration[str(i)]['center'][0] - calibration[str(i)]['size'] / 2 * calibration[str(i)]['tolerance'],
-                    calibration[str(i)]['center'][1] - calibration[str(i)]['size'] / 2 * calibration[str(i)]['tolerance'],
-                    calibration[str(i)]['id'],
-                    [255, 0, 255],
-                    scale=int(calibration[str(i)]['size'] * calibration[str(i)]['tolerance'] / 8 / 5)
-                )
+        # Детекция, метрики, поток детекций и общая память; маркеры рисуются прямо в кадр
+        result = pipeline.process(camera.frame_count, frame, camera.frame_time, detect=scan_started,
+                                  estimate_pose=True, draw=True, calibrating=auto_calibrator.active)
+        # Ошибка общей памяти выключает ее в конвейере
+        ui_state.set_value("frame_bus_toggle", pipeline.frame_bus_enabled)
 
-        ip=dpg.get_value("webcam_ip_input").split(".")[3]
-        l1=generate_packet("L1")
-        l2=generate_packet("L2")
-        l3=generate_packet("L3")
-        l4=generate_packet("L4")
-        l5=generate_packet("L5")
-        l6=generate_packet("L6")
-        result = f"C:{ip}:0:{l1}:{l2}:{l3}:{l4}:{l5}:{l6}:0#"
-        dpg.configure_item("output_format", default_value=f"Format: {result}")
+        frame_pool = pipeline.frame_pool
+        if (frame_pool.width, frame_pool.height) != (camera.width, camera.height):
+            # Камера отдает кадры другого размера - пул перестроен, подгоняем превью
+            camera.width, camera.height = frame_pool.width, frame_pool.height
+            preview.configure(camera.width, camera.height)
 
-        # Обновляем текстуру
-        dpg.set_value("image_texture", frame_normalized)
+        if result is not None:
+            scan_output = result
+            if auto_calibrator.active and auto_calibrator.add(scan_output['corners']):
+                finish_auto_calibration()
+
+        if preview.is_due(camera.frame_count):
+            # Уменьшаем кадр, конвертируем BGR (OpenCV) в RGB (DearPyGui) и нормализуем (0-255 -> 0.0-1.0)
+            with profiler.span("render"):
+                frame_normalized = preview.render(frame)
+
+            if calibration:
+                with profiler.span("match"):
+                    occupancy = get_zones_occupancy()
+                with profiler.span("overlay"):
+                    version = pipeline.calibration_version
+                    if not zone_overlay.is_valid(version, frame_normalized.shape, preview.scale):
+                        zone_overlay.rebuild(calibration, version, frame_normalized.shape, preview.scale)
+                    zone_overlay.update(occupancy)
+                    zone_overlay.apply(frame_normalized)
+
+            # Обновляем текстуру
+            with profiler.span("upload"):
+                preview.upload(camera.frame_count)
+            if startup_timer.mark("first_frame"):
+                log_message(startup_timer.report())
+
+        with profiler.span("match"):
+            packet = build_packet()
+        ui_state.configure("output_format", default_value=f"Format: {packet}")
+
+
+def update_loop_status():
+    """Вывод фактической частоты задач главного цикла"""
+    stats = loop_scheduler.get_stats()
+    parts = [f"{name} {task['rate']:.1f}/{task['target_rate']:.0f} Hz" for name, task in stats.items() if task['show_in_status']]
+    missed = sum(task['missed'] for task in stats.values())
+    ui_state.configure(
+        "loop_status",
+        default_value=f"Loop: {' | '.join(parts)} | missed deadlines: {missed}",
+        color=(255, 150, 100) if missed else (150, 150, 150)
+    )
 
 
 def on_calibrate_btn(sender, app_data):
-    def find_length(start: list, end: list):
-        return math.sqrt(abs(end[0] - start[0]) ** 2 + abs(end[1] - start[1]) ** 2)
-
     global camera_selected
     global scan_started
-    global scan_output
-    global calibration
     camera = selected_cam
-    k = tolerance
 
     if camera is None:
         log_message("Camera is not selected", "ERROR")
@@ -193,58 +238,125 @@ def on_calibrate_btn(sender, app_data):
         log_message("Camera is not scanning", "ERROR")
         return
 
-    if not scan_output['markers_info']:
+    # Детекции накапливаются в update_camera_frame, результат - в finish_auto_calibration
+    auto_calibrator.start()
+    dpg.configure_item("calibration_info", default_value="Calibrating...")
+    log_message(f"Calibration started ({auto_calibrator.frames} frames / {auto_calibrator.duration:.1f} s)")
+
+
+def finish_auto_calibration():
+    """Построение калибровки по накопленным кадрам"""
+    global tolerance
+    camera = selected_cam
+
+    new_calibration, report = auto_calibrator.result(camera.width, camera.height, tolerance)
+    if len(new_calibration) <= 2:
+        dpg.configure_item("calibration_info", default_value=f"Calibrated positions: {max(0, len(calibration) - 2)}")
         log_message("Markers are not found", "ERROR")
         return
 
-    # Основная логика
-    calibration['width'] = camera.width
-    calibration['height'] = camera.height
-    for i, marker in enumerate(scan_output['markers_info']):
-        calibration[str(i)] = {
-            "center": marker['center'],
-            "id": str(i),
-            "size": round(math.sqrt(
-                find_length(marker['corners'][0][0], marker['corners'][0][1]) ** 2 +
-                find_length(marker['corners'][0][1], marker['corners'][0][2]) ** 2
-            )),
-            "tolerance": k,
-            "line_attachment": ""
-        }
-    dpg.configure_item("calibration_info", default_value=f"Calibrated positions: {len(calibration) - 2}")
-    update_reassignment_ui()
-    update_assignment_ui()
-    log_message(calibration)
+    # Множитель области увеличивается, если маркеры дрожат сильнее текущего запаса
+    suggested = report['suggested_tolerance']
+    if suggested > tolerance:
+        tolerance = suggested
+        dpg.set_value("tolerance_multiplier_input", tolerance)
+        for marker in new_calibration:
+            if marker != "width" and marker != "height":
+                new_calibration[marker]['tolerance'] = tolerance
+
+    apply_calibration(new_calibration)
+    for position in report['positions']:
+        log_message(f"Position {position['id']}: size {position['size']:.0f}px, "
+                    f"jitter {position['jitter']:.2f}px, seen {position['presence']:.0%}")
+    if report['rejected']:
+        log_message(f"Ignored {report['rejected']} unstable detections", "WARNING")
+    log_message(f"Calibrated {len(calibration) - 2} positions over {report['frames']} frames "
+                f"(suggested tolerance {suggested:.2f})", "SUCCESS")
 
 
 def on_reset_calibrate(sender, app_data):
     global calibration
+    auto_calibrator.cancel()
     calibration = {}
+    pipeline.set_calibration(calibration)
     dpg.configure_item("calibration_info", default_value=f"Calibrated positions: {len(calibration)}")
     update_reassignment_ui()
     update_assignment_ui()
     log_message("Calibration reset", "SUCCESS")
 
 
+def _profile_name():
+    if dpg.does_item_exist("profile_name"):
+        return dpg.get_value("profile_name").strip() or config.CALIBRATION_PROFILE
+    return config.CALIBRATION_PROFILE
+
+
 def on_save_calibration(sender, app_data):
-    global calibration
-    with open('calibration.json', 'w', encoding='utf-8') as f:
-        json.dump(calibration, f, ensure_ascii=False, indent=2)
-    log_message("Calibration saved", "SUCCESS")
+    name = _profile_name()
+    try:
+        calibration_store.save(name, calibration)
+    except (OSError, ValueError) as e:
+        log_message(f"Calibration not saved: {e}", "ERROR")
+        return
+    update_profiles_ui()
+    log_message(f"Calibration saved to profile '{name}'", "SUCCESS")
 
 
 def on_load_calibration(sender, app_data):
-    if scan_started:
-        global calibration
-        with open('calibration.json', 'r', encoding='utf-8') as f:
-            calibration = json.load(f)
-        dpg.configure_item("calibration_info", default_value=f"Calibrated positions: {len(calibration) - 2}")
-        update_reassignment_ui()
-        update_assignment_ui()
-        log_message("Calibration loaded", "SUCCESS")
-        log_message(calibration)
+    # Чтение и проверка файла идут в рабочем потоке, результат применяет poll_calibration_store
+    calibration_store.load_async(_profile_name())
+
+
+def on_select_profile(sender, app_data):
+    dpg.set_value("profile_name", app_data)
+    calibration_store.load_async(app_data)
+
+
+def on_toggle_profile_watch(sender, app_data):
+    if app_data:
+        calibration_store.start_watching()
     else:
-        log_message("Camera not scanning", "ERROR")
+        calibration_store.stop_watching()
+
+
+def poll_calibration_store():
+    """Применение калибровки, загруженной в фоне (задача главного цикла)"""
+    loaded = calibration_store.take_loaded()
+    if loaded is None:
+        return
+    name, new_calibration, error = loaded
+    if error is not None:
+        log_message(f"Profile '{name}' not loaded: {error}", "ERROR")
+        return
+
+    apply_calibration(new_calibration)
+    log_message(f"Calibration profile '{name}' loaded: {len(calibration) - 2} positions", "SUCCESS")
+
+
+def apply_calibration(new_calibration):
+    """Атомарная замена текущей калибровки"""
+    global calibration
+    calibration = new_calibration
+    pipeline.set_calibration(calibration)
+    dpg.configure_item("calibration_info", default_value=f"Calibrated positions: {max(0, len(calibration) - 2)}")
+    update_reassignment_ui()
+    update_assignment_ui()
+
+
+def import_legacy_calibration():
+    """Перенос calibration.json старых версий в профиль по умолчанию (при первом запуске)"""
+    try:
+        if calibration_store.import_legacy(config.LEGACY_CALIBRATION_FILE, config.CALIBRATION_PROFILE):
+            log_message(f"{config.LEGACY_CALIBRATION_FILE} imported to profile '{config.CALIBRATION_PROFILE}'", "SUCCESS")
+            update_profiles_ui()
+    except (OSError, ValueError) as e:
+        log_message(f"{config.LEGACY_CALIBRATION_FILE} not imported: {e}", "ERROR")
+
+
+def update_profiles_ui():
+    """Обновление списка профилей калибровки"""
+    if dpg.does_item_exist("profile_select"):
+        dpg.configure_item("profile_select", items=calibration_store.list_profiles())
 
 
 def on_change_tolerance(sender, app_data):
@@ -258,50 +370,40 @@ def on_update_tolerance(sender, app_data):
 
     if calibration:
         for marker in calibration:
+            if marker == "width" or marker == "height":
+                continue
             calibration[marker]['tolerance'] = tolerance
-        log_message(calibration)
+        calibration_changed()
+        log_message(f"Tolerance {tolerance} applied to {len(calibration) - 2} positions", "SUCCESS")
     else:
         log_message("Calibration not find", "ERROR")
 
 
-def point_in_circle(cx, cy, r, px, py):
-    squared_distance = (px - cx) ** 2 + (py - cy) ** 2
-    return squared_distance <= r * r
+def calibration_changed():
+    """Отметить изменение калибровки (слой разметки будет перерисован, детектор перенастроен)"""
+    pipeline.calibration_changed()
+
+
+def on_toggle_calibrated_detector(sender, app_data):
+    config.calibrated_detector = pipeline.calibrated_detector = app_data
+
+
+def on_toggle_reduced_dictionary(sender, app_data):
+    config.reduced_dictionary = pipeline.reduced_dictionary = app_data
+
+
+def get_zones_occupancy():
+    """Занятость каждой откалиброванной позиции маркером"""
+    return Packet.get_zones_occupancy(calibration, scan_output.get('markers_info', []))
 
 
 def update_reassignment_ui():
     """Обновление UI переназначения позиций"""
-    if dpg.does_item_exist("reassignment_group"):
-        dpg.delete_item("reassignment_group", children_only=True)
-
-        if len(calibration) > 0:
-            with dpg.group(parent="reassignment_group"):
-                dpg.add_input_int(
-                    label="Position 1",
-                    tag="reassign_from",
-                    default_value=0,
-                    width=80,
-                    parent="reassignment_group",
-                    min_value=0,
-                    max_value=len(calibration) - 2,
-                )
-                dpg.add_input_int(
-                    label="Position 2",
-                    tag="reassign_to",
-                    default_value=0,
-                    width=80,
-                    parent="reassignment_group",
-                    min_value=0,
-                    max_value=len(calibration) - 2,
-                )
-            dpg.add_button(
-                label="Swap",
-                callback=do_reassignment,
-                width=160,
-                parent="reassignment_group"
-            )
-        else:
-            dpg.add_text("No calibrated positions to reassign", parent="reassignment_group", color=(150, 150, 150))
+    has_positions = len(calibration) > 0
+    ui_state.configure("reassignment_empty", show=not has_positions)
+    ui_state.configure("reassignment_group", show=has_positions)
+    ui_state.configure("reassign_from", max_value=max(0, len(calibration) - 2))
+    ui_state.configure("reassign_to", max_value=max(0, len(calibration) - 2))
 
 
 def do_reassignment():
@@ -311,103 +413,105 @@ def do_reassignment():
         log_message("Position not found", "WARNING")
         return
     calibration[from_]['id'], calibration[to_]['id'] = calibration[to_]['id'], calibration[from_]['id']
+    calibration_changed()
+    update_assignment_ui()
     log_message(f"Swapped {from_} to {to_}", "SUCCESS")
 
 
 def _find_key(_id):
-    for key in calibration:
-        if key == "width" or key == "height":
-            continue
-        if calibration[key]['id'] == str(_id):
-            return key
-    return None
+    return Packet.find_key(calibration, _id)
 
 
 def update_assignment_ui():
-    """Обновление UI привязки позиций"""
-    if dpg.does_item_exist("assignment_group"):
-        dpg.delete_item("assignment_group", children_only=True)
-
-        if len(calibration) > 0:
-            num_positions = len(calibration)
-
-            for line_idx in range(1, 7):
-                with dpg.group(horizontal=True, parent="assignment_group"):
-                    dpg.add_text(f"L{line_idx}:", color=(255, 200, 100))
-
-                    # Создаем чекбоксы для каждой позиции
-                    for pos_idx in sorted(calibration.keys()):
-                        if pos_idx == "width" or pos_idx == "height":
-                            continue
-                        is_assigned = False
-                        if calibration[pos_idx]['line_attachment'] != "" and calibration[pos_idx]['line_attachment'] == f"L{line_idx}":
-                            is_assigned = True
-                        dpg.add_checkbox(
-                            tag=f"L{line_idx}-{pos_idx}",
-                            label=f"Pos{pos_idx}",
-                            default_value=is_assigned,
-                            callback=toggle_position_assignment,
-                            user_data=(line_idx, pos_idx)
-                        )
-        else:
-            dpg.add_text("No calibrated positions to assign", parent="assignment_group", color=(150, 150, 150))
+    """Обновление таблицы привязки позиций (меняются только изменившиеся строки)"""
+    positions = max(0, len(calibration) - 2)
+    assignment_table.update(calibration)
+    ui_state.configure("assignment_empty", show=positions == 0)
+    ui_state.configure("assignment_controls", show=positions > 0)
+    ui_state.configure("bulk_from", max_value=max(0, positions - 1))
+    ui_state.configure("bulk_to", max_value=max(0, positions - 1))
+
+
+def set_position_line(key, line):
+    """Привязка позиции к линии (выбор в таблице)"""
+    if key not in calibration:
+        return
+    calibration[key]['line_attachment'] = line
+    if line:
+        log_message(f"Mark num-{key} attached to line {line}", "SUCCESS")
+    else:
+        log_message(f"Mark num-{key} detached from line", "SUCCESS")
 
 
-def toggle_position_assignment(sender, app_data):
-    if app_data:
-        calibration[f'{sender.split('-')[1]}']['line_attachment'] = sender.split('-')[0]
-        log_message(f"Mark num-{sender.split('-')[1]} attached to line {sender.split('-')[0]}", "SUCCESS")
-    else:
-        calibration[f'{sender.split('-')[1]}']['line_attachment'] = ""
-        log_message(f"Mark num-{sender.split('-')[1]} detached from line {sender.split('-')[0]}", "SUCCESS")
+def on_bulk_assign(sender, app_data):
+    """Привязка диапазона позиций к одной линии"""
+    first, last = sorted((dpg.get_value("bulk_from"), dpg.get_value("bulk_to")))
+    line = dpg.get_value("bulk_line")
+    line = "" if line == NO_LINE else line
+    keys = [str(i) for i in range(first, last + 1) if str(i) in calibration]
+    if not keys:
+        log_message("Positions not found", "WARNING")
+        return
+    for key in keys:
+        calibration[key]['line_attachment'] = line
+    update_assignment_ui()
+    log_message(f"Positions {first}-{last} attached to line {line}" if line else
+                f"Positions {first}-{last} detached from lines", "SUCCESS")
 
 
-def send_camera_data(ip="228", l1="0", l2="0", l3="0", l4="0", l5="0", l6="0"):
-    """Отправка данных по UDP"""
-    message = f"C:{ip}:0:{l1}:{l2}:{l3}:{l4}:{l5}:{l6}:0#"
-    try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.sendto(bytes(message, "utf-8"), (config.UDP_IP, config.UDP_PORT))
-        sock.close()
-        return True, message
-    except Exception as e:
-        return False, str(e)
+def build_packet():
+    """Формирование пакета для ControlCenter"""
+    return pipeline.build_packet(scan_output.get('markers_info', []), ui_state.get("webcam_ip_input"))
+
 
+def send_camera_data(message, destinations=None):
+    """Отправка данных по UDP (пакет кодируется один раз и уходит в фоновый поток отправки)"""
+    if destinations is None:
+        destinations = [destination for destination in udp_destinations if destination.enabled]
+    if not destinations:
+        return False, "No enabled destinations"
+    # Тестовый режим: номер пакета и время захвата кадра для ControlCenterStub
+    return True, pipeline.send_packet(message, destinations, config.udp_test_mode)
 
-def generate_packet(line):
-    array = list()
-    for obj in calibration:
-        if obj == "width" or obj == "height":
-            continue
-        if calibration[obj]['line_attachment'] == line:
-            array.append(str(get_marker_in_circle(obj))) #Определение метки в окружности
 
-    return ','.join(array) if len(array) > 0 else "0"
+def udp_status_text(mode):
+    """Текст статуса UDP со счетчиками отправителя"""
+    stats = pipeline.udp_sender.get_stats()
+    text = f"UDP: {mode} | sent {stats['sent']}, failed {stats['failed']}, {stats['avg_latency'] * 1000:.2f} ms"
+    if stats['failed'] and pipeline.udp_sender.last_error:
+        text += f" | last error: {pipeline.udp_sender.last_error}"
+    return text
 
 
-def get_marker_in_circle(number_circle):
-    for i in range(len(scan_output['markers_info'])):
-        if point_in_circle(
-                calibration[str(_find_key(number_circle))]['center'][0],
-                calibration[str(_find_key(number_circle))]['center'][1],
-                calibration[str(_find_key(number_circle))]['size'] / 2 * calibration[str(_find_key(number_circle))]['tolerance'],
-                scan_output['markers_info'][i]['center'][0],
-                scan_output['markers_info'][i]['center'][1]):
-            return scan_output['markers_info'][i]['id']
-    return 0
+def destination_status_text(destination):
+    """Текст состояния отдельного адреса назначения"""
+    stats = destination.get_stats()
+    text = f"sent {stats['sent']}, failed {stats['failed']}, {stats['avg_latency'] * 1000:.2f} ms"
+    if stats['last_error']:
+        text += f" | {stats['last_error']}"
+    return text
+
+
+def on_change_webcam_ip(sender, app_data):
+    # Пакеты собираются из последнего правильного адреса, пока ввод не станет IPv4 адресом
+    if Packet.is_valid_ip(app_data):
+        ui_state.set("webcam_ip_input", app_data)
+    else:
+        log_message(f"Invalid camera IP '{app_data}', packets use {ui_state.get('webcam_ip_input')}", "WARNING",
+                    key="webcam_ip_invalid")
 
 
 def toggle_udp():
     """Переключение UDP отправки"""
     config.udp_enabled = not config.udp_enabled
     if config.udp_enabled:
-        dpg.configure_item("udp_btn", label="Stop UDP")
-        dpg.configure_item("udp_status", default_value="UDP: Enabled")
-        dpg.configure_item("udp_status", color=(100, 255, 100))
+        for destination in udp_destinations:
+            destination.scheduler.reset()
+        ui_state.configure("udp_btn", label="Stop UDP")
+        ui_state.configure("udp_status", default_value="UDP: Enabled", color=(100, 255, 100))
     else:
-        dpg.configure_item("udp_btn", label="Start UDP")
-        dpg.configure_item("udp_status", default_value="UDP: Disabled")
-        dpg.configure_item("udp_status", color=(255, 150, 100))
+        ui_state.configure("udp_btn", label="Start UDP")
+        ui_state.configure("udp_status", default_value="UDP: Disabled", color=(255, 150, 100))
 
 
 def send_udp_once():
@@ -416,24 +520,15 @@ def send_udp_once():
         log_message("Status: No calibration data to send", "WARNING")
         return
 
-    success, result = send_camera_data(
-        ip=dpg.get_value("webcam_ip_input").split(".")[3],
-        l1=generate_packet("L1"),
-        l2=generate_packet("L2"),
-        l3=generate_packet("L3"),
-        l4=generate_packet("L4"),
-        l5=generate_packet("L5"),
-        l6=generate_packet("L6")
-    )
+    success, result = send_camera_data(build_packet())
 
     if success:
         log_message(f"Status: UDP sent - {result}", "SUCCESS")
-        dpg.configure_item("udp_status", default_value=f"UDP: Manual send")
-        dpg.configure_item("udp_status", color=(100, 255, 100))
+        ui_state.configure("udp_status", default_value=udp_status_text("Manual send"), color=(100, 255, 100))
+        update_destinations_status()
     else:
         log_message(f"Status: UDP error - {result}", "ERROR")
-        dpg.configure_item("udp_status", default_value=f"UDP Error: {result}")
-        dpg.configure_item("udp_status", color=(255, 100, 100))
+        ui_state.configure("udp_status", default_value=f"UDP Error: {result}", color=(255, 100, 100))
 
 
 def send_udp_data():
@@ -442,67 +537,279 @@ def send_udp_data():
         return
 
     if len(calibration) < 1:
-        log_message("Status: No calibration data to send", "ERROR")
+        log_message("Status: No calibration data to send", "ERROR", key="udp_no_calibration")
         return
 
-    success, result = send_camera_data(
-        ip=dpg.get_value("webcam_ip_input").split(".")[3],
-        l1=generate_packet("L1"),
-        l2=generate_packet("L2"),
-        l3=generate_packet("L3"),
-        l4=generate_packet("L4"),
-        l5=generate_packet("L5"),
-        l6=generate_packet("L6")
-    )
+    with profiler.span("match"):
+        packet = build_packet()
+    # У каждого адреса свой интервал heartbeat, пакет кодируется один раз
+    destinations = pipeline.due_destinations(packet, udp_destinations)
+    if not destinations:
+        return
+
+    success, result = send_camera_data(packet, destinations)
 
     if success:
-        log_message(f"Status: UDP sent - {result}", "SUCCESS")
-        dpg.configure_item("udp_status", default_value=f"UDP: Auto send")
-        dpg.configure_item("udp_status", color=(100, 255, 100))
+        log_message(f"Status: UDP sent to {', '.join(d.name for d in destinations)} - {result}", "SUCCESS", key="udp_auto_send")
+        ui_state.configure("udp_status", default_value=udp_status_text("Auto send"), color=(100, 255, 100))
+        update_destinations_status()
     else:
-        log_message(f"Status: UDP error - {result}", "ERROR")
-        dpg.configure_item("udp_status", default_value=f"UDP Error: {result}")
-        dpg.configure_item("udp_status", color=(255, 100, 100))
+        log_message(f"Status: UDP error - {result}", "ERROR", key="udp_auto_error")
+        ui_state.configure("udp_status", default_value=f"UDP Error: {result}", color=(255, 100, 100))
 
 
-def update_udp_configuration():
-    config.UDP_IP = dpg.get_value("udp_ip_input")
-    config.UDP_PORT = dpg.get_value("udp_port_input")
+def on_toggle_detection_server(sender, app_data):
+    """Включение/выключение потоковой передачи детекций по TCP"""
+    config.detection_server_enabled = app_data
+    if app_data:
+        try:
+            pipeline.start_detection_server()
+        except OSError as e:
+            config.detection_server_enabled = False
+            if dpg.does_item_exist("detection_server_toggle"):
+                dpg.set_value("detection_server_toggle", False)
+            log_message(f"Detection stream error: {e}", "ERROR")
+            return
+        server = pipeline.detection_server
+        log_message(f"Detection stream started on {server.host}:{server.port}", "SUCCESS")
+    else:
+        pipeline.stop_detection_server()
+        log_message("Detection stream stopped")
 
 
-def clear_logs():
-    """Очистка логов"""
-    if dpg.does_item_exist("log_window"):
-        dpg.delete_item("log_window", children_only=True)
-        log_message("Logs cleared", "INFO")
-
-
-def log_message(message: str, level: str = "INFO"):
-    """Добавление сообщения в лог"""
-    timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-    color_map = {
-        "INFO": (255, 255, 255),
-        "SUCCESS": (0, 255, 0),
-        "WARNING": (255, 255, 0),
-        "ERROR": (255, 0, 0)
-    }
-
-    if dpg.does_item_exist("log_window"):
+def on_toggle_metrics(sender, app_data):
+    """Включение/выключение HTTP сервера метрик"""
+    global metrics_server
+    config.metrics_enabled = app_data
+    if app_data:
+        if metrics_server is None:
+            from Metrics import MetricsServer
+            pipeline.start_metrics()
+            metrics_server = MetricsServer(lambda: collect_metrics(), port=config.METRICS_PORT)
         try:
-            with dpg.mutex():
-                dpg.add_text(
-                    f"[{timestamp}] [{level}] {message}",
-                    parent="log_window",
-                    color=color_map.get(level, (255, 255, 255))
+            metrics_server.start()
+        except OSError as e:
+            config.metrics_enabled = False
+            if dpg.does_item_exist("metrics_toggle"):
+                dpg.set_value("metrics_toggle", False)
+            log_message(f"Metrics endpoint error: {e}", "ERROR")
+            return
+        log_message(f"Metrics endpoint: http://{metrics_server.host}:{metrics_server.port}/metrics", "SUCCESS")
+    elif metrics_server is not None:
+        metrics_server.stop()
+        log_message("Metrics endpoint stopped")
+
+
+def on_toggle_frame_bus(sender, app_data):
+    """Включение/выключение публикации кадров в общую память"""
+    config.frame_bus_enabled = app_data
+    pipeline.set_frame_bus(app_data)
+    if app_data:
+        name = pipeline.frame_bus_name
+        log_message(f"Frame bus '{name}' enabled: python FrameBus.py --name {name}", "SUCCESS")
+    else:
+        log_message("Frame bus stopped")
+
+
+def collect_metrics():
+    """Метрики для /metrics (вызывается из потока HTTP сервера)"""
+    camera = selected_cam
+    return pipeline.collect_metrics(
+        list(udp_destinations), log_buffer,
+        capture=camera.capture_thread if camera is not None else None,
+        scheduler=loop_scheduler,
+        markers=scan_output.get('markers_info', []) if scan_started else []
+    )
+
+
+def on_toggle_test_mode(sender, app_data):
+    config.udp_test_mode = app_data
+
+
+def on_change_min_gap(sender, app_data):
+    config.udp_min_gap = max(0.0, round(app_data, 3))
+    for destination in udp_destinations:
+        destination.scheduler.min_gap = config.udp_min_gap
+
+
+def on_add_destination(sender, app_data):
+    udp_destinations.append(UdpDestination(
+        config.UDP_IP,
+        config.UDP_PORT,
+        name=f"Destination {len(udp_destinations) + 1}",
+        interval=config.udp_heartbeat,
+        min_gap=config.udp_min_gap
+    ))
+    update_destinations_ui()
+
+
+def on_remove_destination(sender, app_data, user_data):
+    if user_data in udp_destinations:
+        udp_destinations.remove(user_data)
+        log_message(f"Destination {user_data.name} removed", "SUCCESS")
+    update_destinations_ui()
+
+
+def on_change_destination(sender, app_data, user_data):
+    destination, field = user_data
+    if field == "ip":
+        destination.ip = app_data
+    elif field == "port":
+        destination.port = int(app_data)
+    elif field == "interval":
+        destination.interval = max(0.05, round(app_data, 2))
+    elif field == "enabled":
+        destination.enabled = app_data
+        destination.scheduler.reset()
+
+
+def update_destinations_ui():
+    """Обновление таблицы адресов назначения UDP"""
+    if dpg.does_item_exist("destinations_group"):
+        dpg.delete_item("destinations_group", children_only=True)
+
+        for i, destination in enumerate(udp_destinations):
+            with dpg.group(horizontal=True, parent="destinations_group"):
+                dpg.add_checkbox(
+                    label=destination.name,
+                    default_value=destination.enabled,
+                    callback=on_change_destination,
+                    user_data=(destination, "enabled")
+                )
+                dpg.add_text("IP:")
+                dpg.add_input_text(
+                    default_value=destination.ip,
+                    width=120,
+                    on_enter=True,
+                    callback=on_change_destination,
+                    user_data=(destination, "ip")
+                )
+                dpg.add_text("Port:")
+                dpg.add_input_int(
+                    default_value=destination.port,
+                    width=100,
+                    min_value=1,
+                    max_value=65535,
+                    min_clamped=True,
+                    max_clamped=True,
+                    callback=on_change_destination,
+                    user_data=(destination, "port")
                 )
-            dpg.set_y_scroll("log_window", dpg.get_y_scroll_max("log_window"))
-        except:
-            pass
+                dpg.add_input_float(
+                    label="max interval, s",
+                    default_value=destination.interval,
+                    min_value=0.05,
+                    min_clamped=True,
+                    step=0.1,
+                    format="%.2f",
+                    width=100,
+                    callback=on_change_destination,
+                    user_data=(destination, "interval")
+                )
+                dpg.add_button(
+                    label="Remove",
+                    width=80,
+                    callback=on_remove_destination,
+                    user_data=destination
+                )
+                dpg.add_text(destination_status_text(destination), tag=f"destination_status_{i}", color=(150, 150, 150))
+                ui_state.forget(f"destination_status_{i}")
+
+        dpg.add_button(label="Add destination", width=160, callback=on_add_destination, parent="destinations_group")
+
+
+def update_destinations_status():
+    """Обновление статистики адресов назначения в таблице"""
+    for i, destination in enumerate(udp_destinations):
+        color = (100, 255, 100) if destination.is_healthy() else (255, 100, 100)
+        ui_state.configure(f"destination_status_{i}", default_value=destination_status_text(destination), color=color)
+
+
+def on_toggle_profiler(sender, app_data):
+    """Включение/выключение замера этапов"""
+    profiler.enabled = app_data
+    profiler.reset()
+
+
+def on_toggle_motion_gate(sender, app_data):
+    """Включение/выключение пропуска детекции на неподвижных кадрах"""
+    config.motion_gate_enabled = pipeline.motion_gate_enabled = app_data
+    pipeline.reset()
+
+
+def on_record_trace(sender, app_data):
+    """Запись трассировки на заданное число секунд"""
+    if profiler.recording:
+        return
+    seconds = max(1, dpg.get_value("trace_seconds"))
+    profiler.start_recording(seconds, cprofile=dpg.get_value("trace_cprofile"))
+    ui_state.configure("trace_status", default_value=f"Recording {seconds} s...", color=(255, 255, 0))
+    log_message(f"Trace recording started ({seconds} s)")
+
+
+def update_performance():
+    """Обновление вкладки "Performance" и завершение записи трассировки (задача главного цикла)"""
+    path = profiler.poll(config.TRACE_DIR)
+    if path is not None:
+        ui_state.configure("trace_status", default_value=f"Saved: {path}", color=(100, 255, 100))
+        log_message(f"Trace saved: {path}", "SUCCESS")
+
+    # Вкладка строится при первом открытии
+    if not dpg.does_item_exist("performance_group") or not dpg.is_item_visible("performance_group"):
+        return
+    stats = profiler.get_stats()
+    for stage in STAGES:
+        stage_stats = stats.get(stage)
+        if stage_stats is None:
+            text = f"{stage:<8} -"
+        else:
+            text = (f"{stage:<8} {stage_stats['avg'] * 1000:8.2f} ms avg {stage_stats['max'] * 1000:8.2f} ms max "
+                    f"{stage_stats['rate']:6.1f}/s")
+        ui_state.configure(f"perf_{stage}", default_value=text)
+
+    # Частоты и очереди
+    tasks = loop_scheduler.get_stats()
+    capture = selected_cam.capture_thread if selected_cam is not None else None
+    udp = pipeline.udp_sender.get_stats()
+    server = pipeline.detection_server
+    stream = server.get_stats() if server is not None else {'clients': 0, 'dropped': 0}
+    motion_gate = pipeline.motion_gate
+    ui_state.configure("perf_rates", default_value=(
+        f"FPS: capture {stats.get('capture', {}).get('rate', 0.0):.1f}, "
+        f"detect {tasks['frame']['rate']:.1f}, ui {tasks['ui']['rate']:.1f}, output {tasks['output']['rate']:.1f} | "
+        f"preview uploads {preview.uploads}, skipped {preview.skipped} | "
+        f"detection full {motion_gate.stats['full']}, partial {motion_gate.stats['partial']}, "
+        f"reused {motion_gate.stats['reused']}"
+    ))
+    ui_state.configure("perf_queues", default_value=(
+        f"Queues: frames dropped {capture.frames - capture.taken if capture is not None else 0}, "
+        f"UDP pending {udp['pending']} (dropped {udp['dropped']}), "
+        f"stream clients {stream['clients']} (dropped {stream['dropped']}) | "
+        f"UI writes {ui_state.writes}, skipped {ui_state.skipped}"
+    ))
+
+
+def clear_logs():
+    """Очистка логов"""
+    log_buffer.clear()
+    log_view.offset = 0
+    log_message("Logs cleared", "INFO")
+
+
+def on_log_scroll(sender, app_data):
+    """Прокрутка лога колесом мыши"""
+    if dpg.does_item_exist("log_window") and dpg.is_item_hovered("log_window"):
+        log_view.scroll(int(app_data) * 3)
+        log_view.flush()
+
 
+def log_message(message: str, level: str = "INFO", key: str = None):
+    """
+    Добавление сообщения в лог
 
-def send_interval(interval, timer, func):
-    now = datetime.datetime.now().timestamp()
-    if now - timer > interval:
-        func()
-        return now
-    return timer
\ No newline at end of file
+    Args:
+        message: Текст сообщения
+        level: Уровень (INFO, SUCCESS, WARNING, ERROR)
+        key: Ключ ограничения частоты для часто повторяющихся сообщений
+    """
+    log_buffer.add(message, level, key)
@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import signal
+from typing import Dict
+import cv2
+import Packet
+from Capture import CaptureThread
+from CalibrationStore import CalibrationStore
+from Logger import LogBuffer, RotatingFileSink
+from LoopScheduler import LoopScheduler
+from Pipeline import FramePipeline
+from UdpSender import UdpDestination
+import config
+
+# Настройки по умолчанию, файл настроек переопределяет любые из них
+DEFAULT_SETTINGS = {
+    "camera": {"id": 0, "width": 640, "height": 480},
+    "webcam_ip": config.WEBCAM_IP,
+    "dict_type": "aruco_original",
+    "calibration_dir": config.CALIBRATION_DIR,
+    "calibration_profile": config.CALIBRATION_PROFILE,
+    "watch_calibration": False,
+    "detect_fps": config.detect_fps,
+    "motion_gate": config.motion_gate_enabled,
+    "calibrated_detector": config.calibrated_detector,
+    "reduced_dictionary": config.reduced_dictionary,
+    "marker_ids": config.MARKER_IDS,
+    "output_rate": config.output_rate,
+    "min_gap": config.udp_min_gap,
+    "destinations": config.UDP_DESTINATIONS,
+    "test_mode": config.udp_test_mode,
+    "detection_server": config.detection_server_enabled,
+    "detection_port": config.DETECTION_SERVER_PORT,
+    "metrics": config.metrics_enabled,
+    "metrics_port": config.METRICS_PORT,
+    "frame_bus": config.frame_bus_enabled,
+    "frame_bus_name": config.FRAME_BUS_NAME,
+    "log_file": config.LOG_FILE,
+    "status_interval": 60.0
+}
+
+
+def load_settings(path: str) -> Dict:
+    """
+    Чтение файла настроек поверх настроек по умолчанию
+
+    Raises:
+        OSError: если файл не читается
+        ValueError: если файл не является JSON объектом, webcam_ip не IPv4 адрес или status_interval не число
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        loaded = json.load(f)
+    if not isinstance(loaded, dict):
+        raise ValueError("settings must be an object")
+    settings = json.loads(json.dumps(DEFAULT_SETTINGS))
+    for key, value in loaded.items():
+        if isinstance(value, dict) and isinstance(settings.get(key), dict):
+            settings[key].update(value)
+        else:
+            settings[key] = value
+    if not Packet.is_valid_ip(settings['webcam_ip']):
+        raise ValueError(f"webcam_ip must be an IPv4 address, got {settings['webcam_ip']!r}")
+    interval = settings['status_interval']
+    if isinstance(interval, bool) or not isinstance(interval, (int, float)):
+        raise ValueError(f"status_interval must be a number of seconds (0 - no status), got {interval!r}")
+    return settings
+
+
+class HeadlessApp:
+    """
+    Работа без интерфейса: захват -> детекция -> пакет.
+
+    Камера, калибровка и адреса UDP берутся из файла настроек. DearPyGui не
+    импортируется, кадр не конвертируется для отображения. SIGTERM и SIGINT
+    завершают работу, SIGHUP перечитывает файл настроек и профиль калибровки.
+    """
+
+    def __init__(self, settings_path: str):
+        self.settings_path = settings_path
+        self.settings = load_settings(settings_path)
+
+        self.log_buffer = LogBuffer(config.log_capacity)
+        self.log_buffer.sinks.append(self._print)
+        self.log_file = RotatingFileSink(self.settings['log_file'])
+        self.log_buffer.sinks.append(self.log_file.write)
+
+        self.scheduler = LoopScheduler()
+        self.pipeline = FramePipeline(self.settings['dict_type'], log=self.log,
+                                      detection_port=self.settings['detection_port'],
+                                      frame_bus_name=self.settings['frame_bus_name'])
+        self.metrics_server = None  # Создается при первом включении метрик
+        self.calibration_store = CalibrationStore(self.settings['calibration_dir'])
+
+        self.cap = None
+        self.capture_thread = None
+        self.destinations = []
+        self.markers = []
+        self.frame_count = 0
+        self._camera_settings = None
+        self._running = False
+        self._reload_requested = False
+
+    @staticmethod
+    def _print(timestamp: float, level: str, message: str):
+        print(LogBuffer.format([timestamp, level, message, 1]), flush=True)
+
+    def log(self, message: str, level: str = "INFO", key: str = None):
+        self.log_buffer.add(message, level, key)
+
+    def _on_signal(self, signum, frame):
+        # Только флаги: вся работа выполняется в главном цикле
+        if signum == getattr(signal, "SIGHUP", None):
+            self._reload_requested = True
+        else:
+            self._running = False
+
+    def run(self):
+        """Главный цикл до SIGTERM/SIGINT"""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_signal)
+
+        self.log_file.start()
+        self.import_legacy_calibration()
+        self._apply_settings()
+        self.scheduler.add_task("frame", self.process_frame, self.settings['detect_fps'], on_event=True)
+        self.scheduler.add_task("output", self.send_packet, self.settings['output_rate'])
+        self.scheduler.add_task("calibration", self.poll_calibration, 10, show_in_status=False)
+        if self.settings['status_interval'] > 0:
+            # 0 или меньше - статистика не пишется
+            self.scheduler.add_task("status", self.log_status, 1.0 / self.settings['status_interval'],
+                                    show_in_status=False)
+
+        self._running = True
+        self.log(f"Headless mode started ({self.settings_path})", "SUCCESS")
+        try:
+            while self._running:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.reload()
+                self.scheduler.run_once()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._close_camera()
+        self.pipeline.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.calibration_store.close()
+        self.log("Headless mode stopped")
+        self.log_file.stop()
+
+    def reload(self):
+        """Перечитывание файла настроек и профиля калибровки (SIGHUP)"""
+        try:
+            self.settings = load_settings(self.settings_path)
+        except (OSError, ValueError) as e:
+            self.log(f"Settings not reloaded: {e}", "ERROR")
+            return
+        self._apply_settings()
+        self.log("Settings reloaded", "SUCCESS")
+
+    def _apply_settings(self):
+        settings = self.settings
+        self.destinations = [
+            UdpDestination(**destination, min_gap=settings['min_gap'])
+            for destination in settings['destinations']
+        ]
+        for name, rate in (("frame", settings['detect_fps']), ("output", settings['output_rate'])):
+            task = self.scheduler.get_task(name)
+            if task is not None:
+                task.target_rate = rate
+
+        pipeline = self.pipeline
+        pipeline.set_dict_type(settings['dict_type'])
+        pipeline.motion_gate_enabled = settings['motion_gate']
+        pipeline.calibrated_detector = settings['calibrated_detector']
+        pipeline.reduced_dictionary = settings['reduced_dictionary']
+        pipeline.marker_ids = list(settings['marker_ids'])
+        pipeline.set_frame_bus(settings['frame_bus'], settings['frame_bus_name'])
+        pipeline.reset()
+
+        if settings['detection_server'] and not pipeline.detection_server_running:
+            try:
+                pipeline.start_detection_server()
+                server = pipeline.detection_server
+                self.log(f"Detection stream started on {server.host}:{server.port}")
+            except OSError as e:
+                self.log(f"Detection stream error: {e}", "ERROR")
+        elif not settings['detection_server']:
+            pipeline.stop_detection_server()
+
+        if settings['metrics'] and self.metrics_server is None:
+            from Metrics import MetricsServer
+            pipeline.start_metrics()
+            self.metrics_server = MetricsServer(self.collect_metrics, port=settings['metrics_port'])
+        if settings['metrics'] and not self.metrics_server.running:
+            try:
+                self.metrics_server.start()
+                self.log(f"Metrics endpoint: http://{self.metrics_server.host}:{self.metrics_server.port}/metrics")
+            except OSError as e:
+                self.log(f"Metrics endpoint error: {e}", "ERROR")
+        elif not settings['metrics'] and self.metrics_server is not None:
+            self.metrics_server.stop()
+
+        self.calibration_store.directory = settings['calibration_dir']
+        self.calibration_store.load_async(settings['calibration_profile'])
+        if settings['watch_calibration']:
+            self.calibration_store.start_watching()
+        else:
+            self.calibration_store.stop_watching()
+
+        if settings['camera'] != self._camera_settings:
+            self._close_camera()
+            self._open_camera(settings['camera'])
+
+    def _open_camera(self, camera: Dict):
+        if camera['id'] == "simulator":
+            # Синтетическая сцена вместо камеры, параметры - config.SIMULATOR и camera.simulator
+            from Simulator import SimulatedWebcam
+            simulator = dict(config.SIMULATOR, **camera.get('simulator', {}))
+            simulator.update(width=camera['width'], height=camera['height'])
+            self.cap = SimulatedWebcam(simulator).open()
+        else:
+            backend = cv2.CAP_DSHOW if os.name == "nt" else cv2.CAP_ANY
+            self.cap = cv2.VideoCapture(camera['id'], backend)
+        if not self.cap.isOpened():
+            self.log(f"Camera {camera['id']} is not opened", "ERROR")
+            self.cap = None
+            self._camera_settings = None
+            return
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera['width'])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera['height'])
+        self.pipeline.frame_pool.resize(camera['width'], camera['height'])
+        self.capture_thread = CaptureThread(self.cap, on_frame=self.scheduler.notify)
+        self.capture_thread.start()
+        self._camera_settings = dict(camera)
+        self.log(f"Camera {camera['id']} started: {camera['width']}x{camera['height']}")
+
+    def _close_camera(self):
+        if self.capture_thread is not None:
+            self.capture_thread.stop()
+            self.capture_thread = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self._camera_settings = None
+        self.pipeline.stop()
+
+    def import_legacy_calibration(self):
+        """Перенос calibration.json старых версий в профиль по умолчанию"""
+        profile = self.settings['calibration_profile']
+        try:
+            if self.calibration_store.import_legacy(config.LEGACY_CALIBRATION_FILE, profile):
+                self.log(f"{config.LEGACY_CALIBRATION_FILE} imported to profile '{profile}'", "SUCCESS")
+        except (OSError, ValueError) as e:
+            self.log(f"{config.LEGACY_CALIBRATION_FILE} not imported: {e}", "ERROR")
+
+    def process_frame(self):
+        """Детекция на последнем кадре (задача главного цикла)"""
+        if self.capture_thread is None:
+            return
+        taken = self.capture_thread.take()
+        if taken is None:
+            return
+        self.frame_count, frame, capture_time = taken
+        self.markers = self.pipeline.process(self.frame_count, frame, capture_time)['markers_info']
+
+    def collect_metrics(self) -> str:
+        """Метрики для /metrics (вызывается из потока HTTP сервера)"""
+        return self.pipeline.collect_metrics(list(self.destinations), self.log_buffer, capture=self.capture_thread,
+                                             scheduler=self.scheduler, markers=self.markers)
+
+    def send_packet(self):
+        """Отправка пакета по расписанию каждого адреса (задача главного цикла)"""
+        if len(self.pipeline.calibration) < 1:
+            return
+        packet = self.pipeline.build_packet(self.markers, self.settings['webcam_ip'])
+        destinations = self.pipeline.due_destinations(packet, self.destinations)
+        if destinations:
+            self.pipeline.send_packet(packet, destinations, self.settings['test_mode'])
+
+    def poll_calibration(self):
+        """Применение калибровки, загруженной в фоне (задача главного цикла)"""
+        loaded = self.calibration_store.take_loaded()
+        if loaded is None:
+            return
+        name, calibration, error = loaded
+        if error is not None:
+            self.log(f"Profile '{name}' not loaded: {error}", "ERROR")
+            return
+        self.pipeline.set_calibration(calibration)
+        self.log(f"Calibration profile '{name}' loaded: {len(calibration) - 2} positions", "SUCCESS")
+
+    def log_status(self):
+        frame = self.scheduler.get_task("frame")
+        stats = self.pipeline.udp_sender.get_stats()
+        failures = self.capture_thread.failures if self.capture_thread is not None else 0
+        gate = self.pipeline.motion_gate.stats
+        self.log(f"Status: detect {frame.rate:.1f}/s, frame {self.frame_count}, capture failures {failures}, "
+                 f"detection full {gate['full']}, partial {gate['partial']}, reused {gate['reused']}, "
+                 f"UDP sent {stats['sent']}, failed {stats['failed']}, dropped {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SmartCamera without GUI: capture -> detect -> UDP packet")
+    parser.add_argument("--settings", default=config.HEADLESS_SETTINGS, help="settings file (JSON)")
+    parser.add_argument("--write-settings", action="store_true", help="write default settings file and exit")
+    args = parser.parse_args()
+
+    if args.write_settings:
+        with open(args.settings, "w", encoding="utf-8") as f:
+            json.dump(DEFAULT_SETTINGS, f, ensure_ascii=False, indent=2)
+        print(f"Default settings written to {args.settings}")
+    else:
+        try:
+            app = HeadlessApp(args.settings)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"Settings not loaded: {e}\n")
+        app.run()
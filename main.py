@@ -1,8 +1,20 @@
-import func
+from Startup import startup_timer
+import argparse
+import json
 import window
 
 # Press the green button in the gutter to run the script.
 if __name__ == '__main__':
-    func.get_webcams_opencv()
-    window.run()
+    parser = argparse.ArgumentParser(description="SmartCamera configurator")
+    parser.add_argument("--startup-benchmark", metavar="PATH",
+                        help="start the camera, write startup timings (JSON) to PATH after the first frame and exit")
+    parser.add_argument("--camera", type=int, default=0, help="camera for --startup-benchmark")
+    args = parser.parse_args()
+    startup_timer.mark("imports")
 
+    if args.startup_benchmark:
+        window.run(benchmark_camera=args.camera)
+        with open(args.startup_benchmark, "w", encoding="utf-8") as f:
+            json.dump({'started_at': startup_timer.started_at, 'marks': startup_timer.marks}, f)
+    else:
+        window.run()
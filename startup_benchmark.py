@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STAGES = ("launch", "imports", "window", "cameras", "first_frame")
+
+
+def measure(command: list, camera: int, timeout: float) -> dict:
+    """
+    Один запуск программы в режиме замера
+
+    Returns:
+        {этап: секунды от запуска процесса}, отсутствующие этапы не включаются
+    """
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        spawned = time.time()
+        subprocess.run(command + ["--startup-benchmark", path, "--camera", str(camera)], timeout=timeout, check=True)
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        os.remove(path)
+
+    # Время до первой строки main.py: запуск интерпретатора (и распаковка onefile exe)
+    launch = result['started_at'] - spawned
+    timings = {'launch': launch}
+    for name, seconds in result['marks'].items():
+        timings[name] = launch + seconds
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup benchmark: time to window and to the first camera frame")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout of one run, s")
+    parser.add_argument("command", nargs="*", help="program to start (default: this Python with main.py), "
+                                                   "e.g. dist/main.exe")
+    args = parser.parse_args()
+    command = args.command or [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")]
+
+    runs = []
+    for i in range(args.runs):
+        timings = measure(command, args.camera, args.timeout)
+        runs.append(timings)
+        print(f"run {i + 1}: " + ", ".join(f"{name} {timings[name]:.2f} s" for name in STAGES if name in timings))
+
+    print("median: " + ", ".join(
+        f"{name} {statistics.median(run[name] for run in runs):.2f} s"
+        for name in STAGES if all(name in run for run in runs)
+    ))
+    if not all("first_frame" in run for run in runs):
+        print(f"No frame from camera {args.camera} in some runs")
@@ -1,49 +1,106 @@
+import time
 import dearpygui.dearpygui as dpg
 import numpy as np
-from config import cameras, UDP_IP, UDP_PORT
+from config import cameras, detection_server_enabled, DETECTION_SERVER_PORT
 import func
+import config
+from Profiler import profiler, STAGES
+from AssignmentTable import NO_LINE
+from Packet import LINES
+from Startup import startup_timer
 
 WIDTH = 1280
 HEIGHT = 720
 
-def run():
+def run(benchmark_camera=None, benchmark_timeout=20.0):
+    """
+    Запуск интерфейса
+
+    Args:
+        benchmark_camera: Замер запуска - камера, которая запускается автоматически
+                          (после первого кадра программа завершается)
+        benchmark_timeout: Максимальная длительность замера, с
+    """
     dpg.create_context()  # Создание контекста
 
     contain()
 
-    dpg.create_viewport(title='Configurator SmartCamera', width=WIDTH, height=HEIGHT, resizable=False)  # Создание окна для доступа
+    dpg.create_viewport(title='Configurator SmartCamera', width=WIDTH, height=HEIGHT, resizable=False, vsync=False)  # Создание окна для доступа
 
     dpg.setup_dearpygui()
     dpg.show_viewport()  # Показываем окно
     dpg.set_primary_window("Primary Window", True)
-    timer = 0
+    dpg.render_dearpygui_frame()
+    startup_timer.mark("window")
+
+    # Камеры ищутся в фоне, список заполняется задачей "cameras"
+    func.start_camera_probe()
+    if config.log_to_file:
+        func.log_file.start()
+    func.import_legacy_calibration()
+    if detection_server_enabled:
+        func.on_toggle_detection_server(None, True)
+    if config.metrics_enabled:
+        func.on_toggle_metrics(None, True)
+
+    # Каждая часть цикла работает на своей частоте, между дедлайнами цикл спит
+    scheduler = func.loop_scheduler
+    scheduler.add_task("frame", func.update_camera_frame, config.detect_fps, on_event=True)
+    scheduler.add_task("ui", dpg.render_dearpygui_frame, config.ui_fps)
+    scheduler.add_task("output", func.send_udp_data, config.output_rate)
+    scheduler.add_task("status", func.update_loop_status, 1, show_in_status=False)
+    scheduler.add_task("logs", func.log_view.flush, config.log_flush_rate, show_in_status=False)
+    scheduler.add_task("calibration", func.poll_calibration_store, 10, show_in_status=False)
+    scheduler.add_task("cameras", func.poll_camera_probe, 10, show_in_status=False)
+    scheduler.add_task("performance", func.update_performance, 2, show_in_status=False)
+    if benchmark_camera is not None:
+        scheduler.add_task("benchmark", lambda: _benchmark_start(benchmark_camera), 10, show_in_status=False)
     while dpg.is_dearpygui_running():
-        func.update_camera_frame()
-        # 2. Рендерим интерфейс
-        dpg.render_dearpygui_frame()
-        timer = func.send_interval(dpg.get_value("freq"), timer, func.send_udp_data)
+        scheduler.run_once()
+        if benchmark_camera is not None and (
+                "first_frame" in startup_timer.marks or time.perf_counter() - startup_timer.started > benchmark_timeout):
+            break
     #dpg.start_dearpygui()  # Запускаем цикл
+    if func.selected_cam is not None and func.selected_cam.capture_thread is not None:
+        func.on_stop_camera(None, None)
+    func.pipeline.close()
+    if func.metrics_server is not None:
+        func.metrics_server.stop()
+    func.log_file.stop()
+    func.calibration_store.close()
     dpg.destroy_context()  # Уничтожение контекста
 
+def _benchmark_start(camera_id):
+    """Автоматический запуск камеры для замера запуска"""
+    if "cameras" not in startup_timer.marks or func.camera_selected:
+        return
+    camera = next((camera for camera in func.cameras if camera.camera_id == camera_id), None)
+    if camera is None:
+        return
+    func.on_camera_selected(None, camera.label)
+    func.on_start_camera(None, None)
+
+
 def contain():
+    _pending_tabs.update(udp_tab=_build_udp_tab, performance_tab=_build_performance_tab)
     with dpg.window(tag="Primary Window", no_resize=True):
-        with dpg.tab_bar():
+        with dpg.tab_bar(callback=_on_tab_changed):
             with dpg.tab(label="Webcam"):
                 dpg.add_text("SmartCamera in dev",color=[0, 255, 255])
                 dpg.add_separator()
                 with dpg.group(horizontal=True):
                     dpg.add_text("Web camera:")
                     dpg.add_combo(
-                        list(map(lambda x: f"Camera {x.camera_id}", cameras)),
+                        list(map(lambda x: x.label, cameras)),
                         tag="select_camera",
                         default_value="",
                         callback=func.on_camera_selected
                     )
                     from config import selected_cam
-                    temp_text = "Camera is not found"
+                    temp_text = "Searching for cameras..."
                     if selected_cam is not None:
                         if selected_cam.camera_id >= 0:
-                            temp_text = f"Camera {selected_cam.camera_id}: {selected_cam.width}x{selected_cam.height}"
+                            temp_text = f"{selected_cam.label}: {selected_cam.width}x{selected_cam.height}"
                     elif cameras:
                         temp_text = "Select camera"
                     dpg.add_text(temp_text, color=[255, 255, 0], tag="Camera status")
@@ -51,6 +108,7 @@ def contain():
                     dpg.add_button(label="Start Camera", width=200, callback=func.on_start_camera)
                     dpg.add_button(label="Stop Camera", width=200, callback=func.on_stop_camera)
                     dpg.add_button(label="Start/Stop Scanning", width=200, callback=func.on_start_scan)
+                dpg.add_text("Loop: -", tag="loop_status", color=(150, 150, 150))
                 dpg.add_separator()
                 dpg.add_text("")
                 if selected_cam:
@@ -87,6 +145,15 @@ def contain():
                         width=120,
                         callback=func.on_reset_calibrate
                     )
+
+                # Профили калибровки
+                with dpg.group(horizontal=True):
+                    dpg.add_text("Profile:")
+                    dpg.add_input_text(
+                        tag="profile_name",
+                        default_value=config.CALIBRATION_PROFILE,
+                        width=140
+                    )
                     dpg.add_button(
                         label="Save",
                         width=80,
@@ -97,6 +164,18 @@ def contain():
                         width=80,
                         callback=func.on_load_calibration
                     )
+                    dpg.add_combo(
+                        func.calibration_store.list_profiles(),
+                        tag="profile_select",
+                        default_value="",
+                        width=160,
+                        callback=func.on_select_profile
+                    )
+                    dpg.add_checkbox(
+                        label="Reload on file change",
+                        default_value=False,
+                        callback=func.on_toggle_profile_watch
+                    )
 
                 # Настройка множителя размера области
                 with dpg.group(horizontal=True):
@@ -117,77 +196,180 @@ def contain():
                 dpg.add_text("Calibrated positions: 0", tag="calibration_info", color=(150, 255, 150))
 
                 dpg.add_separator()
-                dpg.add_image("image_texture", width=640, height=480)
+                dpg.add_image("image_texture", width=640, height=480, tag="calibration_out")
 
                 # Переназначение позиций
                 with dpg.collapsing_header(label="Position Swap/Reassignment", default_open=False):
                     dpg.add_text("Swap two calibrated positions:", color=(200, 200, 200))
-                    with dpg.group(tag="reassignment_group"):
-                        dpg.add_text("No calibrated positions to reassign", color=(150, 150, 150))
+                    dpg.add_text("No calibrated positions to reassign", tag="reassignment_empty", color=(150, 150, 150))
+                    with dpg.group(tag="reassignment_group", show=False):
+                        dpg.add_input_int(label="Position 1", tag="reassign_from", default_value=0, width=80,
+                                          min_value=0, max_value=0)
+                        dpg.add_input_int(label="Position 2", tag="reassign_to", default_value=0, width=80,
+                                          min_value=0, max_value=0)
+                        dpg.add_button(label="Swap", callback=func.do_reassignment, width=160)
 
                 dpg.add_separator()
 
                 # Привязка позиций к линиям
                 with dpg.collapsing_header(label="Position Assignment (L0-L6)", default_open=False):
                     dpg.add_text("Assign calibrated positions to lines:", color=(200, 200, 200))
-                    with dpg.group(tag="assignment_group"):
-                        dpg.add_text("No calibrated positions to assign", color=(150, 150, 150))
+                    dpg.add_text("No calibrated positions to assign", tag="assignment_empty", color=(150, 150, 150))
+                    with dpg.group(tag="assignment_controls", show=False):
+                        # Привязка диапазона позиций к линии
+                        with dpg.group(horizontal=True):
+                            dpg.add_text("Positions")
+                            dpg.add_input_int(tag="bulk_from", default_value=0, width=80, min_value=0,
+                                              max_value=0, min_clamped=True, max_clamped=True)
+                            dpg.add_text("-")
+                            dpg.add_input_int(tag="bulk_to", default_value=0, width=80, min_value=0,
+                                              max_value=0, min_clamped=True, max_clamped=True)
+                            dpg.add_combo([NO_LINE] + LINES, tag="bulk_line", default_value=LINES[0], width=60)
+                            dpg.add_button(label="Assign", width=80, callback=func.on_bulk_assign)
+                        func.assignment_table.build()
 
                 dpg.add_separator()
-            with dpg.tab(label="UDP"):
-                # UDP настройки
-                dpg.add_text("UDP Settings:", color=(100, 255, 255))
-                with dpg.group(horizontal=True):
-                    dpg.add_text("IP:")
-                    dpg.add_input_text(
-                        tag="udp_ip_input",
-                        default_value=UDP_IP, #UDP_IP,
-                        width=120
-                    )
-                    dpg.add_text("Port:")
-                    dpg.add_input_text(
-                        tag="udp_port_input",
-                        default_value=str(UDP_PORT),  # str(UDP_PORT),
-                        width=80
-                    )
-                    dpg.add_button(
-                        label="Update",
-                        callback=func.update_udp_configuration,
-                        width=80
-                    )
-                with dpg.group(horizontal=True):
-                    dpg.add_text("IP Webcamera:")
-                    dpg.add_input_text(
-                        tag="webcam_ip_input",
-                        default_value="10.148.11.228",  # UDP_IP,
-                        width=120
-                    )
-                    dpg.add_input_int(tag="freq", label="delay", default_value=1, width=80)
+            # Вкладки UDP и Performance строятся при первом открытии (_on_tab_changed)
+            dpg.add_tab(label="UDP", tag="udp_tab")
+            dpg.add_tab(label="Performance", tag="performance_tab")
 
+            with dpg.tab(label="Logs"):
                 with dpg.group(horizontal=True):
-                    dpg.add_button(
-                        label="Start UDP",
-                        tag="udp_btn",
-                        width=120,
-                        callback=func.toggle_udp
-                    )
-                    dpg.add_button(
-                        label="Send Once",
-                        callback=func.send_udp_once,
-                        width=120
-                    )
+                    dpg.add_button(label="Clear", width=80, callback=func.clear_logs)
+                    dpg.add_text("Mouse wheel scrolls history", color=(150, 150, 150))
+                with dpg.child_window(tag="log_window", height=600, border=True,
+                                      horizontal_scrollbar=True, autosize_x=False):
+                    pass
+                func.log_view.build()
 
-                dpg.add_text("UDP: Disabled", tag="udp_status", color=(255, 150, 100))
-                dpg.add_separator()
+    with dpg.handler_registry():
+        dpg.add_mouse_wheel_handler(callback=func.on_log_scroll)
 
-                # Вывод считанных значений
-                dpg.add_text("Reading Output (Packet):", color=(100, 255, 200))
-                dpg.add_text("Format: C:228:0:l0:l1:l2:l3:l4:l5:l6:0#",
-                             color=(150, 150, 150), tag="output_format")
-                dpg.add_separator()
-                dpg.add_image("image_texture", width=640, height=480)
 
-            with dpg.tab(label="Logs"):
-                with dpg.child_window(tag="log_window", height=600, border=True,
-                                      horizontal_scrollbar=True, autosize_x=False):
-                    pass
\ No newline at end of file
+def _on_tab_changed(sender, app_data):
+    """Построение вкладки при первом открытии"""
+    tag = dpg.get_item_alias(app_data) if isinstance(app_data, int) else app_data
+    build = _pending_tabs.pop(tag, None)
+    if build is None:
+        return
+    dpg.push_container_stack(tag)
+    try:
+        build()
+    finally:
+        dpg.pop_container_stack()
+
+
+def _build_udp_tab():
+    # Начальные значения - текущее состояние (до открытия вкладки его могли изменить настройки запуска)
+    # UDP настройки
+    dpg.add_text("UDP Settings:", color=(100, 255, 255))
+    with dpg.group(tag="destinations_group"):
+        pass
+    func.update_destinations_ui()
+
+    with dpg.group(horizontal=True):
+        dpg.add_text("IP Webcamera:")
+        dpg.add_input_text(
+            tag="webcam_ip_input",
+            default_value=func.ui_state.get("webcam_ip_input"),
+            width=120,
+            callback=func.on_change_webcam_ip
+        )
+        dpg.add_input_float(
+            tag="min_gap",
+            label="min gap, s",
+            default_value=config.udp_min_gap,
+            min_value=0.0,
+            min_clamped=True,
+            step=0.01,
+            format="%.2f",
+            width=100,
+            callback=func.on_change_min_gap
+        )
+        dpg.add_checkbox(
+            label="Test mode",
+            tag="udp_test_mode",
+            default_value=config.udp_test_mode,
+            callback=func.on_toggle_test_mode
+        )
+        dpg.add_checkbox(
+            label=f"Detection stream (TCP :{DETECTION_SERVER_PORT})",
+            tag="detection_server_toggle",
+            default_value=config.detection_server_enabled,
+            callback=func.on_toggle_detection_server
+        )
+
+    with dpg.group(horizontal=True):
+        dpg.add_button(
+            label="Stop UDP" if config.udp_enabled else "Start UDP",
+            tag="udp_btn",
+            width=120,
+            callback=func.toggle_udp
+        )
+        dpg.add_button(
+            label="Send Once",
+            callback=func.send_udp_once,
+            width=120
+        )
+
+    if config.udp_enabled:
+        dpg.add_text("UDP: Enabled", tag="udp_status", color=(100, 255, 100))
+    else:
+        dpg.add_text("UDP: Disabled", tag="udp_status", color=(255, 150, 100))
+    dpg.add_separator()
+
+    # Вывод считанных значений
+    dpg.add_text("Reading Output (Packet):", color=(100, 255, 200))
+    dpg.add_text("Format: C:228:0:l0:l1:l2:l3:l4:l5:l6:0#",
+                 color=(150, 150, 150), tag="output_format")
+    dpg.add_separator()
+    dpg.add_image("image_texture", width=640, height=480, tag="udp_out")
+
+
+def _build_performance_tab():
+    with dpg.group(horizontal=True):
+        dpg.add_checkbox(label="Enable profiling", default_value=profiler.enabled, callback=func.on_toggle_profiler)
+        dpg.add_checkbox(label="Skip detection on static frames", default_value=func.pipeline.motion_gate_enabled,
+                         callback=func.on_toggle_motion_gate)
+        dpg.add_checkbox(label="Tune detector to calibration", default_value=func.pipeline.calibrated_detector,
+                         callback=func.on_toggle_calibrated_detector)
+        dpg.add_checkbox(label="Only listed marker IDs", default_value=func.pipeline.reduced_dictionary,
+                         callback=func.on_toggle_reduced_dictionary)
+    dpg.add_text("Per-stage timings over the last second:", color=(200, 200, 200))
+    with dpg.group(tag="performance_group"):
+        for stage in STAGES:
+            dpg.add_text(f"{stage:<8} -", tag=f"perf_{stage}")
+        dpg.add_separator()
+        dpg.add_text("FPS: -", tag="perf_rates")
+        dpg.add_text("Queues: -", tag="perf_queues")
+    dpg.add_separator()
+
+    # Запись трассировки (chrome://tracing, ui.perfetto.dev) и профиля cProfile
+    with dpg.group(horizontal=True):
+        dpg.add_input_int(
+            tag="trace_seconds",
+            label="s",
+            default_value=config.trace_seconds,
+            min_value=1,
+            min_clamped=True,
+            width=100
+        )
+        dpg.add_checkbox(label="cProfile", tag="trace_cprofile", default_value=False)
+        dpg.add_button(label="Record trace", width=120, callback=func.on_record_trace)
+    dpg.add_text("", tag="trace_status")
+    dpg.add_separator()
+    dpg.add_checkbox(
+        label=f"Metrics endpoint (http://127.0.0.1:{config.METRICS_PORT}/metrics)",
+        tag="metrics_toggle",
+        default_value=config.metrics_enabled,
+        callback=func.on_toggle_metrics
+    )
+    dpg.add_checkbox(
+        label=f"Shared memory frame bus ({config.FRAME_BUS_NAME})",
+        tag="frame_bus_toggle",
+        default_value=func.pipeline.frame_bus_enabled,
+        callback=func.on_toggle_frame_bus
+    )
+
+
+_pending_tabs = {}  # Еще не построенные вкладки: {tag вкладки: функция построения}